@@ -14,6 +14,7 @@ from fastapi.security import APIKeyHeader
 from jose import jwt, JWTError
 
 from config import settings
+from database.shards import ShardMoving, bind_user
 
 # Заголовок для передачи данных Telegram
 telegram_auth_header = APIKeyHeader(
@@ -131,7 +132,7 @@ async def get_current_user(
 ) -> TelegramUser:
     """
     Dependency для получения текущего пользователя.
-    Проверяет данные Telegram WebApp.
+    Проверяет данные Telegram WebApp и выбирает шард его данных.
     """
     
     if not init_data:
@@ -148,8 +149,34 @@ async def get_current_user(
             detail="Invalid Telegram authentication data"
         )
     
+    try:
+        bind_user(user.id)
+    except ShardMoving:
+        raise HTTPException(
+            status_code=503,
+            detail="User data is being moved, retry shortly",
+            headers={"Retry-After": str(settings.SHARD_DIRECTORY_REFRESH)}
+        )
+    
     return user
 
+# Служебный доступ (прогнозы, обслуживание БД)
+admin_token_header = APIKeyHeader(
+    name="X-Admin-Token",
+    auto_error=False
+)
+
+async def require_admin(
+    token: Optional[str] = Security(admin_token_header)
+) -> None:
+    """Dependency для служебных эндпоинтов"""
+    
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    if not token or not hmac.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
 # Опциональная авторизация (для публичных эндпоинтов)
 async def get_optional_user(
     init_data: Optional[str] = Security(telegram_auth_header)
@@ -1,11 +1,17 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from config import settings
 from database.database import init_db
-from api.routes import users, reminders, categories
+from database.writer import start_writer, stop_writer
+from database.cache import start_cache, stop_cache
+from database.activity import start_activity, stop_activity
+from database.shards import start_shards, stop_shards
+from database.maintenance import start_maintenance, stop_maintenance
+from database.querystats import trace_queries
+from api.routes import users, reminders, categories, admin
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,9 +20,20 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✅ Database initialized")
     
+    await start_shards()
+    await start_writer()
+    await start_cache()
+    await start_activity()
+    await start_maintenance()
+    
     yield
     
     # Shutdown
+    await stop_maintenance()
+    await stop_activity()
+    await stop_writer()
+    await stop_cache()
+    await stop_shards()
     print("👋 Shutting down...")
 
 app = FastAPI(
@@ -42,10 +59,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Запросы к БД на HTTP-запрос (database/querystats.py)
+@app.middleware("http")
+async def trace_db_queries(request: Request, call_next):
+    with trace_queries(f"{request.method} {request.url.path}") as trace:
+        response = await call_next(request)
+        
+        # Шаблон пути вместо самого пути: /reminders/{reminder_id}
+        route = request.scope.get("route")
+        if route is not None:
+            trace.name = f"{request.method} {route.path}"
+    
+    response.headers["X-DB-Queries"] = str(trace.statements)
+    response.headers["X-DB-Time-Ms"] = f"{trace.db_time * 1000:.1f}"
+    return response
+
 # Подключение роутеров
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(reminders.router, prefix="/api/v1")
 app.include_router(categories.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 # Health check
 @app.get("/health")
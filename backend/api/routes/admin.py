@@ -0,0 +1,77 @@
+# backend/api/routes/admin.py
+
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+
+from database.maintenance import db_maintenance
+from database.querystats import query_stats
+from api.auth import require_admin
+from api.schemas import (
+    ForecastResponse, ForecastMinuteResponse, DbShardStatsResponse, QueryStatsResponse
+)
+from bot.utils.forecast import build_forecast
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+@router.get("/forecast", response_model=ForecastResponse)
+async def get_forecast(
+    hours: int = Query(24, ge=1, le=48),
+    only_overloaded: bool = Query(False)
+):
+    """Прогноз числа отправок по минутам на ближайшие часы"""
+    
+    forecast = await build_forecast(hours)
+    
+    minutes = forecast.overloaded if only_overloaded else forecast.minutes
+    
+    return ForecastResponse(
+        start=forecast.start,
+        end=forecast.end,
+        limit_per_minute=forecast.limit_per_minute,
+        total=forecast.total,
+        peak=forecast.peak,
+        overloaded_minutes=len(forecast.overloaded),
+        minutes=[
+            ForecastMinuteResponse(
+                minute=m.minute,
+                count=m.count,
+                over_limit=m.over_limit
+            )
+            for m in minutes
+        ]
+    )
+
+@router.get("/db", response_model=List[DbShardStatsResponse])
+async def get_db_stats():
+    """Размеры файлов БД (страницы, свободные страницы, WAL) и обслуживание"""
+    return await db_maintenance.stats()
+
+@router.get("/queries", response_model=List[QueryStatsResponse])
+async def get_query_stats(reset: bool = Query(False)):
+    """Число запросов и время в БД по маршрутам, апдейтам и задачам, повторы (N+1)"""
+    
+    result = [
+        QueryStatsResponse(
+            name=stats.name,
+            calls=stats.calls,
+            avg_queries=round(stats.statements / stats.calls, 2),
+            max_queries=stats.max_statements,
+            avg_db_ms=round(stats.db_time / stats.calls * 1000, 2),
+            max_db_ms=round(stats.max_db_time * 1000, 2),
+            budget=stats.budget,
+            over_budget=stats.over_budget,
+            repeated=stats.repeated,
+            repeated_shapes=stats.repeated_shapes
+        )
+        for stats in query_stats.snapshot()
+    ]
+    
+    if reset:
+        query_stats.reset()
+    
+    return result
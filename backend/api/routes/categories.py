@@ -2,23 +2,28 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Union
 
-from database.database import get_session
+from database.database import get_session, get_read_session
 from database.repositories.user_repo import UserRepository
 from database.repositories.category_repo import CategoryRepository
 from api.auth import get_current_user, TelegramUser
 from api.schemas import (
     CategoryCreate, CategoryUpdate, CategoryResponse,
-    SuccessResponse
+    CategoryMove, SuccessResponse
 )
 
-router = APIRouter(prefix="/categories", tags=["Categories"])
+# Авторизация первой: она выбирает шард для сессий эндпоинта
+router = APIRouter(
+    prefix="/categories",
+    tags=["Categories"],
+    dependencies=[Depends(get_current_user)]
+)
 
 @router.get("", response_model=List[CategoryResponse])
 async def get_categories(
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получить все категории пользователя"""
     
@@ -109,11 +114,14 @@ async def delete_category(
 
 @router.post("/reorder", response_model=List[CategoryResponse])
 async def reorder_categories(
-    category_ids: List[int],
+    data: Union[List[int], CategoryMove],
     telegram_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Изменить порядок категорий"""
+    """
+    Изменить порядок категорий: полный список id по порядку или
+    перемещение одной категории ({category_id, before_id | after_id})
+    """
     
     user_repo = UserRepository(session)
     user = await user_repo.get_by_telegram_id(telegram_user.id)
@@ -122,6 +130,17 @@ async def reorder_categories(
         raise HTTPException(status_code=404, detail="User not found")
     
     repo = CategoryRepository(session)
-    categories = await repo.reorder(user.id, category_ids)
+    
+    if isinstance(data, CategoryMove):
+        categories = await repo.move(
+            user.id,
+            data.category_id,
+            before_id=data.before_id,
+            after_id=data.after_id
+        )
+        if categories is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+    else:
+        categories = await repo.reorder(user.id, data)
     
     return categories
\ No newline at end of file
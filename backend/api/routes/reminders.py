@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
+import base64
+import logging
 import pytz
 
-from database.database import get_session
+from database.database import get_read_session
+from database.writer import run_write
+from database.querystats import query_budget
 from database.repositories.user_repo import UserRepository
 from database.repositories.reminder_repo import ReminderRepository
 from database.models import ReminderStatus
@@ -15,19 +19,44 @@ from api.schemas import (
     SuccessResponse
 )
 from bot.utils.parser import parse_reminder_text
+from bot.utils.scheduler import invalidate_staged
 
-router = APIRouter(prefix="/reminders", tags=["Reminders"])
+logger = logging.getLogger(__name__)
+
+# Авторизация первой: она выбирает шард для сессий эндпоинта
+router = APIRouter(
+    prefix="/reminders",
+    tags=["Reminders"],
+    dependencies=[Depends(get_current_user)]
+)
+
+def encode_cursor(reminder) -> str:
+    """Непрозрачный курсор по (remind_at, id)"""
+    raw = f"{reminder.remind_at.isoformat()}|{reminder.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        remind_at, reminder_id = raw.split("|")
+        return datetime.fromisoformat(remind_at), int(reminder_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 @router.get("", response_model=ReminderListResponse)
+@query_budget(3)
 async def get_reminders(
     status: Optional[str] = Query(None, description="active, completed, missed"),
     category_id: Optional[int] = Query(None),
     from_date: Optional[datetime] = Query(None),
     to_date: Optional[datetime] = Query(None),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    offset: int = Query(0, ge=0, description="устарело, используйте cursor"),
+    include_total: bool = Query(False, description="вернуть total (из счётчиков по статусам)"),
+    include_archive: bool = Query(False, description="включить перенесённые в архив"),
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получить список напоминаний с фильтрами"""
     
@@ -45,6 +74,14 @@ async def get_reminders(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid status")
     
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = 0
+    
     repo = ReminderRepository(session)
     reminders = await repo.get_user_reminders(
         user_id=user.id,
@@ -53,26 +90,34 @@ async def get_reminders(
         from_date=from_date,
         to_date=to_date,
         limit=limit + 1,
-        offset=offset
+        offset=offset,
+        after=after,
+        include_archive=include_archive
     )
     
     has_more = len(reminders) > limit
+    next_cursor = None
     if has_more:
         reminders = reminders[:limit]
+        next_cursor = encode_cursor(reminders[-1])
     
-    stats = await repo.get_stats(user.id)
-    total = stats["total"]
+    total = None
+    if include_total:
+        # Размер статуса целиком, без учёта фильтров по дате и категории
+        stats = await repo.get_stats(user.id, include_archive=include_archive)
+        total = stats[status_enum.value] if status_enum else stats["total"]
     
     return ReminderListResponse(
         items=reminders,
         total=total,
-        has_more=has_more
+        has_more=has_more,
+        next_cursor=next_cursor
     )
 
 @router.get("/today", response_model=ReminderListResponse)
 async def get_today_reminders(
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получить напоминания на сегодня"""
     
@@ -91,11 +136,51 @@ async def get_today_reminders(
         has_more=False
     )
 
+@router.get("/search", response_model=ReminderListResponse)
+async def search_reminders(
+    q: str = Query(..., min_length=1, max_length=200, description="слова из названия или описания"),
+    status: Optional[str] = Query(None, description="active, completed, missed"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    telegram_user: TelegramUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Полнотекстовый поиск, самые релевантные первыми"""
+    
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(telegram_user.id)
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    status_enum = None
+    if status:
+        try:
+            status_enum = ReminderStatus(status)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid status")
+    
+    repo = ReminderRepository(session)
+    reminders = await repo.search(
+        user_id=user.id,
+        text=q,
+        status=status_enum,
+        limit=limit + 1,
+        offset=offset
+    )
+    
+    has_more = len(reminders) > limit
+    
+    return ReminderListResponse(
+        items=reminders[:limit],
+        has_more=has_more
+    )
+
 @router.post("", response_model=ReminderResponse)
 async def create_reminder(
     data: ReminderCreate,
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Создать напоминание"""
     
@@ -110,10 +195,8 @@ async def create_reminder(
     if remind_at_utc.tzinfo is None:
         remind_at_utc = remind_at_utc.replace(tzinfo=pytz.UTC)
     
-    repo = ReminderRepository(session)
-    
-    try:
-        reminder = await repo.create(
+    async def create(write_session: AsyncSession):
+        reminder = await ReminderRepository(write_session).create(
             user_id=user.id,
             title=data.title,
             description=data.description,
@@ -127,19 +210,23 @@ async def create_reminder(
         )
         
         # Обновляем статистику
-        await user_repo.increment_stats(user.id, created=1)
-        
-        return reminder
+        await UserRepository(write_session).increment_stats(user.id, created=1)
         
-    except Exception as e:
-        print(f"❌ Error creating reminder: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        # Ответ отдаётся после закрытия сессии — категорию грузим сразу
+        return await ReminderRepository(write_session).get_by_id(reminder.id, user.id)
+    
+    try:
+        return await run_write(create)
+    
+    except Exception:
+        logger.exception("Error creating reminder for user %s", user.id)
+        raise HTTPException(status_code=500, detail="Failed to create reminder")
 
 @router.get("/{reminder_id}", response_model=ReminderResponse)
 async def get_reminder(
     reminder_id: int,
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получить напоминание по ID"""
     
@@ -162,7 +249,7 @@ async def update_reminder(
     reminder_id: int,
     data: ReminderUpdate,
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Обновить напоминание"""
     
@@ -172,12 +259,17 @@ async def update_reminder(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    repo = ReminderRepository(session)
-    reminder = await repo.update(
-        reminder_id=reminder_id,
-        user_id=user.id,
-        **data.model_dump(exclude_none=True)
-    )
+    async def update(write_session: AsyncSession):
+        reminder = await ReminderRepository(write_session).update(
+            reminder_id=reminder_id,
+            user_id=user.id,
+            **data.model_dump(exclude_none=True)
+        )
+        if reminder:
+            invalidate_staged(reminder_id, write_session)
+        return reminder
+    
+    reminder = await run_write(update)
     
     if not reminder:
         raise HTTPException(status_code=404, detail="Reminder not found")
@@ -188,7 +280,7 @@ async def update_reminder(
 async def complete_reminder(
     reminder_id: int,
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Отметить напоминание как выполненное"""
     
@@ -198,22 +290,26 @@ async def complete_reminder(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    repo = ReminderRepository(session)
-    reminder = await repo.mark_completed(reminder_id, user.id)
+    async def complete(write_session: AsyncSession):
+        reminder = await ReminderRepository(write_session).mark_completed(reminder_id, user.id)
+        if reminder:
+            # Обновляем статистику
+            await UserRepository(write_session).increment_stats(user.id, completed=1)
+            invalidate_staged(reminder_id, write_session)
+        return reminder
+    
+    reminder = await run_write(complete)
     
     if not reminder:
         raise HTTPException(status_code=404, detail="Reminder not found")
     
-    # Обновляем статистику
-    await user_repo.increment_stats(user.id, completed=1)
-    
     return reminder
 
 @router.delete("/{reminder_id}", response_model=SuccessResponse)
 async def delete_reminder(
     reminder_id: int,
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Удалить напоминание"""
     
@@ -223,8 +319,13 @@ async def delete_reminder(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    repo = ReminderRepository(session)
-    deleted = await repo.delete(reminder_id, user.id)
+    async def delete(write_session: AsyncSession):
+        deleted = await ReminderRepository(write_session).delete(reminder_id, user.id)
+        if deleted:
+            invalidate_staged(reminder_id, write_session)
+        return deleted
+    
+    deleted = await run_write(delete)
     
     if not deleted:
         raise HTTPException(status_code=404, detail="Reminder not found")
@@ -235,7 +336,7 @@ async def delete_reminder(
 async def parse_text(
     data: ParseRequest,
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Распарсить текст напоминания (извлечь время)"""
     
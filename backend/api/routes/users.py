@@ -1,20 +1,31 @@
 # backend/api/routes/users.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import get_session
+from database.database import get_session, get_read_session
+from database.querystats import query_budget
 from database.repositories.user_repo import UserRepository
 from database.repositories.reminder_repo import ReminderRepository
 from api.auth import get_current_user, TelegramUser
 from api.schemas import (
     UserResponse, UserUpdateRequest, 
-    StatsResponse, SuccessResponse
+    StatsResponse, SuccessResponse,
+    ResumeModeEnum, ResumeResponse
 )
+from bot.utils.vacation import pause_user, resume_user
+from bot.utils.timezones import change_timezone
+from bot.utils.scheduler import invalidate_staged_user
 
-router = APIRouter(prefix="/users", tags=["Users"])
+# Авторизация первой: она выбирает шард для сессий эндпоинта
+router = APIRouter(
+    prefix="/users",
+    tags=["Users"],
+    dependencies=[Depends(get_current_user)]
+)
 
 @router.get("/me", response_model=UserResponse)
+@query_budget(2)
 async def get_current_user_info(
     telegram_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
@@ -46,17 +57,70 @@ async def update_user_settings(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    update_data = data.model_dump(exclude_none=True)
+    
+    # Смена часового пояса переносит и будущие напоминания
+    timezone = update_data.pop("timezone", None)
+    if timezone:
+        try:
+            await change_timezone(session, user, timezone)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     updated_user = await repo.update_settings(
         user_id=user.id,
-        **data.model_dump(exclude_none=True)
+        **update_data
     )
     
+    # Подготовленные уведомления собраны на прежнем языке
+    if "language" in update_data:
+        invalidate_staged_user(user.id, session)
+    
     return updated_user
 
+@router.post("/me/pause", response_model=UserResponse)
+async def pause_notifications(
+    telegram_user: TelegramUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """Включить режим отпуска"""
+    
+    repo = UserRepository(session)
+    user = await repo.get_by_telegram_id(telegram_user.id)
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    await pause_user(session, user)
+    
+    return await repo.get_by_id(user.id)
+
+@router.post("/me/resume", response_model=ResumeResponse)
+async def resume_notifications(
+    mode: ResumeModeEnum = Query(ResumeModeEnum.shift),
+    telegram_user: TelegramUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """Выключить режим отпуска и перенести/пропустить напоминания за паузу"""
+    
+    repo = UserRepository(session)
+    user = await repo.get_by_telegram_id(telegram_user.id)
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    result = await resume_user(session, user, mode.value)
+    
+    return ResumeResponse(
+        user=await repo.get_by_id(user.id),
+        **result
+    )
+
 @router.get("/me/stats", response_model=StatsResponse)
 async def get_user_stats(
+    include_archive: bool = Query(False, description="включить перенесённые в архив"),
     telegram_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получить статистику пользователя"""
     
@@ -67,7 +131,7 @@ async def get_user_stats(
         raise HTTPException(status_code=404, detail="User not found")
     
     reminder_repo = ReminderRepository(session)
-    stats = await reminder_repo.get_stats(user.id)
+    stats = await reminder_repo.get_stats(user.id, include_archive=include_archive)
     
     # Вычисляем процент выполнения
     total = stats["completed"] + stats["missed"]
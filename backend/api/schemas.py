@@ -1,7 +1,7 @@
 # backend/api/schemas.py
 
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, validator, model_validator
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -46,6 +46,7 @@ class UserResponse(UserBase):
     timezone: str
     notifications_enabled: bool
     theme: str
+    paused_at: Optional[datetime] = None
     created_at: datetime
     total_reminders_created: int
     total_reminders_completed: int
@@ -61,6 +62,16 @@ class UserUpdateRequest(BaseModel):
     notifications_enabled: Optional[bool] = None
     theme: Optional[str] = None
 
+class ResumeModeEnum(str, Enum):
+    shift = "shift"
+    skip = "skip"
+
+class ResumeResponse(BaseModel):
+    user: UserResponse
+    shifted: int
+    missed: int
+    rescheduled: int
+
 # ===== CATEGORY SCHEMAS =====
 
 class CategoryBase(BaseModel):
@@ -77,6 +88,18 @@ class CategoryUpdate(BaseModel):
     color: Optional[str] = Field(None, pattern=r"^#[0-9A-Fa-f]{6}$")
     order: Optional[int] = None
 
+class CategoryMove(BaseModel):
+    """Переместить одну категорию: перед before_id или после after_id"""
+    category_id: int
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+    
+    @model_validator(mode="after")
+    def check_anchor(self):
+        if (self.before_id is None) == (self.after_id is None):
+            raise ValueError("Specify exactly one of before_id, after_id")
+        return self
+
 class CategoryResponse(CategoryBase):
     id: int
     user_id: int
@@ -129,8 +152,9 @@ class ReminderResponse(ReminderBase):
 
 class ReminderListResponse(BaseModel):
     items: List[ReminderResponse]
-    total: int
+    total: Optional[int] = None  # только с include_total
     has_more: bool
+    next_cursor: Optional[str] = None  # передать в cursor за следующей страницей
 
 # ===== STATS SCHEMAS =====
 
@@ -153,6 +177,54 @@ class WeeklyStatsResponse(BaseModel):
     total_created: int
     total_completed: int
 
+# ===== ADMIN SCHEMAS =====
+
+class ForecastMinuteResponse(BaseModel):
+    minute: datetime
+    count: int
+    over_limit: bool
+
+class ForecastResponse(BaseModel):
+    start: datetime
+    end: datetime
+    limit_per_minute: int
+    total: int
+    peak: int
+    overloaded_minutes: int
+    minutes: List[ForecastMinuteResponse]
+
+class DbShardStatsResponse(BaseModel):
+    """Файл БД шарда и его обслуживание (размеры — только для SQLite)"""
+    shard: int
+    maintained: bool
+    last_run: Optional[datetime] = None
+    last_duration_ms: float
+    optimizes: int
+    checkpoints: int
+    truncates: int
+    busy_skips: int
+    vacuumed_pages: int
+    errors: List[str]
+    page_size: Optional[int] = None
+    page_count: Optional[int] = None
+    freelist_count: Optional[int] = None
+    auto_vacuum: Optional[str] = None
+    db_bytes: Optional[int] = None
+    wal_bytes: Optional[int] = None
+
+class QueryStatsResponse(BaseModel):
+    """Запросы к БД по маршрутам, обработчикам и задачам"""
+    name: str
+    calls: int
+    avg_queries: float
+    max_queries: int
+    avg_db_ms: float
+    max_db_ms: float
+    budget: Optional[int] = None
+    over_budget: int
+    repeated: int  # трасс с повторяющимися запросами (N+1)
+    repeated_shapes: Dict[str, int]
+
 # ===== PARSE SCHEMAS =====
 
 class ParseRequest(BaseModel):
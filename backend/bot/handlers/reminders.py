@@ -8,11 +8,14 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from datetime import datetime, timedelta
 
-from database.database import async_session
+from database.database import async_read_session
+from database.writer import run_write
+from database.querystats import query_budget
 from database.repositories.reminder_repo import ReminderRepository
 from database.repositories.user_repo import UserRepository
 from database.models import ReminderStatus, Priority, RepeatType
 from bot.utils.parser import parse_reminder_text
+from bot.utils.scheduler import invalidate_staged
 
 router = Router()
 
@@ -117,7 +120,7 @@ def get_text(key: str, lang: str = "ru") -> str:
 async def quick_add_start(callback: CallbackQuery, state: FSMContext):
     """Начало быстрого добавления напоминания"""
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(callback.from_user.id)
         lang = user.language if user else "ru"
@@ -130,7 +133,7 @@ async def quick_add_start(callback: CallbackQuery, state: FSMContext):
 async def cmd_add_reminder(message: Message, state: FSMContext):
     """Команда /add"""
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(message.from_user.id)
         lang = user.language if user else "ru"
@@ -142,7 +145,7 @@ async def cmd_add_reminder(message: Message, state: FSMContext):
 async def process_reminder_text(message: Message, state: FSMContext):
     """Обработка текста напоминания"""
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(message.from_user.id)
         
@@ -234,20 +237,20 @@ async def confirm_reminder(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     lang = data.get("lang", "ru")
     
-    async with async_session() as session:
-        repo = ReminderRepository(session)
-        
-        remind_at = datetime.fromisoformat(data["remind_at"])
-        
-        reminder = await repo.create(
+    remind_at = datetime.fromisoformat(data["remind_at"])
+    
+    async def create(session):
+        reminder = await ReminderRepository(session).create(
             user_id=data["user_id"],
             title=data["title"],
             remind_at=remind_at
         )
         
         # Обновляем статистику пользователя
-        user_repo = UserRepository(session)
-        await user_repo.increment_stats(data["user_id"], created=1)
+        await UserRepository(session).increment_stats(data["user_id"], created=1)
+        return reminder
+    
+    reminder = await run_write(create)
     
     text = get_text("reminder_created", lang).format(
         title=reminder.title,
@@ -285,6 +288,7 @@ async def cancel_reminder(callback: CallbackQuery, state: FSMContext):
 
 @router.callback_query(F.data == "my_reminders")
 @router.message(Command("list"))
+@query_budget(2)
 async def show_reminders(event: Message | CallbackQuery, state: FSMContext):
     """Показать список напоминаний"""
     
@@ -296,7 +300,7 @@ async def show_reminders(event: Message | CallbackQuery, state: FSMContext):
         message = event
         user_id = event.from_user.id
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(user_id)
         
@@ -353,7 +357,7 @@ async def view_reminder(callback: CallbackQuery):
     
     reminder_id = int(callback.data.split("_")[2])
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(callback.from_user.id)
         
@@ -411,28 +415,30 @@ async def complete_reminder(callback: CallbackQuery):
     
     reminder_id = int(callback.data.split("_")[1])
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
-        
-        if not user:
-            return
-        
-        lang = user.language
-        
-        repo = ReminderRepository(session)
-        reminder = await repo.mark_completed(reminder_id, user.id)
-        
+    async with async_read_session() as session:
+        user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    
+    if not user:
+        return
+    
+    async def complete(session):
+        reminder = await ReminderRepository(session).mark_completed(reminder_id, user.id)
         if reminder:
-            await user_repo.increment_stats(user.id, completed=1)
-            
-            await callback.message.edit_text(
-                f"✅ <b>Выполнено!</b>\n\n<s>{reminder.title}</s>\n\n🎉 Отличная работа!",
-                reply_markup=None
-            )
-            await callback.answer("Молодец! 🎉")
-        else:
-            await callback.answer("Ошибка", show_alert=True)
+            await UserRepository(session).increment_stats(user.id, completed=1)
+        return reminder
+    
+    reminder = await run_write(complete)
+    
+    if reminder:
+        invalidate_staged(reminder.id)
+        
+        await callback.message.edit_text(
+            f"✅ <b>Выполнено!</b>\n\n<s>{reminder.title}</s>\n\n🎉 Отличная работа!",
+            reply_markup=None
+        )
+        await callback.answer("Молодец! 🎉")
+    else:
+        await callback.answer("Ошибка", show_alert=True)
 
 @router.callback_query(F.data.startswith("delete_"))
 async def delete_reminder(callback: CallbackQuery):
@@ -440,26 +446,27 @@ async def delete_reminder(callback: CallbackQuery):
     
     reminder_id = int(callback.data.split("_")[1])
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
-        
-        if not user:
-            return
-        
-        lang = user.language
-        
-        repo = ReminderRepository(session)
-        deleted = await repo.delete(reminder_id, user.id)
-        
-        if deleted:
-            await callback.message.edit_text(
-                get_text("reminder_deleted", lang),
-                reply_markup=None
-            )
-            await callback.answer("Удалено")
-        else:
-            await callback.answer("Ошибка", show_alert=True)
+    async with async_read_session() as session:
+        user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    
+    if not user:
+        return
+    
+    lang = user.language
+    
+    deleted = await run_write(
+        lambda session: ReminderRepository(session).delete(reminder_id, user.id)
+    )
+    
+    if deleted:
+        invalidate_staged(reminder_id)
+        await callback.message.edit_text(
+            get_text("reminder_deleted", lang),
+            reply_markup=None
+        )
+        await callback.answer("Удалено")
+    else:
+        await callback.answer("Ошибка", show_alert=True)
 
 @router.callback_query(F.data.startswith("snooze_"))
 async def snooze_reminder(callback: CallbackQuery):
@@ -469,47 +476,48 @@ async def snooze_reminder(callback: CallbackQuery):
     reminder_id = int(parts[1])
     minutes = int(parts[2])
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
-        
-        if not user:
-            return
-        
-        lang = user.language
-        
-        repo = ReminderRepository(session)
-        new_time = datetime.utcnow() + timedelta(minutes=minutes)
-        
-        reminder = await repo.update(
+    async with async_read_session() as session:
+        user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    
+    if not user:
+        return
+    
+    lang = user.language
+    new_time = datetime.utcnow() + timedelta(minutes=minutes)
+    
+    reminder = await run_write(
+        lambda session: ReminderRepository(session).update(
             reminder_id=reminder_id,
             user_id=user.id,
             remind_at=new_time,
             is_notified=False
         )
-        
-        if reminder:
-            await callback.message.edit_text(
-                get_text("reminder_snoozed", lang).format(minutes=minutes),
-                reply_markup=None
-            )
-            await callback.answer(f"⏰ +{minutes} мин")
-        else:
-            await callback.answer("Ошибка", show_alert=True)
+    )
+    
+    if reminder:
+        invalidate_staged(reminder.id)
+        await callback.message.edit_text(
+            get_text("reminder_snoozed", lang).format(minutes=minutes),
+            reply_markup=None
+        )
+        await callback.answer(f"⏰ +{minutes} мин")
+    else:
+        await callback.answer("Ошибка", show_alert=True)
 
 @router.callback_query(F.data == "back_to_main")
+@query_budget(2)
 async def back_to_main(callback: CallbackQuery):
     """Возврат в главное меню"""
     from bot.handlers.start import get_main_keyboard, get_text as get_start_text
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(callback.from_user.id)
         
         if user:
             lang = user.language
             reminder_repo = ReminderRepository(session)
-            stats = await reminder_repo.get_stats(user.id)
+            stats = await reminder_repo.get_stats(user.id, include_archive=True)
             
             text = get_start_text("welcome_back", lang).format(
                 name=user.first_name,
@@ -538,7 +546,7 @@ async def handle_any_text(message: Message, state: FSMContext):
         return
     
     # Пробуем распознать как напоминание
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(message.from_user.id)
         
@@ -7,8 +7,13 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from database.database import async_session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import async_read_session
 from database.repositories.user_repo import UserRepository
+from bot.utils.scheduler import invalidate_staged_user
+from bot.utils.vacation import pause_user, resume_user, RESUME_SHIFT, RESUME_SKIP
+from bot.utils.timezones import change_timezone
 
 router = Router()
 
@@ -54,7 +59,7 @@ async def show_settings(event: Message | CallbackQuery):
         user_id = event.from_user.id
         edit = False
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(user_id)
         
@@ -70,6 +75,7 @@ async def show_settings(event: Message | CallbackQuery):
 🕐 Часовой пояс: <b>{user.timezone}</b>
 🎨 Тема: <b>{THEMES.get(user.theme, user.theme)}</b>
 🔔 Уведомления: <b>{'Вкл' if user.notifications_enabled else 'Выкл'}</b>
+🏖 Отпуск: <b>{user.paused_at.strftime('с %d.%m %H:%M') if user.paused_at else 'Выкл'}</b>
 
 Выбери, что изменить:
 """
@@ -82,8 +88,12 @@ async def show_settings(event: Message | CallbackQuery):
             text=f"🔔 {'Выкл' if user.notifications_enabled else 'Вкл'} уведомления",
             callback_data="settings_notifications"
         )
+        builder.button(
+            text="▶️ Вернуться из отпуска" if user.paused_at else "🏖 Отпуск",
+            callback_data="settings_pause"
+        )
         builder.button(text="◀️ Назад", callback_data="back_to_main")
-        builder.adjust(2, 2, 1)
+        builder.adjust(2, 2, 1, 1)
         
         if edit:
             await message.edit_text(text, reply_markup=builder.as_markup())
@@ -106,17 +116,18 @@ async def settings_language(callback: CallbackQuery):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("set_lang_"))
-async def set_language(callback: CallbackQuery):
+async def set_language(callback: CallbackQuery, session: AsyncSession):
     """Установка языка"""
     
     lang_code = callback.data.split("_")[2]
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
-        
-        if user:
-            await user_repo.update_settings(user.id, language=lang_code)
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    
+    if user:
+        await user_repo.update_settings(user.id, language=lang_code)
+        await session.commit()
+        invalidate_staged_user(user.id)
     
     await callback.answer(f"Язык изменён на {LANGUAGES.get(lang_code, lang_code)}")
     await show_settings(callback)
@@ -137,17 +148,17 @@ async def settings_timezone(callback: CallbackQuery):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("set_tz_"))
-async def set_timezone(callback: CallbackQuery):
+async def set_timezone(callback: CallbackQuery, session: AsyncSession):
     """Установка часового пояса"""
     
     tz = callback.data.replace("set_tz_", "")
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
-        
-        if user:
-            await user_repo.update_settings(user.id, timezone=tz)
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    
+    if user:
+        await change_timezone(session, user, tz)
+        await session.commit()
     
     await callback.answer(f"Часовой пояс: {tz}")
     await show_settings(callback)
@@ -168,37 +179,89 @@ async def settings_theme(callback: CallbackQuery):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("set_theme_"))
-async def set_theme(callback: CallbackQuery):
+async def set_theme(callback: CallbackQuery, session: AsyncSession):
     """Установка темы"""
     
     theme = callback.data.split("_")[2]
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
-        
-        if user:
-            await user_repo.update_settings(user.id, theme=theme)
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    
+    if user:
+        await user_repo.update_settings(user.id, theme=theme)
+        await session.commit()
     
     await callback.answer(f"Тема: {THEMES.get(theme, theme)}")
     await show_settings(callback)
 
 @router.callback_query(F.data == "settings_notifications")
-async def toggle_notifications(callback: CallbackQuery):
+async def toggle_notifications(callback: CallbackQuery, session: AsyncSession):
     """Переключение уведомлений"""
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    
+    if user:
+        new_state = not user.notifications_enabled
+        await user_repo.update_settings(
+            user.id, 
+            notifications_enabled=new_state
+        )
+        await session.commit()
         
-        if user:
-            new_state = not user.notifications_enabled
-            await user_repo.update_settings(
-                user.id, 
-                notifications_enabled=new_state
-            )
-            
-            status = "включены" if new_state else "выключены"
-            await callback.answer(f"🔔 Уведомления {status}")
+        status = "включены" if new_state else "выключены"
+        await callback.answer(f"🔔 Уведомления {status}")
+    
+    await show_settings(callback)
+
+@router.callback_query(F.data == "settings_pause")
+async def toggle_pause(callback: CallbackQuery, session: AsyncSession):
+    """Режим отпуска: включить или выбрать, что делать с пропущенным"""
+    
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    
+    if not user:
+        return
+    
+    if not user.paused_at:
+        await pause_user(session, user)
+        await session.commit()
+        await callback.answer("🏖 Уведомления на паузе")
+        await show_settings(callback)
+        return
+    
+    text = """
+▶️ <b>Возвращаемся из отпуска</b>
+
+Что сделать с разовыми напоминаниями, которые пришлись на паузу?
+Повторяющиеся продолжатся по своему расписанию.
+"""
+    
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⏩ Перенести на время паузы", callback_data=f"resume_{RESUME_SHIFT}")
+    builder.button(text="⏭ Пропустить", callback_data=f"resume_{RESUME_SKIP}")
+    builder.button(text="◀️ Назад", callback_data="settings")
+    builder.adjust(1)
+    
+    await callback.message.edit_text(text, reply_markup=builder.as_markup())
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("resume_"))
+async def resume_from_pause(callback: CallbackQuery, session: AsyncSession):
+    """Выход из режима отпуска"""
+    
+    mode = callback.data.replace("resume_", "")
+    
+    user_repo = UserRepository(session)
+    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    
+    if user:
+        result = await resume_user(session, user, mode)
+        await session.commit()
+        await callback.answer(
+            f"▶️ Перенесено: {result['shifted'] + result['rescheduled']}, "
+            f"пропущено: {result['missed']}"
+        )
     
     await show_settings(callback)
\ No newline at end of file
@@ -3,7 +3,10 @@ from aiogram.types import Message, CallbackQuery, WebAppInfo, InlineKeyboardMark
 from aiogram.filters import Command, CommandStart
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database.database import async_session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import async_read_session
+from database.querystats import query_budget
 from database.repositories.user_repo import UserRepository
 from database.repositories.reminder_repo import ReminderRepository
 from config import settings
@@ -155,38 +158,41 @@ def get_main_keyboard(lang: str = "ru") -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 @router.message(CommandStart())
-async def cmd_start(message: Message):
+@query_budget(2)
+async def cmd_start(message: Message, session: AsyncSession):
     """Обработчик команды /start"""
     
-    async with async_session() as session:
-        user_repo = UserRepository(session)
-        
-        user, is_new = await user_repo.get_or_create(
-            telegram_id=message.from_user.id,
-            first_name=message.from_user.first_name,
-            username=message.from_user.username,
-            last_name=message.from_user.last_name
-        )
-        
-        lang = user.language
-        
-        if is_new:
-            text = get_text("welcome_new", lang)
-        else:
-            reminder_repo = ReminderRepository(session)
-            stats = await reminder_repo.get_stats(user.id)
-            
-            text = get_text("welcome_back", lang).format(
-                name=user.first_name,
-                active=stats["active"],
-                completed=stats["completed"],
-                streak=user.current_streak
-            )
+    user_repo = UserRepository(session)
+    
+    user, is_new = await user_repo.get_or_create(
+        telegram_id=message.from_user.id,
+        first_name=message.from_user.first_name,
+        username=message.from_user.username,
+        last_name=message.from_user.last_name
+    )
+    
+    lang = user.language
+    
+    if is_new:
+        text = get_text("welcome_new", lang)
+    else:
+        reminder_repo = ReminderRepository(session)
+        stats = await reminder_repo.get_stats(user.id, include_archive=True)
         
-        await message.answer(
-            text=text,
-            reply_markup=get_main_keyboard(lang)
+        text = get_text("welcome_back", lang).format(
+            name=user.first_name,
+            active=stats["active"],
+            completed=stats["completed"],
+            streak=user.current_streak
         )
+    
+    # Фиксируем до ответа, чтобы не держать запись во время запроса к Telegram
+    await session.commit()
+    
+    await message.answer(
+        text=text,
+        reply_markup=get_main_keyboard(lang)
+    )
 
 @router.message(Command("help"))
 @router.callback_query(F.data == "help")
@@ -199,7 +205,7 @@ async def cmd_help(event: Message | CallbackQuery):
     else:
         message = event
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(event.from_user.id)
         lang = user.language if user else "ru"
@@ -225,7 +231,7 @@ async def cmd_stats(event: Message | CallbackQuery):
         message = event
         user_id = event.from_user.id
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(user_id)
         
@@ -235,7 +241,7 @@ async def cmd_stats(event: Message | CallbackQuery):
         lang = user.language
         
         reminder_repo = ReminderRepository(session)
-        stats = await reminder_repo.get_stats(user.id)
+        stats = await reminder_repo.get_stats(user.id, include_archive=True)
         
         # Вычисляем успешность
         total = stats["completed"] + stats["missed"]
@@ -259,17 +265,18 @@ async def cmd_stats(event: Message | CallbackQuery):
             await message.answer(text, reply_markup=builder.as_markup())
 
 @router.callback_query(F.data == "back_to_main")
+@query_budget(2)
 async def back_to_main(callback: CallbackQuery):
     """Возврат в главное меню"""
     
-    async with async_session() as session:
+    async with async_read_session() as session:
         user_repo = UserRepository(session)
         user = await user_repo.get_by_telegram_id(callback.from_user.id)
         
         if user:
             lang = user.language
             reminder_repo = ReminderRepository(session)
-            stats = await reminder_repo.get_stats(user.id)
+            stats = await reminder_repo.get_stats(user.id, include_archive=True)
             
             text = get_text("welcome_back", lang).format(
                 name=user.first_name,
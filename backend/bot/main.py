@@ -8,7 +8,14 @@ from aiogram.client.default import DefaultBotProperties
 
 from config import settings
 from database.database import init_db
+from database.writer import start_writer, stop_writer
+from database.cache import start_cache, stop_cache
+from database.activity import start_activity, stop_activity
+from database.shards import start_shards, stop_shards
+from database.maintenance import start_maintenance, stop_maintenance
 from bot.handlers import start, reminders, settings_handlers
+from bot.middlewares.db import DbSessionMiddleware
+from bot.middlewares.querytrace import QueryTraceMiddleware
 from bot.utils.scheduler import init_scheduler, scheduler
 
 # Логирование
@@ -26,6 +33,10 @@ bot = Bot(
 
 dp = Dispatcher()
 
+# Учёт запросов и одна транзакция БД на апдейт
+dp.update.middleware(QueryTraceMiddleware())
+dp.update.middleware(DbSessionMiddleware())
+
 # Подключение роутеров
 dp.include_router(start.router)
 dp.include_router(reminders.router)
@@ -35,6 +46,11 @@ async def on_startup():
     """Действия при запуске"""
     logger.info("Инициализация базы данных...")
     await init_db()
+    await start_shards()
+    await start_writer()
+    await start_cache()
+    await start_activity()
+    await start_maintenance()
     
     logger.info("Запуск планировщика...")
     await init_scheduler(bot)
@@ -47,6 +63,12 @@ async def on_shutdown():
     if scheduler:
         await scheduler.stop()
     
+    await stop_maintenance()
+    await stop_activity()
+    await stop_writer()
+    await stop_cache()
+    await stop_shards()
+    
     logger.info("Бот остановлен")
 
 async def main():
@@ -0,0 +1,63 @@
+# backend/bot/middlewares/db.py
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.database import async_session
+from database.repositories.base import DEFER_COMMIT
+from database.shards import ShardMoving, bind_user
+
+# Ответ, пока данные пользователя переносятся в другой шард
+MOVING_TEXT = "⏳ Обновляем данные, повторите через минуту"
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна транзакция на апдейт: обработчик получает session, репозитории
+    в ней только flush. Commit — после обработчика, при ошибке — откат.
+
+    Обработчик может закоммитить раньше сам (например, перед ответом,
+    который читает из пула чтения), тогда здесь commit ничего не делает.
+
+    Сессия открывается в шарде автора апдейта.
+    """
+    
+    def __init__(self, session_factory: async_sessionmaker = async_session):
+        self._session_factory = session_factory
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None:
+            try:
+                bind_user(user.id)
+            except ShardMoving:
+                await self._answer_moving(event)
+                return None
+        
+        async with self._session_factory() as session:
+            session.info[DEFER_COMMIT] = True
+            data["session"] = session
+            
+            result = await handler(event, data)
+            
+            if session.in_transaction():
+                await session.commit()
+            
+            return result
+    
+    @staticmethod
+    async def _answer_moving(event: TelegramObject):
+        if isinstance(event, Update):
+            event = event.event
+        
+        if isinstance(event, CallbackQuery):
+            await event.answer(MOVING_TEXT, show_alert=True)
+        elif isinstance(event, Message):
+            await event.answer(MOVING_TEXT)
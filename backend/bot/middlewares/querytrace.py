@@ -0,0 +1,27 @@
+# backend/bot/middlewares/querytrace.py
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from database.querystats import trace_queries
+
+class QueryTraceMiddleware(BaseMiddleware):
+    """
+    Трасса запросов на апдейт (database/querystats.py). Регистрируется
+    раньше DbSessionMiddleware, чтобы в неё попал и commit обработчика.
+    Имя трассы — тип апдейта; обработчик с query_budget задаёт своё имя
+    и бюджет.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        name = f"bot:{event.event_type}" if isinstance(event, Update) else f"bot:{type(event).__name__}"
+        
+        with trace_queries(name):
+            return await handler(event, data)
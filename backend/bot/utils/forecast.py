@@ -0,0 +1,93 @@
+# backend/bot/utils/forecast.py
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, List
+
+from config import settings
+from database.database import async_read_session
+from database.shards import shard_router
+from database.models import RepeatType
+from database.repositories.reminder_repo import ReminderRepository
+from bot.utils.recurrence import occurrences_between
+
+@dataclass
+class ForecastMinute:
+    minute: datetime
+    count: int
+    over_limit: bool
+
+@dataclass
+class Forecast:
+    """Ожидаемое число отправок по минутам"""
+    start: datetime
+    end: datetime
+    limit_per_minute: int
+    total: int = 0
+    peak: int = 0
+    minutes: List[ForecastMinute] = field(default_factory=list)
+    
+    @property
+    def overloaded(self) -> List[ForecastMinute]:
+        return [m for m in self.minutes if m.over_limit]
+
+def _floor_minute(value: datetime) -> datetime:
+    return value.replace(second=0, microsecond=0)
+
+async def build_forecast(
+    hours: int = 24,
+    now: Optional[datetime] = None
+) -> Forecast:
+    """
+    Прогноз нагрузки на отправку уведомлений на ближайшие hours часов.
+
+    Время отправки — remind_at: планировщик (get_pending_notifications)
+    не учитывает notify_before, прогноз тоже. Просроченные напоминания
+    попадают в первую минуту: их отправит ближайшая проверка.
+    Отправляет один бот, поэтому считаются напоминания всех шардов.
+    """
+    
+    now = now or datetime.utcnow()
+    start = _floor_minute(now)
+    end = now + timedelta(hours=hours)
+    
+    rows = []
+    for shard in shard_router.shards():
+        async with async_read_session.for_shard(shard)() as session:
+            rows += await ReminderRepository(session).get_scheduled_until(end)
+    
+    histogram = Counter()
+    for remind_at, repeat_type, repeat_days, repeat_end_date in rows:
+        if remind_at < now:
+            # Уже должно было уйти — уйдёт при ближайшей проверке
+            histogram[start] += 1
+            if repeat_type == RepeatType.NONE:
+                continue
+            window_start = now
+        else:
+            window_start = remind_at
+        
+        occurrences = occurrences_between(
+            remind_at,
+            repeat_type,
+            repeat_days,
+            repeat_end_date,
+            window_start,
+            end
+        )
+        for occurrence in occurrences:
+            histogram[_floor_minute(occurrence)] += 1
+    
+    limit = settings.SEND_RATE_PER_SECOND * 60
+    forecast = Forecast(start=start, end=end, limit_per_minute=limit)
+    
+    for minute in sorted(histogram):
+        count = histogram[minute]
+        forecast.minutes.append(
+            ForecastMinute(minute=minute, count=count, over_limit=count > limit)
+        )
+        forecast.total += count
+        forecast.peak = max(forecast.peak, count)
+    
+    return forecast
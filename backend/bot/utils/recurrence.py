@@ -0,0 +1,136 @@
+# backend/bot/utils/recurrence.py
+
+from calendar import monthrange
+from datetime import datetime, timedelta
+from typing import Optional, List, Set
+
+from database.models import RepeatType
+
+# Фиксированный шаг для простых повторений
+FIXED_STEPS = {
+    RepeatType.DAILY: timedelta(days=1),
+    RepeatType.WEEKLY: timedelta(weeks=1),
+}
+
+def parse_repeat_days(repeat_days: Optional[str]) -> Set[int]:
+    """'1,3,5' -> {0, 2, 4} (weekday(): пн=0)"""
+    if not repeat_days:
+        return set()
+    return {int(d) - 1 for d in repeat_days.split(",") if d.strip()}
+
+def add_month(current: datetime) -> datetime:
+    """Следующий месяц, та же дата (или последний день месяца)"""
+    
+    month = current.month + 1
+    year = current.year
+    if month > 12:
+        month = 1
+        year += 1
+    
+    try:
+        return current.replace(year=year, month=month)
+    except ValueError:
+        # Если дня нет в месяце (31 февраля), берём последний день
+        last_day = monthrange(year, month)[1]
+        return current.replace(year=year, month=month, day=last_day)
+
+def next_occurrence(
+    current: datetime,
+    repeat_type: RepeatType,
+    repeat_days: Optional[str] = None
+) -> Optional[datetime]:
+    """Вычисляет время следующего повторения"""
+    
+    if repeat_type in FIXED_STEPS:
+        return current + FIXED_STEPS[repeat_type]
+    
+    elif repeat_type == RepeatType.MONTHLY:
+        return add_month(current)
+    
+    elif repeat_type == RepeatType.WEEKDAYS:
+        # Пропускаем выходные
+        next_day = current + timedelta(days=1)
+        while next_day.weekday() >= 5:  # 5=суббота, 6=воскресенье
+            next_day += timedelta(days=1)
+        return next_day
+    
+    elif repeat_type == RepeatType.CUSTOM:
+        # Выбранные дни недели
+        allowed_days = parse_repeat_days(repeat_days)
+        if not allowed_days:
+            return None
+        
+        next_day = current + timedelta(days=1)
+        for _ in range(7):
+            if next_day.weekday() in allowed_days:
+                return next_day
+            next_day += timedelta(days=1)
+    
+    return None
+
+def first_occurrence_after(
+    start: datetime,
+    repeat_type: RepeatType,
+    repeat_days: Optional[str],
+    after: datetime
+) -> Optional[datetime]:
+    """Первое срабатывание цепочки не раньше after"""
+    
+    if start >= after:
+        return start
+    
+    # Любое правило срабатывает хотя бы раз за 31 день
+    occurrences = occurrences_between(
+        start, repeat_type, repeat_days, None,
+        after, after + timedelta(days=31)
+    )
+    return occurrences[0] if occurrences else None
+
+def occurrences_between(
+    start: datetime,
+    repeat_type: RepeatType,
+    repeat_days: Optional[str],
+    repeat_end_date: Optional[datetime],
+    window_start: datetime,
+    window_end: datetime
+) -> List[datetime]:
+    """
+    Все срабатывания цепочки повторений, начиная со start, в окне
+    [window_start, window_end]. Для DAILY/WEEKLY номер первого
+    срабатывания в окне считается арифметически, без перебора истории.
+    """
+    
+    end = min(window_end, repeat_end_date) if repeat_end_date else window_end
+    if start > end:
+        return []
+    
+    if repeat_type == RepeatType.NONE:
+        return [start] if start >= window_start else []
+    
+    if repeat_type in FIXED_STEPS:
+        step = FIXED_STEPS[repeat_type]
+        skip = 0
+        if start < window_start:
+            skip = -((start - window_start) // step)  # ceil
+        first = start + step * skip
+        count = (end - first) // step + 1 if first <= end else 0
+        return [first + step * i for i in range(count)]
+    
+    current = start
+    if repeat_type in (RepeatType.WEEKDAYS, RepeatType.CUSTOM) and start < window_start:
+        # Расписание по дням недели повторяется каждые 7 дней
+        weeks = (window_start - start).days // 7
+        if weeks:
+            current = next_occurrence(
+                current + timedelta(weeks=weeks, days=-1),
+                repeat_type,
+                repeat_days
+            )
+    
+    result = []
+    while current is not None and current <= end:
+        if current >= window_start:
+            result.append(current)
+        current = next_occurrence(current, repeat_type, repeat_days)
+    
+    return result
@@ -2,44 +2,168 @@
 
 import asyncio
 import logging
+from dataclasses import dataclass
+from functools import partial
 from datetime import datetime, timedelta
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, Tuple
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.jobstores.base import JobLookupError
 from aiogram import Bot
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database.database import async_session
+from config import settings
+from database.database import async_read_session
+from database.writer import run_write
+from database.shards import current_shard, shard_router, use_shard
+from database.querystats import trace_queries
+from database.backup import backup_shard
 from database.repositories.reminder_repo import ReminderRepository
-from database.models import Reminder, ReminderStatus, RepeatType
+from database.repositories.category_repo import CategoryRepository
+from database.models import ReminderStatus, RepeatType
+from database.rows import ReminderRow
+from bot.utils.recurrence import next_occurrence
+from bot.utils.forecast import build_forecast
 
 logger = logging.getLogger(__name__)
 
+# Тексты уведомлений
+TEXTS = {
+    "ru": {
+        "title": "Напоминание!",
+        "btn_complete": "✅ Выполнено",
+        "btn_snooze_15": "⏰ +15 мин",
+        "btn_snooze_60": "⏰ +1 час",
+    },
+    "en": {
+        "title": "Reminder!",
+        "btn_complete": "✅ Done",
+        "btn_snooze_15": "⏰ +15 min",
+        "btn_snooze_60": "⏰ +1 hour",
+    },
+    "uk": {
+        "title": "Нагадування!",
+        "btn_complete": "✅ Виконано",
+        "btn_snooze_15": "⏰ +15 хв",
+        "btn_snooze_60": "⏰ +1 година",
+    }
+}
+
+def get_text(key: str, lang: str = "ru") -> str:
+    return TEXTS.get(lang, TEXTS["ru"]).get(key, TEXTS["ru"].get(key, key))
+
+@dataclass
+class StagedNotification:
+    """Готовое к отправке уведомление"""
+    reminder: ReminderRow
+    chat_id: int
+    text: str
+    reply_markup: InlineKeyboardMarkup
+
 class ReminderScheduler:
     """Планировщик напоминаний"""
     
     def __init__(self, bot: Bot):
         self.bot = bot
         self.scheduler = AsyncIOScheduler(timezone="UTC")
-        self._check_interval = 30  # Проверка каждые 30 секунд
+        self._check_interval = settings.SCHEDULER_CHECK_INTERVAL
+        self._lookahead = settings.PRESTAGE_LOOKAHEAD
+        self._batch_size = settings.SCHEDULER_BATCH_SIZE
+        self._per_user_limit = settings.SCHEDULER_PER_USER_LIMIT
+        
+        # Уведомления, подготовленные заранее: (шард, reminder_id) -> payload
+        self._staged: Dict[Tuple[int, int], StagedNotification] = {}
     
     async def start(self):
         """Запуск планировщика"""
         
+        # Прогноз нагрузки на отправку (один на все шарды)
+        if settings.FORECAST_INTERVAL > 0:
+            self.scheduler.add_job(
+                self._check_capacity_forecast,
+                trigger=IntervalTrigger(minutes=settings.FORECAST_INTERVAL),
+                id="capacity_forecast",
+                replace_existing=True
+            )
+        
+        for shard in shard_router.shards():
+            self._add_shard_jobs(shard)
+        
+        self.scheduler.start()
+        logger.info("Планировщик запущен")
+    
+    def _add_shard_jobs(self, shard: int):
+        """Периодические задачи одного шарда"""
+        
+        def add(job: Callable, name: str, **kwargs):
+            self.scheduler.add_job(
+                self._in_shard,
+                args=[shard, job],
+                id=f"{name}_{shard}",
+                replace_existing=True,
+                **kwargs
+            )
+        
         # Основная задача проверки напоминаний
-        self.scheduler.add_job(
+        add(
             self._check_pending_reminders,
-            trigger=IntervalTrigger(seconds=self._check_interval),
-            id="check_reminders",
-            replace_existing=True
+            "check_reminders",
+            trigger=IntervalTrigger(seconds=self._check_interval)
         )
         
-        self.scheduler.start()
-        logger.info("Планировщик запущен")
+        # Предварительная подготовка ближайших уведомлений
+        if self._lookahead > 0:
+            add(
+                self._prestage_upcoming,
+                "prestage_reminders",
+                trigger=IntervalTrigger(seconds=max(self._lookahead // 2, 1)),
+                next_run_time=datetime.utcnow()
+            )
+        
+        # Сверка счётчиков напоминаний
+        if settings.COUNTERS_RECONCILE_INTERVAL > 0:
+            add(
+                self._reconcile_counters,
+                "reconcile_counters",
+                trigger=IntervalTrigger(minutes=settings.COUNTERS_RECONCILE_INTERVAL)
+            )
+        
+        # Перенос старых завершённых напоминаний в архив
+        if settings.ARCHIVE_INTERVAL > 0:
+            add(
+                self._archive_reminders,
+                "archive_reminders",
+                trigger=IntervalTrigger(minutes=settings.ARCHIVE_INTERVAL)
+            )
+        
+        # Пересчёт рангов категорий
+        if settings.CATEGORY_REBALANCE_INTERVAL > 0:
+            add(
+                self._rebalance_categories,
+                "rebalance_categories",
+                trigger=IntervalTrigger(minutes=settings.CATEGORY_REBALANCE_INTERVAL)
+            )
+        
+        # Резервная копия
+        if settings.BACKUP_INTERVAL > 0:
+            add(
+                self._backup_database,
+                "backup_database",
+                trigger=IntervalTrigger(minutes=settings.BACKUP_INTERVAL)
+            )
+    
+    async def _in_shard(self, shard: int, job: Callable):
+        with use_shard(shard), trace_queries(f"job:{job.__name__}"):
+            await job()
     
     async def stop(self):
         """Остановка планировщика"""
         self.scheduler.shutdown()
+        self._staged.clear()
         logger.info("Планировщик остановлен")
     
     async def _check_pending_reminders(self):
@@ -47,70 +171,329 @@ class ReminderScheduler:
         
         try:
             now = datetime.utcnow()
+            shard = current_shard.get()
+            self._drop_stale_staged(now)
             
-            async with async_session() as session:
+            async with async_read_session() as session:
                 repo = ReminderRepository(session)
                 
-                # Получаем напоминания, которые нужно отправить
-                pending = await repo.get_pending_notifications(now)
-                
-                for reminder in pending:
+                # Получаем напоминания, которые нужно отправить, по очереди
+                # между пользователями. Подготовленные заранее отправит
+                # их собственная задача.
+                batch = await repo.get_pending_notifications(
+                    now,
+                    per_user_limit=self._per_user_limit,
+                    limit=self._batch_size
+                )
+            
+            pending = [
+                reminder
+                for reminder in batch
+                if (shard, reminder.id) not in self._staged
+                and shard_router.owns(shard, reminder.user.telegram_id)
+            ]
+            
+            # Сначала отметка, потом отправка: напоминание, уже отправленное
+            # подготовленной задачей или изменённое после чтения, не уйдёт.
+            # Отметки не ждём по одной: писатель сгруппирует их в транзакции
+            claims = await asyncio.gather(
+                *[run_write(partial(self._record_sent, reminder)) for reminder in pending],
+                return_exceptions=True
+            )
+            
+            sent = 0
+            for reminder, claimed in zip(pending, claims):
+                if isinstance(claimed, Exception):
+                    logger.error(f"Ошибка сохранения уведомления {reminder.id}: {claimed}")
+                elif claimed:
                     await self._send_notification(reminder)
-                    await repo.mark_notified(reminder.id)
-                    
-                    # Обрабатываем повторяющиеся
-                    if reminder.repeat_type != RepeatType.NONE:
-                        await self._schedule_next_occurrence(reminder, repo)
-                
-                if pending:
-                    logger.info(f"Отправлено {len(pending)} уведомлений")
-                    
+                    sent += 1
+            
+            if sent:
+                logger.info(f"Отправлено {sent} уведомлений")
+            
+            if len(batch) == self._batch_size:
+                logger.warning(f"Очередь уведомлений шарда {shard} не разобрана за одну проверку")
+        
         except Exception as e:
             logger.error(f"Ошибка проверки напоминаний: {e}")
     
-    async def _send_notification(self, reminder: Reminder):
-        """Отправляет уведомление пользователю"""
+    async def _prestage_upcoming(self):
+        """Готовит уведомления, которые сработают в ближайшие секунды"""
         
         try:
-            # Формируем текст
-            text = self._format_notification(reminder)
+            now = datetime.utcnow()
+            horizon = now + timedelta(seconds=self._lookahead)
+            shard = current_shard.get()
             
-            # Клавиатура с действиями
-            from aiogram.utils.keyboard import InlineKeyboardBuilder
+            async with async_read_session() as session:
+                repo = ReminderRepository(session)
+                upcoming = await repo.get_upcoming_notifications(now, horizon)
             
-            builder = InlineKeyboardBuilder()
-            builder.button(
-                text="✅ Выполнено",
-                callback_data=f"complete_{reminder.id}"
-            )
-            builder.button(
-                text="⏰ +15 мин",
-                callback_data=f"snooze_{reminder.id}_15"
-            )
-            builder.button(
-                text="⏰ +1 час",
-                callback_data=f"snooze_{reminder.id}_60"
+            staged = 0
+            for reminder in upcoming:
+                if (shard, reminder.id) in self._staged:
+                    continue
+                if not shard_router.owns(shard, reminder.user.telegram_id):
+                    continue
+                
+                payload = self._render_notification(reminder)
+                if payload is None:
+                    continue
+                
+                self._staged[shard, reminder.id] = payload
+                self.scheduler.add_job(
+                    self._fire_staged,
+                    trigger=DateTrigger(run_date=reminder.remind_at, timezone="UTC"),
+                    args=[shard, reminder.id],
+                    id=f"fire_{shard}_{reminder.id}",
+                    replace_existing=True,
+                    misfire_grace_time=None
+                )
+                staged += 1
+            
+            if staged:
+                logger.debug(f"Подготовлено {staged} уведомлений")
+        
+        except Exception as e:
+            logger.error(f"Ошибка подготовки уведомлений: {e}")
+    
+    async def _fire_staged(self, shard: int, reminder_id: int):
+        """Отправляет подготовленное уведомление в момент срабатывания"""
+        
+        payload = self._staged.get((shard, reminder_id))
+        if payload is None:
+            # Отменено (удалено, отложено, выполнено) после подготовки
+            return
+        
+        # API в отдельном процессе не сбрасывает _staged: отправляем, только
+        # если строка в БД та же, что при подготовке. Иначе (изменено,
+        # выполнено, удалено) свежую версию отправит периодическая проверка
+        try:
+            with use_shard(shard):
+                claimed = await run_write(partial(self._record_sent, payload.reminder))
+            if claimed:
+                await self._deliver(payload)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения уведомления {reminder_id}: {e}")
+        finally:
+            self._staged.pop((shard, reminder_id), None)
+    
+    async def _check_capacity_forecast(self):
+        """Предупреждает о минутах, где отправок больше лимита Telegram"""
+        
+        try:
+            forecast = await build_forecast(settings.FORECAST_HOURS)
+            
+            overloaded = forecast.overloaded
+            if overloaded:
+                logger.warning(
+                    f"Прогноз: {len(overloaded)} мин. сверх лимита "
+                    f"{forecast.limit_per_minute}/мин, пик {forecast.peak} "
+                    f"в {max(overloaded, key=lambda m: m.count).minute:%Y-%m-%d %H:%M} UTC"
+                )
+            else:
+                logger.info(
+                    f"Прогноз на {settings.FORECAST_HOURS} ч: "
+                    f"{forecast.total} отправок, пик {forecast.peak}/мин"
+                )
+        
+        except Exception as e:
+            logger.error(f"Ошибка прогноза нагрузки: {e}")
+    
+    async def _reconcile_counters(self):
+        """Проходит всех пользователей порциями и чинит расхождения счётчиков"""
+        
+        after_user_id, fixed = 0, 0
+        
+        try:
+            while after_user_id is not None:
+                after_user_id, chunk_fixed = await run_write(
+                    partial(self._reconcile_chunk, after_user_id)
+                )
+                fixed += chunk_fixed
+            
+            if fixed:
+                logger.warning(f"Счётчики напоминаний: исправлено {fixed} пользователей")
+        
+        except Exception as e:
+            logger.error(f"Ошибка сверки счётчиков: {e}")
+    
+    async def _reconcile_chunk(self, after_user_id: int, session: AsyncSession) -> tuple:
+        return await ReminderRepository(session).reconcile_counters(
+            after_user_id, settings.COUNTERS_RECONCILE_CHUNK
+        )
+    
+    async def _archive_reminders(self):
+        """Переносит старые завершённые напоминания в архив порциями"""
+        
+        before = datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+        archived = 0
+        
+        try:
+            # Каждая порция — своя транзакция: прерванный перенос
+            # просто продолжится при следующем запуске
+            while True:
+                moved = await run_write(partial(self._archive_chunk, before))
+                archived += moved
+                if moved < settings.ARCHIVE_CHUNK:
+                    break
+            
+            if archived:
+                logger.info(f"В архив перенесено {archived} напоминаний")
+        
+        except Exception as e:
+            logger.error(f"Ошибка переноса в архив: {e}")
+    
+    async def _archive_chunk(self, before: datetime, session: AsyncSession) -> int:
+        return await ReminderRepository(session).archive_terminal(
+            before, settings.ARCHIVE_CHUNK
+        )
+    
+    async def _rebalance_categories(self):
+        """Раздаёт новые ранги категориям пользователей, где кончился зазор"""
+        
+        after_user_id, rebalanced = 0, 0
+        
+        try:
+            while after_user_id is not None:
+                after_user_id, chunk_rebalanced = await run_write(
+                    partial(self._rebalance_chunk, after_user_id)
+                )
+                rebalanced += chunk_rebalanced
+            
+            if rebalanced:
+                logger.info(f"Ранги категорий пересчитаны у {rebalanced} пользователей")
+        
+        except Exception as e:
+            logger.error(f"Ошибка пересчёта рангов категорий: {e}")
+    
+    async def _rebalance_chunk(self, after_user_id: int, session: AsyncSession) -> tuple:
+        repo = CategoryRepository(session)
+        last_user_id, crowded = await repo.get_crowded_users(
+            after_user_id, settings.CATEGORY_REBALANCE_CHUNK
+        )
+        for user_id in crowded:
+            await repo.rebalance(user_id)
+        return last_user_id, len(crowded)
+    
+    async def _backup_database(self):
+        """Снимает и проверяет резервную копию БД шарда"""
+        
+        try:
+            result = await backup_shard(current_shard.get())
+            logger.info(
+                f"Резервная копия {result.path}: {result.size} байт "
+                f"за {result.seconds:.1f} с"
             )
-            builder.adjust(1, 2)
+        except Exception as e:
+            logger.error(f"Ошибка резервного копирования: {e}")
+    
+    async def _record_sent(self, reminder: ReminderRow, session: AsyncSession) -> bool:
+        """
+        Отмечает отправку и создаёт следующее повторение, если напоминание
+        в БД не изменилось с момента чтения. False — отправлять не нужно.
+        """
+        
+        repo = ReminderRepository(session)
+        if not await repo.claim_notification(reminder):
+            return False
+        
+        # Обрабатываем повторяющиеся
+        if reminder.repeat_type != RepeatType.NONE:
+            await self._schedule_next_occurrence(reminder, repo)
+        return True
+    
+    def invalidate(self, reminder_id: int, shard: Optional[int] = None):
+        """Сбрасывает подготовленное уведомление (после изменения напоминания)"""
+        
+        if shard is None:
+            shard = current_shard.get()
+        
+        if self._staged.pop((shard, reminder_id), None) is None:
+            return
+        
+        try:
+            self.scheduler.remove_job(f"fire_{shard}_{reminder_id}")
+        except JobLookupError:
+            pass
+    
+    def invalidate_user(self, user_id: int, shard: Optional[int] = None):
+        """Сбрасывает все подготовленные уведомления пользователя"""
+        
+        if shard is None:
+            shard = current_shard.get()
+        
+        for (staged_shard, reminder_id), payload in list(self._staged.items()):
+            if staged_shard == shard and payload.reminder.user_id == user_id:
+                self.invalidate(reminder_id, shard)
+    
+    def _drop_stale_staged(self, now: datetime):
+        """Убирает подготовленные уведомления, чья задача так и не сработала"""
+        
+        deadline = now - timedelta(seconds=max(self._lookahead, self._check_interval))
+        for (shard, reminder_id), payload in list(self._staged.items()):
+            if payload.reminder.remind_at < deadline:
+                self.invalidate(reminder_id, shard)
+    
+    async def _send_notification(self, reminder: ReminderRow):
+        """Отправляет уведомление пользователю"""
+        
+        try:
+            payload = self._render_notification(reminder)
             
-            # Получаем telegram_id пользователя
-            async with async_session() as session:
-                from database.repositories.user_repo import UserRepository
-                user_repo = UserRepository(session)
-                user = await user_repo.get_by_id(reminder.user_id)
-                
-                if user:
-                    await self.bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=text,
-                        reply_markup=builder.as_markup()
-                    )
-                    logger.info(f"Уведомление отправлено: {reminder.id} -> {user.telegram_id}")
-                    
+            if payload:
+                await self._deliver(payload)
+        
         except Exception as e:
             logger.error(f"Ошибка отправки уведомления {reminder.id}: {e}")
     
-    def _format_notification(self, reminder: Reminder) -> str:
+    def _render_notification(self, reminder: ReminderRow) -> Optional[StagedNotification]:
+        """Готовит текст и клавиатуру уведомления"""
+        
+        user = reminder.user
+        if not user:
+            return None
+        
+        lang = user.language
+        
+        # Клавиатура с действиями
+        builder = InlineKeyboardBuilder()
+        builder.button(
+            text=get_text("btn_complete", lang),
+            callback_data=f"complete_{reminder.id}"
+        )
+        builder.button(
+            text=get_text("btn_snooze_15", lang),
+            callback_data=f"snooze_{reminder.id}_15"
+        )
+        builder.button(
+            text=get_text("btn_snooze_60", lang),
+            callback_data=f"snooze_{reminder.id}_60"
+        )
+        builder.adjust(1, 2)
+        
+        return StagedNotification(
+            reminder=reminder,
+            chat_id=user.telegram_id,
+            text=self._format_notification(reminder, lang),
+            reply_markup=builder.as_markup()
+        )
+    
+    async def _deliver(self, payload: StagedNotification):
+        """Сетевая отправка готового уведомления"""
+        
+        try:
+            await self.bot.send_message(
+                chat_id=payload.chat_id,
+                text=payload.text,
+                reply_markup=payload.reply_markup
+            )
+            logger.info(f"Уведомление отправлено: {payload.reminder.id} -> {payload.chat_id}")
+        except Exception as e:
+            logger.error(f"Ошибка отправки уведомления {payload.reminder.id}: {e}")
+    
+    def _format_notification(self, reminder: ReminderRow, lang: str = "ru") -> str:
         """Форматирует текст уведомления"""
         
         priority_emoji = {
@@ -122,11 +505,11 @@ class ReminderScheduler:
         emoji = priority_emoji.get(reminder.priority.value, "🔔")
         
         text = f"""
-{emoji} <b>Напоминание!</b>
+{emoji} <b>{get_text("title", lang)}</b>
 
 📝 {reminder.title}
 """
-        
+
         if reminder.description:
             text += f"\n📋 {reminder.description}"
         
@@ -136,8 +519,8 @@ class ReminderScheduler:
         return text.strip()
     
     async def _schedule_next_occurrence(
-        self, 
-        reminder: Reminder, 
+        self,
+        reminder: ReminderRow,
         repo: ReminderRepository
     ):
         """Создаёт следующее повторение напоминания"""
@@ -162,54 +545,14 @@ class ReminderScheduler:
                 repeat_end_date=reminder.repeat_end_date
             )
     
-    def _calculate_next_occurrence(self, reminder: Reminder) -> Optional[datetime]:
+    def _calculate_next_occurrence(self, reminder: ReminderRow) -> Optional[datetime]:
         """Вычисляет время следующего повторения"""
         
-        current = reminder.remind_at
-        
-        if reminder.repeat_type == RepeatType.DAILY:
-            return current + timedelta(days=1)
-        
-        elif reminder.repeat_type == RepeatType.WEEKLY:
-            return current + timedelta(weeks=1)
-        
-        elif reminder.repeat_type == RepeatType.MONTHLY:
-            # Следующий месяц, та же дата
-            month = current.month + 1
-            year = current.year
-            if month > 12:
-                month = 1
-                year += 1
-            
-            try:
-                return current.replace(year=year, month=month)
-            except ValueError:
-                # Если дня нет в месяце (31 февраля), берём последний день
-                from calendar import monthrange
-                last_day = monthrange(year, month)[1]
-                return current.replace(year=year, month=month, day=last_day)
-        
-        elif reminder.repeat_type == RepeatType.WEEKDAYS:
-            # Пропускаем выходные
-            next_day = current + timedelta(days=1)
-            while next_day.weekday() >= 5:  # 5=суббота, 6=воскресенье
-                next_day += timedelta(days=1)
-            return next_day
-        
-        elif reminder.repeat_type == RepeatType.CUSTOM:
-            # Выбранные дни недели
-            if not reminder.repeat_days:
-                return None
-            
-            allowed_days = [int(d) - 1 for d in reminder.repeat_days.split(",")]
-            next_day = current + timedelta(days=1)
-            
-            for _ in range(7):
-                if next_day.weekday() in allowed_days:
-                    return next_day
-                next_day += timedelta(days=1)
-        
-        return None
+        return next_occurrence(
+            reminder.remind_at,
+            reminder.repeat_type,
+            reminder.repeat_days
+        )
 
 
 # Глобальный экземпляр
@@ -221,7 +564,43 @@ def get_scheduler() -> ReminderScheduler:
         raise RuntimeError("Scheduler not initialized")
     return scheduler
 
+def invalidate_staged(reminder_id: int, session: Optional[AsyncSession] = None):
+    """
+    Сбросить подготовленное уведомление, если планировщик запущен.
+    С session — ещё раз после её commit: до него планировщик может
+    успеть подготовить уведомление по старой строке.
+    """
+    shard = current_shard.get()
+    if scheduler is not None:
+        scheduler.invalidate(reminder_id, shard)
+    
+    if session is not None and session.in_transaction():
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: scheduler is not None and scheduler.invalidate(reminder_id, shard),
+            once=True
+        )
+
+def invalidate_staged_user(user_id: int, session: Optional[AsyncSession] = None):
+    """
+    Сбросить подготовленные уведомления пользователя, если планировщик
+    запущен. С session — ещё раз после её commit: до него планировщик
+    может успеть подготовить уведомления по старым данным.
+    """
+    shard = current_shard.get()
+    if scheduler is not None:
+        scheduler.invalidate_user(user_id, shard)
+    
+    if session is not None and session.in_transaction():
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: scheduler is not None and scheduler.invalidate_user(user_id, shard),
+            once=True
+        )
+
 async def init_scheduler(bot: Bot):
     global scheduler
     scheduler = ReminderScheduler(bot)
-    await scheduler.start()
\ No newline at end of file
+    await scheduler.start()
@@ -0,0 +1,141 @@
+# backend/bot/utils/timezones.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pytz
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database.database import async_session
+from database.models import User
+from database.repositories.user_repo import UserRepository
+from database.repositories.reminder_repo import ReminderRepository
+from bot.utils.scheduler import invalidate_staged_user
+
+logger = logging.getLogger(__name__)
+
+# Фоновые пересчёты (ссылки держим, чтобы задачи не собрал GC)
+_background_tasks = set()
+
+def validate_timezone(name: str) -> str:
+    """Проверяет название часового пояса (ValueError, если неизвестен)"""
+    try:
+        return pytz.timezone(name).zone
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {name}")
+
+def wall_clock_shift(old_tz: str, new_tz: str, moment: datetime) -> int:
+    """
+    На сколько секунд сдвинуть UTC-время moment, чтобы местное время
+    в new_tz совпало с тем, каким оно было в old_tz.
+    """
+    
+    local = pytz.utc.localize(moment).astimezone(pytz.timezone(old_tz))
+    moved = pytz.timezone(new_tz).localize(local.replace(tzinfo=None))
+    return int((moved.astimezone(pytz.utc).replace(tzinfo=None) - moment).total_seconds())
+
+def shift_ranges(
+    old_tz: str,
+    new_tz: str,
+    start: datetime,
+    end: datetime
+) -> List[Tuple[datetime, datetime, int]]:
+    """
+    Разбивает [start, end] на отрезки с одинаковым сдвигом (меняется
+    только на переходах летнего времени). Переход ищем шагом в сутки
+    и уточняем делением пополам до секунды.
+    """
+    
+    ranges = []
+    range_start = start
+    current = wall_clock_shift(old_tz, new_tz, start)
+    
+    probe = start
+    while probe < end:
+        next_probe = min(probe + timedelta(days=1), end)
+        shift = wall_clock_shift(old_tz, new_tz, next_probe)
+        
+        if shift != current:
+            lo, hi = probe, next_probe
+            while hi - lo > timedelta(seconds=1):
+                mid = lo + (hi - lo) / 2
+                if wall_clock_shift(old_tz, new_tz, mid) == current:
+                    lo = mid
+                else:
+                    hi = mid
+            
+            ranges.append((range_start, hi, current))
+            range_start, current = hi, wall_clock_shift(old_tz, new_tz, hi)
+        
+        probe = next_probe
+    
+    ranges.append((range_start, end + timedelta(seconds=1), current))
+    return ranges
+
+async def reanchor_reminders(
+    session: AsyncSession,
+    user_id: int,
+    old_tz: str,
+    new_tz: str,
+    since: datetime
+) -> int:
+    """Переносит будущие напоминания пользователя в новый часовой пояс"""
+    
+    repo = ReminderRepository(session)
+    count, first, last = await repo.get_future_range(user_id, since)
+    
+    if not count:
+        return 0
+    
+    ranges = shift_ranges(old_tz, new_tz, first, last)
+    return await repo.shift_future_ranges(user_id, since, ranges)
+
+async def _reanchor_in_background(user_id: int, old_tz: str, new_tz: str, since: datetime):
+    try:
+        async with async_session() as session:
+            updated = await reanchor_reminders(session, user_id, old_tz, new_tz, since)
+        invalidate_staged_user(user_id)
+        logger.info(f"Часовой пояс {user_id}: {old_tz} -> {new_tz}, перенесено {updated}")
+    except Exception as e:
+        logger.error(f"Ошибка переноса напоминаний {user_id} в {new_tz}: {e}")
+
+async def change_timezone(session: AsyncSession, user: User, new_tz: str) -> bool:
+    """
+    Меняет часовой пояс пользователя с сохранением местного времени
+    будущих напоминаний. Возвращает False, если перенос ушёл в фон.
+    """
+    
+    new_tz = validate_timezone(new_tz)
+    old_tz = user.timezone
+    
+    await UserRepository(session).update_settings(user.id, timezone=new_tz)
+    
+    if old_tz == new_tz:
+        return True
+    
+    invalidate_staged_user(user.id, session)
+    
+    since = datetime.utcnow()
+    count, _, _ = await ReminderRepository(session).get_future_range(user.id, since)
+    
+    if count <= settings.TZ_REANCHOR_INLINE_LIMIT:
+        await reanchor_reminders(session, user.id, old_tz, new_tz, since)
+        return True
+    
+    def start(_=None):
+        task = asyncio.get_running_loop().create_task(
+            _reanchor_in_background(user.id, old_tz, new_tz, since)
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
+    # Фоновая сессия не должна читать напоминания до commit нового пояса
+    if session.in_transaction():
+        event.listen(session.sync_session, "after_commit", start, once=True)
+    else:
+        start()
+    return False
@@ -0,0 +1,68 @@
+# backend/bot/utils/vacation.py
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import User, ReminderStatus
+from database.repositories.user_repo import UserRepository
+from database.repositories.reminder_repo import ReminderRepository
+from bot.utils.recurrence import first_occurrence_after
+from bot.utils.scheduler import invalidate_staged_user
+
+# Что делать с напоминаниями, пропущенными за время паузы
+RESUME_SHIFT = "shift"  # разовые сдвинуть на длительность паузы
+RESUME_SKIP = "skip"    # разовые отметить пропущенными
+
+async def pause_user(session: AsyncSession, user: User):
+    """Включить режим отпуска"""
+    
+    await UserRepository(session).set_paused(user.id, True)
+    invalidate_staged_user(user.id, session)
+
+async def resume_user(
+    session: AsyncSession,
+    user: User,
+    mode: str = RESUME_SHIFT,
+    now: Optional[datetime] = None
+) -> dict:
+    """
+    Выключить режим отпуска и разобрать пропущенные напоминания.
+
+    Разовые, которые просрочены ещё до паузы, не трогаются ни в одном
+    режиме. Повторяющиеся в обоих режимах переносятся на ближайшее
+    срабатывание по своему правилу (или завершаются, если правило
+    закончилось).
+    """
+    
+    now = now or datetime.utcnow()
+    result = {"shifted": 0, "missed": 0, "rescheduled": 0}
+    
+    if user.paused_at is None:
+        return result
+    
+    repo = ReminderRepository(session)
+    
+    recurring = []
+    for row in await repo.get_overdue_recurring(user.id, now):
+        next_time = first_occurrence_after(
+            row.remind_at, row.repeat_type, row.repeat_days, now
+        )
+        
+        if next_time is None or (row.repeat_end_date and next_time > row.repeat_end_date):
+            recurring.append({"id": row.id, "status": ReminderStatus.MISSED})
+        else:
+            recurring.append({"id": row.id, "remind_at": next_time})
+    
+    shift_seconds = None
+    if mode == RESUME_SHIFT:
+        shift_seconds = int((now - user.paused_at).total_seconds())
+    
+    result = await repo.reschedule_overdue(
+        user.id, user.paused_at, now, shift_seconds, recurring
+    )
+    
+    await UserRepository(session).set_paused(user.id, False)
+    
+    return result
@@ -11,13 +11,91 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./loginov_remind.db"
+    DATABASE_READ_URL: Optional[str] = None  # реплика для чтения (по умолчанию та же БД)
+    DB_ECHO: bool = False  # логировать каждый SQL-запрос
+    DB_POOL_SIZE: int = 5
+    DB_READ_POOL_SIZE: int = 5
+    
+    # Шарды: URL через запятую (пусто — одна БД DATABASE_URL)
+    SHARD_URLS: str = ""
+    SHARD_DIRECTORY_REFRESH: int = 15  # секунд между чтениями каталога перенесённых
+    
+    # Миграции схемы
+    MIGRATION_CHUNK: int = 5000  # строк в одной транзакции заполнения колонки
+    MIGRATION_LOCK_TIMEOUT: int = 600  # секунд аренды; дольше самой долгой миграции
+    
+    # Единственный писатель с group commit (для SQLite под нагрузкой)
+    WRITE_QUEUE_ENABLED: bool = False
+    WRITE_QUEUE_MAX_BATCH: int = 64  # операций в одной транзакции
+    WRITE_QUEUE_MAX_DELAY_MS: int = 5  # сколько ждать добора пачки
+    
+    # Отложенная запись last_active и счётчиков пользователя
+    ACTIVITY_FLUSH_INTERVAL: int = 10  # секунд между записями (0 — писать сразу)
+    
+    # Кэш пользователей (USER_CACHE_SIZE=0 — выкл)
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 300  # секунд
+    USER_CACHE_NEGATIVE_TTL: int = 30  # для неизвестных telegram_id
+    REDIS_URL: Optional[str] = None  # L2-кэш и рассылка сброса между ботом и API
+    
+    # SQLite (применяется при каждом подключении)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # мс ожидания блокировки вместо "database is locked"
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 МБ
+    SQLITE_CACHE_SIZE: int = -65536  # отрицательное — в КиБ (64 МБ)
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_AUTO_VACUUM: str = "INCREMENTAL"  # действует для новых файлов (старым нужен VACUUM)
+    
+    # Обслуживание SQLite (database/maintenance.py)
+    DB_MAINTENANCE_INTERVAL: int = 15  # минут между проходами (0 — выкл)
+    DB_ANALYSIS_LIMIT: int = 1000  # строк выборки на индекс для PRAGMA optimize
+    DB_QUIET_SECONDS: int = 30  # столько секунд без commit — WAL можно обнулить
+    DB_VACUUM_STEP: int = 256  # страниц за одну транзакцию incremental_vacuum
+    DB_VACUUM_MAX_PAGES: int = 25600  # страниц за один проход
+    DB_VACUUM_PAUSE_MS: int = 50  # пауза между шагами
+    
+    # Резервные копии (database/backup.py)
+    BACKUP_DIR: str = "backups"
+    BACKUP_INTERVAL: int = 1440  # минут между копиями (0 — выкл)
+    BACKUP_KEEP: int = 7  # копий каждого шарда
+    BACKUP_PAGES: int = 256  # страниц SQLite за шаг
+    BACKUP_PAUSE_MS: int = 20  # пауза между шагами
+    BACKUP_MAX_RESTARTS: int = 3  # перезапусков из-за записи до копии за один шаг
+    
+    # Учёт запросов на HTTP-запрос / апдейт / задачу (database/querystats.py)
+    QUERY_TRACE_ENABLED: bool = True
+    QUERY_REPEAT_THRESHOLD: int = 5  # столько одинаковых запросов за трассу — N+1
+    QUERY_BUDGET_STRICT: bool = False  # превышение query_budget — исключение (для тестов)
     
     # App
     DEBUG: bool = True
     SECRET_KEY: str = "your-secret-key-change-in-production"
+    ADMIN_TOKEN: Optional[str] = None  # доступ к /api/v1/admin (None — выкл)
+    
+    # Scheduler
+    SCHEDULER_CHECK_INTERVAL: int = 30  # секунд между проверками
+    PRESTAGE_LOOKAHEAD: int = 60  # за сколько секунд готовить уведомления (0 — выкл)
+    SCHEDULER_BATCH_SIZE: int = 500  # максимум уведомлений за одну проверку
+    SCHEDULER_PER_USER_LIMIT: int = 20  # максимум уведомлений одному пользователю за проверку
+    SEND_RATE_PER_SECOND: int = 30  # лимит Telegram на рассылку
+    FORECAST_INTERVAL: int = 60  # минут между прогнозами нагрузки (0 — выкл)
+    FORECAST_HOURS: int = 24
+    COUNTERS_RECONCILE_INTERVAL: int = 60  # минут между сверками счётчиков (0 — выкл)
+    COUNTERS_RECONCILE_CHUNK: int = 500  # пользователей за транзакцию
+    
+    # Архив завершённых напоминаний
+    ARCHIVE_INTERVAL: int = 60  # минут между переносами в архив (0 — выкл)
+    ARCHIVE_AFTER_DAYS: int = 90  # переносить напоминания старше стольких дней
+    ARCHIVE_CHUNK: int = 1000  # напоминаний за транзакцию
+    
+    # Пересчёт рангов категорий, у которых кончился зазор
+    CATEGORY_REBALANCE_INTERVAL: int = 1440  # минут между проходами (0 — выкл)
+    CATEGORY_REBALANCE_CHUNK: int = 500  # пользователей за транзакцию
     
     # Timezone default
     DEFAULT_TIMEZONE: str = "Europe/Moscow"
+    TZ_REANCHOR_INLINE_LIMIT: int = 500  # больше — пересчёт в фоне
     DEFAULT_LANGUAGE: str = "ru"
     
     class Config:
@@ -0,0 +1,222 @@
+# backend/database/activity.py
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, event, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import settings
+from database.models import User
+from database.cache import user_cache
+from database.writer import run_write
+from database.shards import current_shard, use_shard
+
+logger = logging.getLogger(__name__)
+
+_users = User.__table__
+
+# Ключ session.info: активность, которая попадёт в буфер после commit
+PENDING_ACTIVITY = "activity_pending"
+
+class ActivityBuffer:
+    """
+    Отложенная запись активности пользователей (write-behind).
+    
+    last_active и приращения total_reminders_* копятся в памяти
+    (по одной записи на пользователя) и раз в interval секунд пишутся
+    двумя пакетными UPDATE: x = x + :delta и last_active = max(...).
+    Буфер общий для потоков бота и API, сбрасывает его тот event loop,
+    в котором он запущен. Ключ — (шард, user_id): id у шардов свои.
+    В буфер попадает только закоммиченное: touch/add копят изменения
+    в session.info, after_commit переносит их в буфер.
+    """
+    
+    def __init__(self, interval: float = 10):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._last_active: Dict[tuple, datetime] = {}
+        self._deltas: Dict[tuple, Dict[str, int]] = defaultdict(lambda: {"created": 0, "completed": 0})
+        self._task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Статистика
+        self.flushes = 0
+        self.updates = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    # ===== Накопление =====
+    
+    def touch(self, session: AsyncSession, user_id: int, when: datetime):
+        """Отметить активность — попадёт в буфер после commit session"""
+        self._defer(session, user_id, when=when)
+    
+    def add(self, session: AsyncSession, user_id: int, created: int = 0, completed: int = 0):
+        """Приращения счётчиков — попадут в буфер после commit session"""
+        self._defer(session, user_id, created=created, completed=completed)
+    
+    def _defer(self, session: AsyncSession, user_id: int, **change):
+        # Как сброс кэша: откат сессии (или повтор операции писателем
+        # после отката пачки) не должен оставить приращение в буфере
+        if not session.in_transaction():
+            # Транзакция без подключения: владелец сессии закоммитит её,
+            # даже если запросов больше не будет (commit без SQL)
+            session.sync_session.begin()
+        session.sync_session.info.setdefault(PENDING_ACTIVITY, []).append(
+            ((current_shard.get(), user_id), change)
+        )
+    
+    def _after_commit(self, session: Session):
+        for key, change in session.info.pop(PENDING_ACTIVITY, ()):
+            if "when" in change:
+                self._touch(key, change["when"])
+            else:
+                self._add(key, change["created"], change["completed"])
+    
+    def _after_rollback(self, session: Session):
+        session.info.pop(PENDING_ACTIVITY, None)
+    
+    def _touch(self, key: tuple, when: datetime):
+        with self._lock:
+            if when > self._last_active.get(key, when.min):
+                self._last_active[key] = when
+    
+    def _add(self, key: tuple, created: int, completed: int):
+        with self._lock:
+            delta = self._deltas[key]
+            delta["created"] += created
+            delta["completed"] += completed
+    
+    def _take(self) -> tuple:
+        with self._lock:
+            last_active, self._last_active = self._last_active, {}
+            deltas = dict(self._deltas)
+            self._deltas.clear()
+        return last_active, deltas
+    
+    def _restore(self, last_active: dict, deltas: dict):
+        """Вернуть не записанное обратно (запись не удалась)"""
+        for key, when in last_active.items():
+            self._touch(key, when)
+        for key, delta in deltas.items():
+            self._add(key, delta["created"], delta["completed"])
+    
+    # ===== Запись =====
+    
+    async def flush(self):
+        last_active, deltas = self._take()
+        
+        for shard in {key[0] for key in [*last_active, *deltas]}:
+            shard_last_active = {
+                user_id: when for (s, user_id), when in last_active.items() if s == shard
+            }
+            shard_deltas = {
+                user_id: delta for (s, user_id), delta in deltas.items() if s == shard
+            }
+            
+            try:
+                with use_shard(shard):
+                    await run_write(
+                        lambda session: self._write(session, shard_last_active, shard_deltas)
+                    )
+            except Exception as e:
+                logger.error(f"Не удалось записать активность пользователей (шард {shard}): {e}")
+                self._restore(
+                    {(shard, user_id): when for user_id, when in shard_last_active.items()},
+                    {(shard, user_id): delta for user_id, delta in shard_deltas.items()}
+                )
+                continue
+            
+            self.flushes += 1
+            self.updates += len(shard_last_active) + len(shard_deltas)
+    
+    async def _write(self, session: AsyncSession, last_active: dict, deltas: dict):
+        if deltas:
+            await session.execute(
+                _users.update()
+                .where(_users.c.id == bindparam("b_id"))
+                .values(
+                    total_reminders_created=_users.c.total_reminders_created + bindparam("b_created"),
+                    total_reminders_completed=_users.c.total_reminders_completed + bindparam("b_completed")
+                ),
+                [
+                    {"b_id": user_id, "b_created": delta["created"], "b_completed": delta["completed"]}
+                    for user_id, delta in deltas.items()
+                ]
+            )
+            
+            # Счётчики видны в профиле — сбрасываем кэш. last_active
+            # в кэше может отставать: по нему ничего не решается
+            telegram_ids = await session.scalars(
+                select(User.telegram_id).where(User.id.in_(list(deltas)))
+            )
+            for telegram_id in telegram_ids:
+                user_cache.invalidate(session, telegram_id)
+        
+        if last_active:
+            await session.execute(
+                _users.update()
+                .where(
+                    _users.c.id == bindparam("b_id"),
+                    or_(
+                        _users.c.last_active.is_(None),
+                        _users.c.last_active < bindparam("b_last_active")
+                    )
+                )
+                .values(last_active=bindparam("b_last_active")),
+                [
+                    {"b_id": user_id, "b_last_active": when}
+                    for user_id, when in last_active.items()
+                ]
+            )
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+    
+    # ===== Жизненный цикл =====
+    
+    async def start(self):
+        if self._interval <= 0 or self.running:
+            return
+        
+        self.loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run(), name="activity-flush")
+        logger.info("Буфер активности запущен")
+    
+    async def stop(self):
+        """Останавливает периодическую запись и дописывает остаток"""
+        
+        if not self.running or self.loop is not asyncio.get_running_loop():
+            return
+        
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        
+        await self.flush()
+        logger.info(f"Буфер активности остановлен: {self.updates} обновлений в {self.flushes} записях")
+
+# Глобальный экземпляр
+activity_buffer = ActivityBuffer(interval=settings.ACTIVITY_FLUSH_INTERVAL)
+
+event.listen(Session, "after_commit", activity_buffer._after_commit)
+event.listen(Session, "after_rollback", activity_buffer._after_rollback)
+
+async def start_activity():
+    await activity_buffer.start()
+
+async def stop_activity():
+    await activity_buffer.stop()
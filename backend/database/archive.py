@@ -0,0 +1,45 @@
+# backend/database/archive.py
+"""
+Архив напоминаний.
+
+Напоминания в конечном состоянии старше ARCHIVE_AFTER_DAYS переносятся
+из reminders в reminders_archive (ReminderRepository.archive_terminal),
+чтобы не раздувать индексы планировщика и активных списков. История
+целиком читается через представление reminders_all.
+"""
+
+from sqlalchemy import Column, MetaData, Table, text
+
+from database.models import Reminder, ArchivedReminder
+
+VIEW_NAME = "reminders_all"
+
+_COLUMNS = [column.name for column in Reminder.__table__.columns]
+
+# Представление не создаётся через create_all — отдельная MetaData
+reminders_all = Table(
+    VIEW_NAME,
+    MetaData(),
+    *[
+        Column(column.name, column.type, primary_key=column.primary_key)
+        for column in Reminder.__table__.columns
+    ]
+)
+
+def _view_sql() -> str:
+    columns = ", ".join(_COLUMNS)
+    return (
+        f"SELECT {columns} FROM {Reminder.__tablename__} "
+        f"UNION ALL "
+        f"SELECT {columns} FROM {ArchivedReminder.__table__.name}"
+    )
+
+def install_archive_view(sync_conn):
+    """Создаёт (или пересоздаёт) представление reminders_all"""
+    
+    if sync_conn.dialect.name == "postgresql":
+        sync_conn.execute(text(f"CREATE OR REPLACE VIEW {VIEW_NAME} AS {_view_sql()}"))
+    else:
+        # В SQLite нет CREATE OR REPLACE VIEW; колонки могли измениться
+        sync_conn.execute(text(f"DROP VIEW IF EXISTS {VIEW_NAME}"))
+        sync_conn.execute(text(f"CREATE VIEW {VIEW_NAME} AS {_view_sql()}"))
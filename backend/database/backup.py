@@ -0,0 +1,365 @@
+# backend/database/backup.py
+"""
+Резервные копии БД (каждого шарда).
+
+SQLite — online backup API: страницы копируются шагами по BACKUP_PAGES
+с паузой, между шагами блокировка не держится. Если файл меняют
+другие подключения, SQLite начинает копирование заново; после
+BACKUP_MAX_RESTARTS перезапусков копия снимается за один шаг (в WAL это
+только снимок чтения — писатели не ждут).
+
+PostgreSQL — pg_dump в снимке транзакции REPEATABLE READ, в том же
+снимке считаются строки таблиц; сжимает дамп сам pg_dump.
+
+Копия пишется потоком в gzip (shardN-YYYYmmdd-HHMMSS.db.gz / .sql.gz),
+рядом — манифест .json с числом строк и sha256. Проверка открывает копию
+(SQLite — распаковывает и выполняет quick_check, PostgreSQL — разбирает
+блоки COPY) и сверяет число строк с манифестом. Хранятся последние
+BACKUP_KEEP копий каждого шарда.
+
+    python -m database.backup
+    python -m database.backup verify backups/shard0-20260101-030000.db.gz
+    python -m database.backup list
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from database.database import engines, sqlite_path
+from database.models import Base
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, число строк которых сверяется при проверке
+TABLES = [table.name for table in Base.metadata.sorted_tables]
+
+_COPY = re.compile(r"^COPY (?:\w+\.)?\"?(\w+)\"? \(")
+_DUMP_COMPLETE = "-- PostgreSQL database dump complete"
+
+class BackupError(Exception):
+    """Копия не снята или не прошла проверку"""
+
+class _Restarted(Exception):
+    """Копирование шагами всё время начинается заново"""
+
+@dataclass
+class BackupResult:
+    shard: int
+    path: str
+    size: int
+    seconds: float
+    counts: Dict[str, int]
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _count_sqlite(conn: sqlite3.Connection) -> Dict[str, int]:
+    existing = {
+        name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    return {
+        table: conn.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+        for table in TABLES if table in existing
+    }
+
+# ===== SQLite =====
+
+def _copy_pages(source: sqlite3.Connection, target: sqlite3.Connection):
+    restarts, last_remaining = 0, None
+    
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # После перезапуска остаток возвращается к значению первого шага
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts > settings.BACKUP_MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+        # Между шагами блокировок нет — даём писателям время
+        time.sleep(settings.BACKUP_PAUSE_MS / 1000)
+    
+    try:
+        source.backup(target, pages=settings.BACKUP_PAGES, progress=progress)
+    except _Restarted:
+        logger.info(f"Копия перезапускалась {restarts} раз, снимаем за один шаг")
+        source.backup(target)
+
+def _backup_sqlite(source_path: str, dest: str) -> Dict[str, int]:
+    """Снимок в несжатый временный файл, затем поток в gzip"""
+    
+    fd, snapshot = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(dest))
+    os.close(fd)
+    
+    try:
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        target = sqlite3.connect(snapshot)
+        try:
+            _copy_pages(source, target)
+            # Копия — один самодостаточный файл, без -wal и -shm
+            target.execute("PRAGMA journal_mode = DELETE")
+            counts = _count_sqlite(target)
+        finally:
+            target.close()
+            source.close()
+        
+        with open(snapshot, "rb") as raw, gzip.open(dest, "wb") as packed:
+            shutil.copyfileobj(raw, packed, 1 << 20)
+    finally:
+        os.remove(snapshot)
+    
+    return counts
+
+def _verify_sqlite(path: str) -> Dict[str, int]:
+    fd, restored = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(path))
+    os.close(fd)
+    
+    try:
+        with gzip.open(path, "rb") as packed, open(restored, "wb") as raw:
+            shutil.copyfileobj(packed, raw, 1 << 20)
+        
+        conn = sqlite3.connect(f"file:{restored}?mode=ro", uri=True)
+        try:
+            (check,), = conn.execute("PRAGMA quick_check").fetchall()[:1]
+            if check != "ok":
+                raise BackupError(f"{path}: quick_check: {check}")
+            return _count_sqlite(conn)
+        finally:
+            conn.close()
+    finally:
+        os.remove(restored)
+
+# ===== PostgreSQL =====
+
+def _pg_dump_command(engine: AsyncEngine, snapshot: str, dest: str) -> tuple:
+    url = engine.url
+    command = [
+        "pg_dump",
+        "--no-owner",
+        "--no-privileges",
+        f"--snapshot={snapshot}",
+        # Текстовый дамп, сжатый самим pg_dump: тот же gzip, но
+        # не на event loop бота
+        "--compress=6",
+        f"--file={dest}",
+        "-h", url.host or "localhost",
+        "-p", str(url.port or 5432),
+        "-U", url.username or "postgres",
+        "-d", url.database,
+    ]
+    env = dict(os.environ)
+    if url.password:
+        env["PGPASSWORD"] = url.password
+    return command, env
+
+async def _backup_postgres(engine: AsyncEngine, dest: str) -> Dict[str, int]:
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        
+        async with conn.begin():
+            # Снимок держится, пока открыта транзакция
+            snapshot = await conn.scalar(text("SELECT pg_export_snapshot()"))
+            
+            existing = set(await conn.run_sync(
+                lambda sync_conn: sync_conn.dialect.get_table_names(sync_conn)
+            ))
+            counts = {}
+            for table in Base.metadata.sorted_tables:
+                if table.name in existing:
+                    counts[table.name] = await conn.scalar(select(func.count()).select_from(table))
+            
+            command, env = _pg_dump_command(engine, snapshot, dest)
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                env=env,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise BackupError(f"pg_dump: {stderr.decode(errors='replace').strip()}")
+    
+    return counts
+
+def _verify_postgres(path: str) -> Dict[str, int]:
+    counts, table, complete = {}, None, False
+    
+    with gzip.open(path, "rt", encoding="utf-8") as dump:
+        for line in dump:
+            if table is not None:
+                if line.rstrip("\n") == "\\.":
+                    table = None
+                else:
+                    counts[table] += 1
+                continue
+            
+            match = _COPY.match(line)
+            if match is not None and match.group(1) in TABLES:
+                table = match.group(1)
+                counts[table] = 0
+            elif line.startswith(_DUMP_COMPLETE):
+                complete = True
+    
+    if not complete:
+        raise BackupError(f"{path}: дамп оборван")
+    return counts
+
+# ===== Копия, проверка, ротация =====
+
+def _manifest_path(path: str) -> str:
+    return path + ".json"
+
+def verify_backup(path: str) -> Dict[str, int]:
+    """
+    Открывает копию и сверяет её с манифестом (sha256 и число строк).
+    Возвращает число строк по таблицам, при расхождении — BackupError.
+    """
+    
+    with open(_manifest_path(path)) as file:
+        manifest = json.load(file)
+    
+    if _sha256(path) != manifest["sha256"]:
+        raise BackupError(f"{path}: sha256 не совпадает с манифестом")
+    
+    if manifest["dialect"] == "postgresql":
+        counts = _verify_postgres(path)
+    else:
+        counts = _verify_sqlite(path)
+    
+    if counts != manifest["counts"]:
+        raise BackupError(f"{path}: строк {counts}, в манифесте {manifest['counts']}")
+    
+    return counts
+
+def list_backups(shard: int) -> List[str]:
+    """Копии шарда, от старых к новым"""
+    
+    if not os.path.isdir(settings.BACKUP_DIR):
+        return []
+    
+    pattern = re.compile(rf"^shard{shard}-\d{{8}}-\d{{6}}\.(db|sql)\.gz$")
+    return sorted(
+        os.path.join(settings.BACKUP_DIR, name)
+        for name in os.listdir(settings.BACKUP_DIR)
+        if pattern.match(name)
+    )
+
+def rotate_backups(shard: int, keep: int) -> List[str]:
+    """Удаляет старые копии шарда сверх keep, возвращает удалённые"""
+    
+    removed = list_backups(shard)[:-keep] if keep > 0 else []
+    for path in removed:
+        for name in (path, _manifest_path(path)):
+            if os.path.exists(name):
+                os.remove(name)
+    return removed
+
+async def backup_shard(shard: int) -> BackupResult:
+    """Снимает, проверяет копию шарда и удаляет старые"""
+    
+    engine = engines[shard]
+    dialect = engine.dialect.name
+    source_path = sqlite_path(engine.url)
+    
+    if dialect != "postgresql" and source_path is None:
+        raise BackupError(f"Шард {shard}: копировать можно файл SQLite или PostgreSQL")
+    
+    os.makedirs(settings.BACKUP_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    extension = "sql" if dialect == "postgresql" else "db"
+    path = os.path.join(settings.BACKUP_DIR, f"shard{shard}-{stamp}.{extension}.gz")
+    partial = path + ".part"
+    
+    started = time.perf_counter()
+    try:
+        if dialect == "postgresql":
+            counts = await _backup_postgres(engine, partial)
+        else:
+            counts = await asyncio.to_thread(_backup_sqlite, source_path, partial)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    
+    with open(_manifest_path(path), "w") as file:
+        json.dump({
+            "shard": shard,
+            "dialect": dialect,
+            "created_at": stamp,
+            "sha256": _sha256(path),
+            "counts": counts,
+        }, file, indent=2)
+    
+    await asyncio.to_thread(verify_backup, path)
+    
+    for removed in rotate_backups(shard, settings.BACKUP_KEEP):
+        logger.info(f"Удалена старая копия {removed}")
+    
+    return BackupResult(
+        shard=shard,
+        path=path,
+        size=os.path.getsize(path),
+        seconds=time.perf_counter() - started,
+        counts=counts
+    )
+
+async def backup_all() -> List[BackupResult]:
+    return [await backup_shard(shard) for shard in range(len(engines))]
+
+# ===== CLI =====
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Резервные копии БД")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "verify", "list"])
+    parser.add_argument("path", nargs="?", help="файл копии (для verify)")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
+    if args.command == "verify":
+        if not args.path:
+            parser.error("verify: укажите файл копии")
+        try:
+            counts = verify_backup(args.path)
+        except BackupError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ {args.path}: {counts}")
+        return
+    
+    if args.command == "list":
+        for shard in range(len(engines)):
+            for path in list_backups(shard):
+                print(f"{path}  {os.path.getsize(path)} байт")
+        return
+    
+    for result in asyncio.run(backup_all()):
+        print(
+            f"✅ {result.path}: {result.size} байт за {result.seconds:.1f} с, "
+            f"строк: {sum(result.counts.values())}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# backend/database/cache.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Tuple
+
+from sqlalchemy import DateTime, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from config import settings
+from database.models import User
+from database.shards import current_shard
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis необязателен: без него работает только L1
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Ключ session.info: ключи, которые нужно сбросить после commit
+PENDING_INVALIDATIONS = "user_cache_invalidate"
+
+REDIS_KEY = "user:tg:{}:{}"
+REDIS_CHANNEL = "user-cache-invalidate"
+
+# После сброса ключ L2 на это время занят отметкой, а put пишет только
+# в свободный ключ (SET NX): данные, прочитанные до чужого commit, не
+# вернутся в Redis после его сброса
+REDIS_TOMBSTONE = "invalidated"
+TOMBSTONE_TTL = 5  # секунд
+
+# Отметка «такого пользователя нет» (негативное кэширование)
+_MISSING = object()
+
+_COLUMNS = [column.key for column in User.__table__.columns]
+_DATETIME_COLUMNS = {
+    column.key for column in User.__table__.columns
+    if isinstance(column.type, DateTime)
+}
+
+def _dump(user: User) -> dict:
+    return {key: getattr(user, key) for key in _COLUMNS}
+
+def _to_json(data) -> str:
+    if data is _MISSING:
+        return "null"
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in data.items()
+    })
+
+def _key(telegram_id: int) -> Tuple[int, int]:
+    # Шард в ключе: после переноса пользователя запись с id
+    # из прежнего шарда не найдётся
+    return current_shard.get(), telegram_id
+
+def _from_json(raw: str):
+    data = json.loads(raw)
+    if data is None:
+        return _MISSING
+    for key in _DATETIME_COLUMNS:
+        if data.get(key):
+            data[key] = datetime.fromisoformat(data[key])
+    return data
+
+class UserCache:
+    """
+    Кэш пользователей по (шард, telegram_id).
+    
+    L1 — LRU с TTL в памяти процесса (общий для потоков бота и API),
+    L2 — Redis, если задан REDIS_URL. Хранятся значения колонок, а не
+    ORM-объекты: при попадании объект собирается заново и присоединяется
+    к сессии вызывающего без запроса к БД.
+    
+    Клиент Redis привязан к event loop, в котором вызван start(); из
+    другого loop (API в потоке бота, run_bot.py) команды передаются
+    в него через run_coroutine_threadsafe.
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl: int = 300, negative_ttl: int = 30):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._entries: OrderedDict = OrderedDict()  # (шард, telegram_id) -> (expires, data)
+        self._lock = threading.Lock()
+        
+        # Растёт при каждом сбросе: данные, прочитанные из БД до сброса,
+        # в кэш уже не кладём
+        self.version = 0
+        
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        # Ссылки на рассылки сброса, чтобы задачи не собрал GC
+        self._broadcasts = set()
+        
+        # Статистика
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+    
+    # ===== L1 =====
+    
+    def _get_local(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return data
+    
+    def _put_local(self, key: tuple, data):
+        ttl = self._negative_ttl if data is _MISSING else self._ttl
+        
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, data)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+    
+    def _drop_local(self, key: tuple):
+        with self._lock:
+            self.version += 1
+            self._entries.pop(key, None)
+    
+    # ===== Redis =====
+    
+    async def _on_redis(self, command: Callable[[], Awaitable]):
+        """Выполнить команду Redis в event loop клиента"""
+        if self._loop is asyncio.get_running_loop():
+            return await command()
+        
+        async def run():
+            return await command()
+        
+        future = asyncio.run_coroutine_threadsafe(run(), self._loop)
+        return await asyncio.wrap_future(future)
+    
+    # ===== Чтение / запись =====
+    
+    async def get(self, session: AsyncSession, telegram_id: int) -> Tuple[bool, Optional[User]]:
+        """
+        (найдено ли в кэше, User присоединённый к session или None,
+        если известно, что такого пользователя нет)
+        """
+        
+        key = _key(telegram_id)
+        data = self._get_local(key)
+        
+        if data is None and self._redis is not None:
+            try:
+                raw = await self._on_redis(lambda: self._redis.get(REDIS_KEY.format(*key)))
+            except Exception as e:
+                logger.warning(f"Redis недоступен: {e}")
+                raw = None
+            if raw is not None and raw != REDIS_TOMBSTONE:
+                data = _from_json(raw)
+                self._put_local(key, data)
+        
+        if data is None:
+            self.misses += 1
+            return False, None
+        
+        self.hits += 1
+        
+        if data is _MISSING:
+            return True, None
+        
+        user = User(**data)
+        make_transient_to_detached(user)
+        return True, await session.merge(user, load=False)
+    
+    async def put(self, telegram_id: int, user: Optional[User], version: int):
+        """Положить прочитанное из БД (version — значение self.version до чтения)"""
+        
+        if version != self.version:
+            return
+        
+        key = _key(telegram_id)
+        data = _dump(user) if user is not None else _MISSING
+        self._put_local(key, data)
+        
+        if self._redis is not None:
+            ttl = self._negative_ttl if data is _MISSING else self._ttl
+            try:
+                await self._on_redis(
+                    lambda: self._redis.set(REDIS_KEY.format(*key), _to_json(data), ex=ttl, nx=True)
+                )
+            except Exception as e:
+                logger.warning(f"Redis недоступен: {e}")
+    
+    # ===== Инвалидация =====
+    
+    def invalidate(self, session: AsyncSession, telegram_id: Optional[int]):
+        """
+        Сбросить запись сейчас и ещё раз после commit сессии (чтобы
+        параллельное чтение не вернуло в кэш данные до commit).
+        """
+        
+        if telegram_id is None:
+            return
+        
+        key = _key(telegram_id)
+        self._drop_local(key)
+        session.sync_session.info.setdefault(PENDING_INVALIDATIONS, set()).add(key)
+    
+    def _after_commit(self, session: Session):
+        keys = session.info.pop(PENDING_INVALIDATIONS, None)
+        if not keys:
+            return
+        
+        for key in keys:
+            self._drop_local(key)
+        
+        if self._redis is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._start_broadcast, keys)
+            except RuntimeError as e:
+                # Loop клиента уже закрыт
+                logger.warning(f"Не удалось разослать сброс кэша: {e}")
+    
+    def _after_rollback(self, session: Session):
+        # Изменения не записаны; локально запись уже сброшена в invalidate()
+        session.info.pop(PENDING_INVALIDATIONS, None)
+    
+    def _start_broadcast(self, keys):
+        task = asyncio.create_task(self._broadcast(keys))
+        self._broadcasts.add(task)
+        task.add_done_callback(self._broadcast_done)
+    
+    def _broadcast_done(self, task: asyncio.Task):
+        self._broadcasts.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Рассылка сброса кэша упала", exc_info=task.exception())
+    
+    async def _broadcast(self, keys):
+        """Сбросить L2 (отметкой на TOMBSTONE_TTL) и L1 других процессов"""
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(REDIS_KEY.format(*key), REDIS_TOMBSTONE, ex=TOMBSTONE_TTL)
+                await pipe.execute()
+            await self._redis.publish(REDIS_CHANNEL, ",".join(f"{shard}:{tid}" for shard, tid in keys))
+        except Exception as e:
+            logger.warning(f"Не удалось разослать сброс кэша: {e}")
+    
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(REDIS_CHANNEL)
+        
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                for item in message["data"].split(","):
+                    shard, telegram_id = item.split(":")
+                    self._drop_local((int(shard), int(telegram_id)))
+        finally:
+            await pubsub.close()
+    
+    # ===== Жизненный цикл =====
+    
+    async def start(self, redis_url: Optional[str] = None):
+        if not redis_url or self._redis is not None:
+            return
+        
+        if aioredis is None:
+            logger.warning("REDIS_URL задан, но пакет redis не установлен — кэш только в памяти")
+            return
+        
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+        self._loop = asyncio.get_running_loop()
+        self._listener = asyncio.create_task(self._listen(), name="user-cache-listener")
+        logger.info("Кэш пользователей: Redis подключён")
+    
+    async def stop(self):
+        if self._listener is None or self._listener.get_loop() is not asyncio.get_running_loop():
+            return
+        
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        
+        # Сбросы, разосланные перед остановкой
+        await asyncio.gather(*self._broadcasts, return_exceptions=True)
+        
+        await self._redis.close()
+        self._redis = None
+        self._loop = None
+        self._listener = None
+
+# Глобальный экземпляр
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL
+)
+
+event.listen(Session, "after_commit", user_cache._after_commit)
+event.listen(Session, "after_rollback", user_cache._after_rollback)
+
+async def start_cache():
+    await user_cache.start(settings.REDIS_URL)
+
+async def stop_cache():
+    await user_cache.stop()
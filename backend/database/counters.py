@@ -0,0 +1,124 @@
+# backend/database/counters.py
+"""
+Счётчики напоминаний по статусам (user_reminder_counters).
+
+Ведутся триггерами на reminders, поэтому учитывают любые изменения:
+ORM, массовые UPDATE и каскадное удаление. Сверка с реальными данными —
+ReminderRepository.reconcile_counters.
+"""
+
+from typing import Optional
+
+from sqlalchemy import text
+
+from database.models import ReminderStatus
+
+COUNTERS_TABLE = "user_reminder_counters"
+
+# Колонка счётчика для каждого статуса (в БД enum хранится по имени)
+STATUS_COLUMNS = {status.name: status.value for status in ReminderStatus}
+
+# Те же счётчики для напоминаний, перенесённых в архив
+ARCHIVED_PREFIX = "archived_"
+COUNTER_COLUMNS = list(STATUS_COLUMNS.values()) + [
+    ARCHIVED_PREFIX + column for column in STATUS_COLUMNS.values()
+]
+
+def _changes(row: str, sign: str) -> str:
+    """SET-часть: +1/-1 к счётчику статуса строки OLD/NEW"""
+    return ", ".join(
+        f"{column} = {column} {sign} CASE WHEN {row}.status = '{name}' THEN 1 ELSE 0 END"
+        for name, column in STATUS_COLUMNS.items()
+    )
+
+def _add(row: str) -> list:
+    return [
+        f"INSERT INTO {COUNTERS_TABLE} (user_id, {', '.join(STATUS_COLUMNS.values())}) "
+        f"VALUES ({row}.user_id, {', '.join('0' for _ in STATUS_COLUMNS)}) "
+        f"ON CONFLICT (user_id) DO NOTHING",
+        f"UPDATE {COUNTERS_TABLE} SET {_changes(row, '+')} WHERE user_id = {row}.user_id",
+    ]
+
+def _remove(row: str) -> list:
+    return [f"UPDATE {COUNTERS_TABLE} SET {_changes(row, '-')} WHERE user_id = {row}.user_id"]
+
+def _sqlite_triggers() -> list:
+    def trigger(name: str, event: str, body: list, when: str = "") -> str:
+        statements = "".join(f"{statement}; " for statement in body)
+        return (
+            f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON reminders "
+            f"{when}BEGIN {statements}END"
+        )
+    
+    return [
+        trigger("trg_reminder_counters_insert", "INSERT", _add("NEW")),
+        trigger("trg_reminder_counters_delete", "DELETE", _remove("OLD")),
+        trigger(
+            "trg_reminder_counters_update",
+            "UPDATE OF status, user_id",
+            _remove("OLD") + _add("NEW"),
+            when="FOR EACH ROW WHEN OLD.status IS NOT NEW.status OR OLD.user_id IS NOT NEW.user_id "
+        ),
+    ]
+
+def _postgres_triggers() -> list:
+    old = "".join(f"{statement}; " for statement in _remove("OLD"))
+    new = "".join(f"{statement}; " for statement in _add("NEW"))
+    
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION reminder_counters() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.status = NEW.status AND OLD.user_id = NEW.user_id THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN {old}END IF;
+            IF TG_OP IN ('UPDATE', 'INSERT') THEN {new}END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_reminder_counters ON reminders",
+        """
+        CREATE TRIGGER trg_reminder_counters
+        AFTER INSERT OR DELETE OR UPDATE OF status, user_id ON reminders
+        FOR EACH ROW EXECUTE FUNCTION reminder_counters()
+        """,
+    ]
+
+def rebuild_counters_sql(min_user_id: int = 0, max_user_id: Optional[int] = None) -> str:
+    """
+    Пересчитать счётчики пользователей с id в [min_user_id, max_user_id).
+    Строку, которую успел завести триггер, перезаписывает; расхождение
+    с параллельной записью исправит reconcile_counters.
+    """
+    
+    sums = ", ".join(
+        f"SUM(CASE WHEN status = '{name}' THEN 1 ELSE 0 END)"
+        for name in STATUS_COLUMNS
+    )
+    where = f"user_id >= {int(min_user_id)}"
+    if max_user_id is not None:
+        where += f" AND user_id < {int(max_user_id)}"
+    
+    return (
+        f"INSERT INTO {COUNTERS_TABLE} (user_id, {', '.join(STATUS_COLUMNS.values())}) "
+        f"SELECT user_id, {sums} FROM reminders "
+        f"WHERE {where} GROUP BY user_id "
+        f"ON CONFLICT (user_id) DO UPDATE SET "
+        + ", ".join(f"{column} = excluded.{column}" for column in STATUS_COLUMNS.values())
+    )
+
+def install_counters(sync_conn):
+    """
+    Создаёт триггеры (идемпотентно). Счётчики уже существующих
+    напоминаний заполняет rebuild_counters_sql (миграция v0002 — порциями).
+    """
+    
+    if sync_conn.dialect.name == "postgresql":
+        statements = _postgres_triggers()
+    else:
+        statements = _sqlite_triggers()
+    
+    for statement in statements:
+        sync_conn.execute(text(statement))
@@ -1,34 +1,166 @@
 # backend/database/database.py (обновлённый)
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import (
     create_async_engine, 
+    AsyncEngine,
     AsyncSession, 
     async_sessionmaker
 )
-from typing import AsyncGenerator
-from .models import Base
+from typing import AsyncGenerator, List, Optional
+from .migrations import migrate
+from .shards import current_shard, shard_router
+from .repositories.base import DEFER_COMMIT
+from .querystats import instrument
 from config import settings
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True
-)
+def _sqlite_pragmas(read_only: bool = False) -> list:
+    """PRAGMA для каждого нового подключения к SQLite"""
+    
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size = {settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA temp_store = {settings.SQLITE_TEMP_STORE}",
+        "PRAGMA foreign_keys = ON",
+    ]
+    
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode и auto_vacuum хранятся в файле БД, достаточно писателя;
+        # auto_vacuum должен быть задан до создания первой таблицы
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        pragmas.insert(0, f"PRAGMA auto_vacuum = {settings.SQLITE_AUTO_VACUUM}")
+    
+    return pragmas
 
-async_session = async_sessionmaker(
-    engine, 
-    class_=AsyncSession, 
-    expire_on_commit=False
-)
+def sqlite_path(url) -> Optional[str]:
+    """Путь к файлу SQLite (None — другая СУБД или БД в памяти)"""
+    url = make_url(str(url))
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.database
+
+def _is_file_sqlite(url: str) -> bool:
+    return sqlite_path(url) is not None
+
+def create_engine_for(
+    url: str, 
+    read_only: bool = False, 
+    pool_size: int = 5, 
+    **kwargs
+) -> AsyncEngine:
+    """Создаёт движок; для SQLite навешивает PRAGMA на подключение"""
+    
+    if _is_file_sqlite(url):
+        # aiosqlite по умолчанию открывает файл заново на каждую сессию
+        kwargs.setdefault("poolclass", AsyncAdaptedQueuePool)
+    
+    if make_url(url).get_backend_name() != "sqlite" or "poolclass" in kwargs:
+        kwargs["pool_size"] = pool_size
+    
+    new_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        future=True,
+        **kwargs
+    )
+    
+    if make_url(url).get_backend_name() == "sqlite":
+        pragmas = _sqlite_pragmas(read_only)
+        
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+    
+    if settings.QUERY_TRACE_ENABLED:
+        instrument(new_engine)
+    
+    return new_engine
+
+def _read_engine_for(url: str, write_engine: AsyncEngine) -> AsyncEngine:
+    """Отдельный пул для чтения: в WAL читатели не ждут писателя"""
+    
+    if settings.DATABASE_READ_URL and shard_router.count == 1:
+        return create_engine_for(
+            settings.DATABASE_READ_URL,
+            read_only=True,
+            pool_size=settings.DB_READ_POOL_SIZE
+        )
+    if _is_file_sqlite(url):
+        return create_engine_for(
+            url,
+            read_only=True,
+            pool_size=settings.DB_READ_POOL_SIZE
+        )
+    return write_engine
+
+class ShardSessionmaker:
+    """async_sessionmaker текущего шарда (current_shard)"""
+    
+    def __init__(self, engines: List[AsyncEngine]):
+        self._makers = [
+            async_sessionmaker(shard_engine, class_=AsyncSession, expire_on_commit=False)
+            for shard_engine in engines
+        ]
+    
+    def __call__(self, **kwargs) -> AsyncSession:
+        return self._makers[current_shard.get()](**kwargs)
+    
+    def for_shard(self, shard: int) -> async_sessionmaker:
+        return self._makers[shard]
+
+engines = [
+    create_engine_for(url, pool_size=settings.DB_POOL_SIZE)
+    for url in shard_router.urls
+]
+read_engines = [
+    _read_engine_for(url, shard_engine)
+    for url, shard_engine in zip(shard_router.urls, engines)
+]
+
+# Шард 0 (единственный без шардирования)
+engine = engines[0]
+read_engine = read_engines[0]
+
+async_session = ShardSessionmaker(engines)
+async_read_session = ShardSessionmaker(read_engines)
+
+# Каталог перенесённых пользователей хранится в шарде 0
+shard_router.attach(engine)
 
 async def init_db():
-    """Инициализация базы данных"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Доводит схему всех шардов до последней миграции"""
+    
+    await migrate(engines)
+    await shard_router.refresh()
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency для FastAPI"""
+    """
+    Dependency для FastAPI: одна транзакция на запрос. Репозитории
+    только flush, commit — после обработчика (до отправки ответа).
+    """
     async with async_session() as session:
+        session.info[DEFER_COMMIT] = True
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency для FastAPI: сессия только для чтения"""
+    async with async_read_session() as session:
         try:
             yield session
         finally:
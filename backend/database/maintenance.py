@@ -0,0 +1,244 @@
+# backend/database/maintenance.py
+"""
+Обслуживание файлов SQLite (каждого шарда).
+
+Раз в DB_MAINTENANCE_INTERVAL минут:
+- PRAGMA optimize с analysis_limit — статистика планировщика
+  обновляется только для изменившихся таблиц и по выборке строк;
+- incremental_vacuum по DB_VACUUM_STEP страниц за транзакцию;
+- wal_checkpoint: PASSIVE всегда, TRUNCATE (обнуляет файл WAL) — если
+  в этом процессе DB_QUIET_SECONDS не было commit.
+
+Ни один шаг не ждёт блокировку: на время обслуживания busy_timeout
+подключения равен 0, занятая БД — пропуск до следующего прохода.
+PostgreSQL обслуживает autovacuum, его шарды пропускаются.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import settings
+from database.database import engines, sqlite_path
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ShardMaintenance:
+    """Состояние обслуживания одного шарда"""
+    shard: int
+    path: Optional[str]
+    last_commit: float = 0.0
+    last_run: Optional[datetime] = None
+    last_duration_ms: float = 0.0
+    optimizes: int = 0
+    checkpoints: int = 0
+    truncates: int = 0
+    busy_skips: int = 0
+    vacuumed_pages: int = 0
+    errors: List[str] = field(default_factory=list)
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _is_busy(error: Exception) -> bool:
+    message = str(getattr(error, "orig", error)).lower()
+    return "locked" in message or "busy" in message
+
+async def _pragma(conn: AsyncConnection, statement: str) -> list:
+    result = await conn.exec_driver_sql(f"PRAGMA {statement}")
+    return result.fetchall() if result.returns_rows else []
+
+async def _incremental_vacuum(conn: AsyncConnection, pages: int):
+    # execute() освобождает одну страницу: у PRAGMA нет колонок, и драйвер
+    # не шагает дальше. executescript выполняет её до конца
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+
+class DbMaintenance:
+    """Периодическое обслуживание БД шардов"""
+    
+    def __init__(self, engines: List[AsyncEngine], interval: float):
+        self._engines = engines
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        self.shards: Dict[int, ShardMaintenance] = {}
+        for shard, engine in enumerate(engines):
+            state = ShardMaintenance(shard=shard, path=sqlite_path(engine.url))
+            self.shards[shard] = state
+            if state.path is not None:
+                self._track_commits(engine, state)
+    
+    @staticmethod
+    def _track_commits(engine: AsyncEngine, state: ShardMaintenance):
+        @event.listens_for(engine.sync_engine, "commit")
+        def _on_commit(conn):
+            state.last_commit = time.monotonic()
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    # ===== Проход =====
+    
+    async def run_once(self):
+        for shard, engine in enumerate(self._engines):
+            state = self.shards[shard]
+            if state.path is None:
+                continue
+            
+            started = time.perf_counter()
+            try:
+                await self._maintain(engine, state)
+            except Exception as e:
+                logger.error(f"Ошибка обслуживания БД шарда {shard}: {e}")
+                state.errors = (state.errors + [f"{datetime.utcnow():%Y-%m-%d %H:%M:%S} {e}"])[-5:]
+            
+            state.last_run = datetime.utcnow()
+            state.last_duration_ms = (time.perf_counter() - started) * 1000
+    
+    async def _maintain(self, engine: AsyncEngine, state: ShardMaintenance):
+        async with engine.connect() as conn:
+            await _pragma(conn, "busy_timeout = 0")
+            try:
+                for step in (self._optimize, self._vacuum, self._checkpoint):
+                    try:
+                        await step(conn, state)
+                    except (OperationalError, sqlite3.OperationalError) as e:
+                        if not _is_busy(e):
+                            raise
+                        # БД занята — шаг повторится в следующий проход
+                        state.busy_skips += 1
+            finally:
+                await _pragma(conn, f"busy_timeout = {settings.SQLITE_BUSY_TIMEOUT}")
+    
+    async def _optimize(self, conn: AsyncConnection, state: ShardMaintenance):
+        await _pragma(conn, f"analysis_limit = {settings.DB_ANALYSIS_LIMIT}")
+        await _pragma(conn, "optimize")
+        state.optimizes += 1
+    
+    async def _checkpoint(self, conn: AsyncConnection, state: ShardMaintenance):
+        quiet = time.monotonic() - state.last_commit >= settings.DB_QUIET_SECONDS
+        mode = "TRUNCATE" if quiet else "PASSIVE"
+        
+        busy, _, _ = (await _pragma(conn, f"wal_checkpoint({mode})"))[0]
+        if busy:
+            # Писатель или читатель не дал дойти до конца WAL
+            state.busy_skips += 1
+            return
+        
+        state.checkpoints += 1
+        if quiet:
+            state.truncates += 1
+    
+    async def _vacuum(self, conn: AsyncConnection, state: ShardMaintenance):
+        (auto_vacuum,), = await _pragma(conn, "auto_vacuum")
+        if auto_vacuum != 2:
+            # Не INCREMENTAL: файл создан раньше, нужен однократный VACUUM
+            return
+        
+        vacuumed = 0
+        while vacuumed < settings.DB_VACUUM_MAX_PAGES:
+            (free,), = await _pragma(conn, "freelist_count")
+            if not free:
+                break
+            
+            step = min(free, settings.DB_VACUUM_STEP)
+            await _incremental_vacuum(conn, step)
+            vacuumed += step
+            state.vacuumed_pages += step
+            
+            # Между шагами блокировку успевают взять писатели
+            await asyncio.sleep(settings.DB_VACUUM_PAUSE_MS / 1000)
+    
+    # ===== Метрики =====
+    
+    async def stats(self) -> List[dict]:
+        """Размеры файлов и счётчики обслуживания по шардам"""
+        
+        result = []
+        for shard, engine in enumerate(self._engines):
+            state = self.shards[shard]
+            row = {
+                "shard": shard,
+                "maintained": state.path is not None,
+                "last_run": state.last_run,
+                "last_duration_ms": round(state.last_duration_ms, 1),
+                "optimizes": state.optimizes,
+                "checkpoints": state.checkpoints,
+                "truncates": state.truncates,
+                "busy_skips": state.busy_skips,
+                "vacuumed_pages": state.vacuumed_pages,
+                "errors": state.errors,
+            }
+            
+            if state.path is not None:
+                async with engine.connect() as conn:
+                    (page_size,), = await _pragma(conn, "page_size")
+                    (page_count,), = await _pragma(conn, "page_count")
+                    (freelist,), = await _pragma(conn, "freelist_count")
+                    (auto_vacuum,), = await _pragma(conn, "auto_vacuum")
+                
+                row.update(
+                    page_size=page_size,
+                    page_count=page_count,
+                    freelist_count=freelist,
+                    auto_vacuum=("none", "full", "incremental")[auto_vacuum],
+                    db_bytes=_file_size(state.path),
+                    wal_bytes=_file_size(state.path + "-wal"),
+                )
+            
+            result.append(row)
+        
+        return result
+    
+    # ===== Жизненный цикл =====
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.run_once()
+    
+    async def start(self):
+        if self._interval <= 0 or self.running:
+            return
+        if all(state.path is None for state in self.shards.values()):
+            return
+        
+        self.loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run(), name="db-maintenance")
+        logger.info("Обслуживание БД запущено")
+    
+    async def stop(self):
+        if not self.running or self.loop is not asyncio.get_running_loop():
+            return
+        
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+# Глобальный экземпляр
+db_maintenance = DbMaintenance(engines, interval=settings.DB_MAINTENANCE_INTERVAL * 60)
+
+async def start_maintenance():
+    await db_maintenance.start()
+
+async def stop_maintenance():
+    await db_maintenance.stop()
@@ -0,0 +1,309 @@
+# backend/database/migrations/__init__.py
+"""
+Версионные миграции схемы.
+
+Каждая миграция — модуль vNNNN_<имя>.py в этом пакете с функцией
+upgrade(ctx: MigrationContext). Применённые версии записываются
+в schema_version; при старте (init_db) проверяется одна строка, и если
+БД уже на последней версии, больше ничего не выполняется.
+
+Процессы бота и API стартуют одновременно: миграции применяет тот,
+кто взял аренду в schema_lock, остальные ждут, пока версия дойдёт
+до последней (или аренда истечёт).
+
+Шаги, которые не должны блокировать таблицы, выполняются вне общей
+транзакции: индексы — ctx.create_index (CONCURRENTLY в PostgreSQL),
+заполнение новых колонок — ctx.backfill порциями по первичному ключу
+(другие порционные шаги — по ctx.key_ranges).
+Такая миграция может прерваться на середине, поэтому её шаги
+повторяемы (IF NOT EXISTS, WHERE колонка IS NULL).
+
+    python -m database.migrations status
+    python -m database.migrations upgrade
+"""
+
+import asyncio
+import importlib
+import logging
+import pkgutil
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table,
+    func, insert, inspect, or_, select, text
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.schema import CreateColumn, CreateIndex, Index
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# Одна строка id=1: кто применяет миграции и до какого времени
+schema_lock = Table(
+    "schema_lock",
+    _metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("owner", String(36), nullable=True),
+    Column("expires_at", DateTime, nullable=True),
+)
+
+_MODULE = re.compile(r"^v(\d{4})_(\w+)$")
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[["MigrationContext"], Awaitable[None]]
+
+def _load() -> List[Migration]:
+    migrations = []
+    for module in pkgutil.iter_modules(__path__):
+        match = _MODULE.match(module.name)
+        if match is None:
+            continue
+        upgrade = importlib.import_module(f"{__name__}.{module.name}").upgrade
+        migrations.append(Migration(int(match.group(1)), match.group(2), upgrade))
+    
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Повторяющиеся версии миграций: {versions}")
+    return migrations
+
+MIGRATIONS = _load()
+HEAD = MIGRATIONS[-1].version
+
+class MigrationContext:
+    """Операции миграции над БД одного шарда"""
+    
+    def __init__(self, engine: AsyncEngine, shard: int = 0):
+        self.engine = engine
+        self.shard = shard
+        self.dialect = engine.dialect.name
+    
+    async def run(self, fn: Callable, *args):
+        """fn(sync_conn, *args) в одной транзакции"""
+        async with self.engine.begin() as conn:
+            return await conn.run_sync(fn, *args)
+    
+    async def execute(self, statement: str):
+        async with self.engine.begin() as conn:
+            await conn.execute(text(statement))
+    
+    async def has_table(self, name: str) -> bool:
+        return await self.run(lambda sync_conn: inspect(sync_conn).has_table(name))
+    
+    async def add_column(self, table: Table, name: str) -> bool:
+        """
+        ALTER TABLE ADD COLUMN по описанию колонки в модели (если её нет).
+        Колонка должна быть nullable или с server_default — тогда
+        добавление не переписывает таблицу. Возвращает True, если добавлена.
+        """
+        
+        column = table.c[name]
+        if not column.nullable and column.server_default is None:
+            raise ValueError(f"{table.name}.{name}: NOT NULL без server_default")
+        
+        def add(sync_conn) -> bool:
+            existing = {c["name"] for c in inspect(sync_conn).get_columns(table.name)}
+            if column.name in existing:
+                return False
+            ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            return True
+        
+        return await self.run(add)
+    
+    async def create_index(self, index: Index):
+        """
+        Создаёт индекс, если его нет. В PostgreSQL — CONCURRENTLY
+        (без блокировки записи, вне транзакции); недостроенный после
+        сбоя индекс удаляется и строится заново.
+        """
+        
+        if self.dialect != "postgresql":
+            await self.run(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+            return
+        
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            
+            invalid = await conn.scalar(
+                text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ),
+                {"name": index.name}
+            )
+            if invalid:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+            
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+            await conn.execute(text(
+                re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl)
+            ))
+    
+    async def backfill(
+        self,
+        table: Table,
+        values: dict,
+        where=None,
+        chunk: Optional[int] = None
+    ) -> int:
+        """
+        UPDATE table SET values [WHERE where] порциями по chunk значений
+        первичного ключа, каждая порция — своя короткая транзакция.
+        Возвращает число обновлённых строк.
+        """
+        
+        key = list(table.primary_key.columns)[0]
+        
+        updated = 0
+        async for start, end in self.key_ranges(key, chunk):
+            query = table.update().where(key >= start, key < end).values(values)
+            if where is not None:
+                query = query.where(where)
+            
+            async with self.engine.begin() as conn:
+                updated += (await conn.execute(query)).rowcount
+        
+        return updated
+    
+    async def key_ranges(self, key: Column, chunk: Optional[int] = None) -> AsyncIterator[Tuple[int, int]]:
+        """
+        Полуинтервалы [start, end) целочисленной колонки key от min до max
+        по chunk значений — для порционных шагов, которым не подходит
+        backfill (например, INSERT … SELECT).
+        """
+        
+        chunk = chunk or settings.MIGRATION_CHUNK
+        
+        async with self.engine.connect() as conn:
+            low, high = (await conn.execute(select(func.min(key), func.max(key)))).one()
+        
+        if low is None:
+            return
+        
+        for start in range(low, high + 1, chunk):
+            yield start, start + chunk
+            # Даём приложению записать своё между порциями
+            await asyncio.sleep(0)
+
+# ===== Версия и аренда =====
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Последняя применённая версия (0 — миграций ещё не было)"""
+    
+    try:
+        async with engine.connect() as conn:
+            return await conn.scalar(select(func.max(schema_version.c.version))) or 0
+    except DBAPIError:
+        # Таблицы schema_version ещё нет
+        return 0
+
+async def _acquire(conn: AsyncConnection, owner: str) -> bool:
+    """Взять или продлить аренду"""
+    now = datetime.utcnow()
+    result = await conn.execute(
+        schema_lock.update()
+        .where(
+            schema_lock.c.id == 1,
+            or_(
+                schema_lock.c.owner.is_(None),
+                schema_lock.c.owner == owner,
+                schema_lock.c.expires_at < now
+            )
+        )
+        .values(owner=owner, expires_at=now + timedelta(seconds=settings.MIGRATION_LOCK_TIMEOUT))
+    )
+    return result.rowcount == 1
+
+async def _release(engine: AsyncEngine, owner: str):
+    async with engine.begin() as conn:
+        await conn.execute(
+            schema_lock.update()
+            .where(schema_lock.c.id == 1, schema_lock.c.owner == owner)
+            .values(owner=None, expires_at=None)
+        )
+
+async def _prepare(engine: AsyncEngine):
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(_metadata.create_all)
+    except DBAPIError:
+        # Таблицы одновременно создал другой процесс
+        pass
+    
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(insert(schema_lock).values(id=1))
+    except IntegrityError:
+        pass
+
+async def migrate_engine(engine: AsyncEngine, shard: int = 0) -> List[int]:
+    """Доводит БД до HEAD; возвращает применённые здесь версии"""
+    
+    if await current_version(engine) >= HEAD:
+        return []
+    
+    await _prepare(engine)
+    owner = str(uuid.uuid4())
+    
+    while True:
+        async with engine.begin() as conn:
+            acquired = await _acquire(conn, owner)
+        if acquired:
+            break
+        
+        await asyncio.sleep(1)
+        if await current_version(engine) >= HEAD:
+            return []
+    
+    applied = []
+    try:
+        version = await current_version(engine)
+        ctx = MigrationContext(engine, shard)
+        
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            
+            logger.info(f"Шард {shard}: миграция {migration.version} {migration.name}")
+            await migration.upgrade(ctx)
+            
+            async with engine.begin() as conn:
+                await conn.execute(
+                    insert(schema_version).values(version=migration.version, name=migration.name)
+                )
+            applied.append(migration.version)
+            
+            async with engine.begin() as conn:
+                await _acquire(conn, owner)
+    finally:
+        await _release(engine, owner)
+    
+    return applied
+
+async def migrate(engines: List[AsyncEngine]) -> List[int]:
+    """Миграции всех шардов; возвращает применённые версии"""
+    
+    applied = []
+    for shard, engine in enumerate(engines):
+        applied += await migrate_engine(engine, shard)
+    return applied
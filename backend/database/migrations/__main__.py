@@ -0,0 +1,31 @@
+# backend/database/migrations/__main__.py
+
+import argparse
+import asyncio
+import logging
+
+from database.database import engines
+from database.migrations import HEAD, MIGRATIONS, current_version, migrate
+
+async def status():
+    for shard, engine in enumerate(engines):
+        version = await current_version(engine)
+        pending = [m for m in MIGRATIONS if m.version > version]
+        print(f"Шард {shard}: версия {version}, последняя {HEAD}")
+        for migration in pending:
+            print(f"  ожидает {migration.version:04d} {migration.name}")
+
+async def upgrade():
+    applied = await migrate(engines)
+    print(f"Применено миграций: {len(applied)}" if applied else "Схема уже на последней версии")
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(status() if args.command == "status" else upgrade())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# backend/database/migrations/v0001_schema.py
+"""
+Таблицы моделей. БД, созданным до миграций (create_all при старте),
+добавляются недостающие колонки и индексы.
+"""
+
+from database.models import Base
+
+async def upgrade(ctx):
+    existing = [
+        table for table in Base.metadata.sorted_tables
+        if await ctx.has_table(table.name)
+    ]
+    
+    await ctx.run(Base.metadata.create_all)
+    
+    for table in existing:
+        for column in table.columns:
+            # NOT NULL можно добавить только со значением по умолчанию
+            if column.nullable or column.server_default is not None:
+                await ctx.add_column(table, column.name)
+        
+        for index in table.indexes:
+            await ctx.create_index(index)
@@ -0,0 +1,31 @@
+# backend/database/migrations/v0002_counters.py
+"""
+Триггеры счётчиков напоминаний; заполнение для уже существующих напоминаний.
+
+Заполнение идёт порциями по id пользователя, каждая в своей короткой
+транзакции: триггеры к этому моменту уже ведут счётчики новых записей,
+а пересчёт порции перезаписывает строки, которые они успели завести.
+"""
+
+from sqlalchemy import exists, select, text
+
+from database.counters import install_counters, rebuild_counters_sql
+from database.models import Reminder, User, UserReminderCounter
+
+def _needs_backfill(sync_conn) -> bool:
+    # Триггеры заводят строку счётчика при первом напоминании, поэтому
+    # пустая таблица при непустой reminders — таблица только что создана
+    return sync_conn.scalar(
+        select(~exists(select(UserReminderCounter.user_id)) & exists(select(Reminder.id)))
+    )
+
+def _rebuild(sync_conn, start: int, end: int):
+    sync_conn.execute(text(rebuild_counters_sql(start, end)))
+
+async def upgrade(ctx):
+    backfill = await ctx.run(_needs_backfill)
+    await ctx.run(install_counters)
+    
+    if backfill:
+        async for start, end in ctx.key_ranges(User.id):
+            await ctx.run(_rebuild, start, end)
@@ -0,0 +1,10 @@
+# backend/database/migrations/v0003_archive_view.py
+"""
+Представление reminders_all. Миграция, добавляющая колонку в reminders,
+должна добавить её и в reminders_archive и пересоздать представление.
+"""
+
+from database.archive import install_archive_view
+
+async def upgrade(ctx):
+    await ctx.run(install_archive_view)
@@ -0,0 +1,31 @@
+# backend/database/migrations/v0004_search.py
+"""
+Полнотекстовый индекс напоминаний (FTS5 / tsvector).
+
+В PostgreSQL без перезаписи таблицы и блокировки записи: nullable
+колонка, триггер для новых строк, старые строки порциями, GIN-индекс
+CONCURRENTLY. Каждый шаг идемпотентен — прерванную миграцию можно
+запустить снова.
+"""
+
+from sqlalchemy import literal_column
+
+from database.search import (
+    SEARCH_COLUMN, install_search, search_index, search_table, search_vector_sql
+)
+
+async def upgrade(ctx):
+    if ctx.dialect != "postgresql":
+        await ctx.run(install_search)
+        return
+    
+    vector = search_table.c[SEARCH_COLUMN]
+    
+    await ctx.add_column(search_table, SEARCH_COLUMN)
+    await ctx.run(install_search)
+    await ctx.backfill(
+        search_table,
+        {vector: literal_column(search_vector_sql())},
+        where=vector.is_(None)
+    )
+    await ctx.create_index(search_index)
@@ -0,0 +1,8 @@
+# backend/database/migrations/v0005_shard_directory.py
+"""Каталог перенесённых пользователей (только в шарде 0)"""
+
+from database.shards import shard_directory
+
+async def upgrade(ctx):
+    if ctx.shard == 0:
+        await ctx.run(shard_directory.create, True)
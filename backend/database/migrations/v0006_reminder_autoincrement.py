@@ -0,0 +1,65 @@
+# backend/database/migrations/v0006_reminder_autoincrement.py
+"""
+AUTOINCREMENT для reminders в SQLite.
+
+Без него SQLite выдаёт новой строке max(id) + 1 и после удаления
+последних строк повторяет id, уже ушедшие в reminders_archive: строка
+в reminders_all двоится, а её перенос в архив падает на первичном
+ключе. Добавить AUTOINCREMENT можно только пересозданием таблицы;
+sqlite_sequence начинается с max(id) по reminders и архиву.
+
+В PostgreSQL последовательность id не возвращается назад, миграция
+ничего не делает.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+
+from database.archive import VIEW_NAME, install_archive_view
+from database.counters import install_counters
+from database.models import Reminder, ArchivedReminder
+from database.search import install_search
+
+_TABLE = Reminder.__tablename__
+_NEW = f"{_TABLE}_new"
+
+def _rebuild(sync_conn):
+    ddl = sync_conn.scalar(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": _TABLE}
+    )
+    
+    if "AUTOINCREMENT" not in ddl.upper():
+        create = str(CreateTable(Reminder.__table__).compile(dialect=sync_conn.dialect))
+        sync_conn.execute(text(create.replace(f"CREATE TABLE {_TABLE} ", f"CREATE TABLE {_NEW} ", 1)))
+        
+        columns = ", ".join(column.name for column in Reminder.__table__.columns)
+        sync_conn.execute(text(f"INSERT INTO {_NEW} ({columns}) SELECT {columns} FROM {_TABLE}"))
+        
+        # Вместе с таблицей удаляются её индексы и триггеры; на reminders
+        # не ссылается ни один внешний ключ
+        sync_conn.execute(text(f"DROP VIEW IF EXISTS {VIEW_NAME}"))
+        sync_conn.execute(text(f"DROP TABLE {_TABLE}"))
+        sync_conn.execute(text(f"ALTER TABLE {_NEW} RENAME TO {_TABLE}"))
+        
+        for index in Reminder.__table__.indexes:
+            index.create(sync_conn)
+        install_counters(sync_conn)
+        # reminders_fts уже есть: rowid совпадают с сохранёнными id
+        install_search(sync_conn)
+        install_archive_view(sync_conn)
+    
+    sync_conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": _TABLE})
+    sync_conn.execute(
+        text(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT :name, coalesce(max(id), 0) "
+            f"FROM (SELECT max(id) AS id FROM {_TABLE} "
+            f"UNION ALL SELECT max(id) FROM {ArchivedReminder.__table__.name})"
+        ),
+        {"name": _TABLE}
+    )
+
+async def upgrade(ctx):
+    if ctx.dialect == "postgresql":
+        return
+    await ctx.run(_rebuild)
@@ -0,0 +1,24 @@
+# backend/database/migrations/v0007_category_ranks.py
+"""
+Ранги категорий с шагом RANK_STEP.
+
+Раньше Category.order шёл подряд (0, 1, 2, …): между соседями нет места,
+и первое же перемещение пересчитывало все ранги пользователя. Старые
+ранги умножаются на RANK_STEP, порядок сохраняется.
+
+Обновление идёт порциями, каждая в своей транзакции. Условие
+0 < order < RANK_STEP пропускает уже умноженные строки, поэтому
+прерванную миграцию можно просто запустить снова.
+"""
+
+from database.models import Category
+from database.repositories.category_repo import RANK_STEP
+
+async def upgrade(ctx):
+    table = Category.__table__
+    order = table.c["order"]
+    await ctx.backfill(
+        table,
+        {order: order * RANK_STEP},
+        where=(order > 0) & (order < RANK_STEP)
+    )
@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Optional, List
 from sqlalchemy import (
     String, Integer, Boolean, DateTime, 
-    ForeignKey, Text, Enum as SQLEnum
+    ForeignKey, Text, Enum as SQLEnum, Index, Column, Table
 )
 from sqlalchemy.orm import (
     DeclarativeBase, Mapped, mapped_column, 
@@ -52,6 +52,10 @@ class User(Base):
     timezone: Mapped[str] = mapped_column(String(50), default="Europe/Moscow")
     notifications_enabled: Mapped[bool] = mapped_column(Boolean, default=True)
     theme: Mapped[str] = mapped_column(String(10), default="auto")  # light/dark/auto
+    paused_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, 
+        nullable=True
+    )  # Режим отпуска: уведомления не отправляются
     
     # Stats
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -78,6 +82,10 @@ class User(Base):
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        # Список категорий пользователя в его порядке
+        Index("ix_categories_user_order", "user_id", "order"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -103,6 +111,17 @@ class Category(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Списки и статистика пользователя (user_id, status, сортировка по времени)
+        Index("ix_reminders_user_status_remind_at", "user_id", "status", "remind_at"),
+        # Очередь отправки планировщика
+        Index("ix_reminders_due", "status", "is_notified", "remind_at"),
+        # Фильтр по категории и ON DELETE SET NULL
+        Index("ix_reminders_category_id", "category_id"),
+        # id не повторяются после удаления последних строк: архив
+        # хранит их под теми же id (миграция v0006)
+        {"sqlite_autoincrement": True},
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -172,8 +191,64 @@ class Achievement(Base):
 
 class UserAchievement(Base):
     __tablename__ = "user_achievements"
+    __table_args__ = (
+        Index("ix_user_achievements_user_id", "user_id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     achievement_id: Mapped[int] = mapped_column(ForeignKey("achievements.id"))
-    earned_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    earned_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+# ===== ARCHIVE =====
+
+def _archive_columns() -> list:
+    """Колонки reminders без автоинкремента (id переносится как есть)"""
+    
+    columns = []
+    for column in Reminder.__table__.columns:
+        args = [
+            ForeignKey(fk.target_fullname, ondelete=fk.ondelete)
+            for fk in column.foreign_keys
+        ]
+        columns.append(Column(
+            column.name,
+            column.type,
+            *args,
+            primary_key=column.primary_key,
+            nullable=column.nullable,
+            autoincrement=False
+        ))
+    return columns
+
+class ArchivedReminder(Base):
+    """Напоминания в конечном состоянии, перенесённые из reminders"""
+    __table__ = Table(
+        "reminders_archive",
+        Base.metadata,
+        *_archive_columns(),
+        Column("archived_at", DateTime, default=datetime.utcnow),
+        Index("ix_reminders_archive_user_remind_at", "user_id", "remind_at"),
+        Index("ix_reminders_archive_category_id", "category_id"),
+    )
+
+# ===== COUNTERS =====
+
+class UserReminderCounter(Base):
+    """Число напоминаний пользователя по статусам (ведётся триггерами)"""
+    __tablename__ = "user_reminder_counters"
+    
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), 
+        primary_key=True
+    )
+    active: Mapped[int] = mapped_column(Integer, default=0)
+    completed: Mapped[int] = mapped_column(Integer, default=0)
+    missed: Mapped[int] = mapped_column(Integer, default=0)
+    cancelled: Mapped[int] = mapped_column(Integer, default=0)
+    
+    # Перенесённые в архив (см. ReminderRepository.archive_terminal)
+    archived_active: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    archived_completed: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    archived_missed: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    archived_cancelled: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
@@ -0,0 +1,223 @@
+# backend/database/querystats.py
+"""
+Учёт SQL-запросов на единицу работы: HTTP-запрос API, апдейт бота,
+задача планировщика.
+
+trace_queries(name) открывает трассу в ContextVar; события движков
+(before/after_cursor_execute) добавляют в неё число запросов, время в БД
+и «форму» запроса — SQL с параметрами-заглушками. Форма, повторившаяся
+QUERY_REPEAT_THRESHOLD раз за трассу, — признак N+1 (ленивая загрузка
+или запрос в цикле), о ней пишется предупреждение (один раз на пару
+трасса/форма).
+
+Бюджет запросов объявляется декоратором query_budget(n) на обработчике
+или маршруте и проверяется при закрытии трассы. При
+QUERY_BUDGET_STRICT превышение — исключение QueryBudgetExceeded
+(включается в тестах), иначе — предупреждение в лог.
+"""
+
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Списки значений: IN (?, ?, ?) и VALUES (?, ?), (?, ?) — одна форма
+_PARAM = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_ROWS = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """SQL без различий в числе параметров и пробелах"""
+    shape = _SPACES.sub(" ", statement).strip()
+    shape = _IN_LIST.sub("(...)", shape)
+    return _ROWS.sub(r"\1", shape)
+
+class QueryBudgetExceeded(Exception):
+    """Трасса выполнила больше запросов, чем объявлено в query_budget"""
+
+@dataclass
+class QueryTrace:
+    """Запросы одной единицы работы"""
+    name: str
+    budget: Optional[int] = None
+    statements: int = 0
+    db_time: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Формы, выполненные threshold и более раз"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+    
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.statements > self.budget
+
+_current: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+def current_trace() -> Optional[QueryTrace]:
+    return _current.get()
+
+@contextmanager
+def use_trace(trace: Optional[QueryTrace]):
+    """Продолжить чужую трассу (например, в задаче писателя БД)"""
+    token = _current.set(trace)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+# ===== СТАТИСТИКА =====
+
+@dataclass
+class TraceStats:
+    """Сводка по трассам одного имени"""
+    name: str
+    calls: int = 0
+    statements: int = 0
+    max_statements: int = 0
+    db_time: float = 0.0
+    max_db_time: float = 0.0
+    budget: Optional[int] = None
+    over_budget: int = 0
+    repeated: int = 0
+    repeated_shapes: Dict[str, int] = field(default_factory=dict)
+
+class QueryStats:
+    """Накопленная статистика трасс (общая для потоков бота и API)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, TraceStats] = {}
+    
+    def record(self, trace: QueryTrace, repeated: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """Добавляет трассу; возвращает повторы, которых у этого имени ещё не было"""
+        
+        with self._lock:
+            stats = self._stats.get(trace.name)
+            if stats is None:
+                stats = self._stats[trace.name] = TraceStats(name=trace.name)
+            
+            stats.calls += 1
+            stats.statements += trace.statements
+            stats.max_statements = max(stats.max_statements, trace.statements)
+            stats.db_time += trace.db_time
+            stats.max_db_time = max(stats.max_db_time, trace.db_time)
+            if trace.budget is not None:
+                stats.budget = trace.budget
+            stats.over_budget += trace.over_budget
+            
+            new = []
+            if repeated:
+                stats.repeated += 1
+                for shape, count in repeated:
+                    if shape not in stats.repeated_shapes:
+                        new.append((shape, count))
+                    stats.repeated_shapes[shape] = max(stats.repeated_shapes.get(shape, 0), count)
+            return new
+    
+    def snapshot(self) -> List[TraceStats]:
+        """Сводки, от самых «дорогих» по числу запросов"""
+        with self._lock:
+            return sorted(
+                (TraceStats(**{**vars(s), "repeated_shapes": dict(s.repeated_shapes)}) for s in self._stats.values()),
+                key=lambda s: s.statements,
+                reverse=True
+            )
+    
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+# Глобальный экземпляр
+query_stats = QueryStats()
+
+# ===== ТРАССЫ =====
+
+def _finish(trace: QueryTrace):
+    repeated = trace.repeated(settings.QUERY_REPEAT_THRESHOLD)
+    
+    for shape, count in query_stats.record(trace, repeated):
+        logger.warning(f"Возможен N+1 в {trace.name}: {count} раз {shape[:300]}")
+    
+    if trace.over_budget:
+        message = (
+            f"{trace.name}: {trace.statements} запросов при бюджете {trace.budget} "
+            f"({trace.db_time * 1000:.1f} мс в БД)"
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(f"Превышен бюджет запросов: {message}")
+
+@contextmanager
+def trace_queries(name: str, budget: Optional[int] = None) -> Iterator[QueryTrace]:
+    """Считает запросы внутри блока (в том числе во вложенных задачах)"""
+    
+    trace = QueryTrace(name=name, budget=budget)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+    
+    # Только при нормальном выходе: исключение блока важнее бюджета
+    if settings.QUERY_TRACE_ENABLED:
+        _finish(trace)
+
+def query_budget(limit: int):
+    """
+    Бюджет запросов обработчика или маршрута — на всю трассу (апдейт,
+    HTTP-запрос), включая middleware и зависимости; трасса получает имя
+    обработчика. Без открытой трассы считает только сам вызов.
+    """
+    
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                with trace_queries(fn.__qualname__, budget=limit):
+                    return await fn(*args, **kwargs)
+            
+            trace.budget = limit
+            trace.name = fn.__qualname__
+            return await fn(*args, **kwargs)
+        
+        wrapper.query_budget = limit
+        return wrapper
+    
+    return decorator
+
+# ===== СОБЫТИЯ ДВИЖКА =====
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    started = getattr(context, "_query_started", None)
+    if trace is None or started is None:
+        return
+    
+    trace.statements += 1
+    trace.db_time += time.perf_counter() - started
+    trace.shapes[statement_shape(statement)] += 1
+
+def instrument(engine: AsyncEngine):
+    """Подключает учёт запросов к движку"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,18 @@
+# backend/database/repositories/base.py
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Флаг в session.info: коммитит не репозиторий, а владелец сессии
+DEFER_COMMIT = "defer_commit"
+
+class BaseRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def _commit(self):
+        """Завершить операцию: commit или только flush, если коммит отложен"""
+        
+        if self.session.info.get(DEFER_COMMIT):
+            await self.session.flush()
+        else:
+            await self.session.commit()
\ No newline at end of file
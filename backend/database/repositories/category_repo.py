@@ -1,15 +1,23 @@
 # backend/database/repositories/category_repo.py
 
-from sqlalchemy import select, update, delete, func
+from sqlalchemy import select, update, delete, insert, func, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 
 from database.models import Category
+from database.repositories.base import BaseRepository
 
-class CategoryRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
-    
+# Ранги (Category.order) идут с шагом RANK_STEP: перемещение ставит
+# категорию посередине между соседями и пишет одну строку. Когда между
+# соседями не остаётся места, ранги пользователя пересчитываются заново.
+RANK_STEP = 1 << 16
+
+# Минимальный зазор, при котором фоновая задача ещё не пересчитывает
+RANK_MIN_GAP = 4
+
+_categories = Category.__table__
+
+class CategoryRepository(BaseRepository):
     async def get_by_id(
         self, 
         category_id: int, 
@@ -31,6 +39,8 @@ class CategoryRepository:
             select(Category)
             .where(Category.user_id == user_id)
             .order_by(Category.order, Category.id)
+            # Ранги меняются пакетными UPDATE мимо объектов сессии
+            .execution_options(populate_existing=True)
         )
         result = await self.session.execute(query)
         return list(result.scalars().all())
@@ -42,28 +52,27 @@ class CategoryRepository:
         icon: str = "📌",
         color: str = "#6C5CE7"
     ) -> Category:
-        """Создать категорию"""
+        """Создать категорию (в конец списка, одним INSERT)"""
         
-        # Определяем порядок (последняя + 1)
-        max_order_query = (
-            select(func.max(Category.order))
+        last_order = (
+            select(func.coalesce(func.max(Category.order), 0) + RANK_STEP)
             .where(Category.user_id == user_id)
-        )
-        result = await self.session.execute(max_order_query)
-        max_order = result.scalar() or 0
-        
-        category = Category(
-            user_id=user_id,
-            name=name,
-            icon=icon,
-            color=color,
-            order=max_order + 1,
-            is_default=False
+            .scalar_subquery()
         )
         
-        self.session.add(category)
-        await self.session.commit()
-        await self.session.refresh(category)
+        category = await self.session.scalar(
+            insert(Category)
+            .values(
+                user_id=user_id,
+                name=name,
+                icon=icon,
+                color=color,
+                order=last_order,
+                is_default=False
+            )
+            .returning(Category)
+        )
+        await self._commit()
         
         return category
     
@@ -82,8 +91,7 @@ class CategoryRepository:
                 if hasattr(category, key) and value is not None:
                     setattr(category, key, value)
             
-            await self.session.commit()
-            await self.session.refresh(category)
+            await self._commit()
         
         return category
     
@@ -94,7 +102,7 @@ class CategoryRepository:
         
         if category and not category.is_default:
             await self.session.delete(category)
-            await self.session.commit()
+            await self._commit()
             return True
         
         return False
@@ -104,17 +112,154 @@ class CategoryRepository:
         user_id: int, 
         category_ids: List[int]
     ) -> List[Category]:
-        """Изменить порядок категорий"""
+        """Изменить порядок категорий (полный список, один пакетный UPDATE)"""
+        
+        await self._set_orders(user_id, category_ids)
+        await self._commit()
+        return await self.get_user_categories(user_id)
+    
+    async def move(
+        self,
+        user_id: int,
+        category_id: int,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> Optional[List[Category]]:
+        """
+        Переместить одну категорию перед before_id или после after_id.
+        Пишет одну строку; None — категории или соседа нет.
+        """
         
-        for order, cat_id in enumerate(category_ids):
+        anchor_id = before_id if before_id is not None else after_id
+        anchors = {
+            category.id: category
+            for category in (await self.session.execute(
+                select(Category).where(
+                    Category.user_id == user_id,
+                    Category.id.in_([category_id, anchor_id])
+                )
+            )).scalars()
+        }
+        
+        if category_id not in anchors or anchor_id not in anchors:
+            return None
+        
+        if category_id != anchor_id:
+            order = await self._rank_next_to(user_id, category_id, anchors[anchor_id], before_id is not None)
+            
+            if order is None:
+                # Зазор исчерпан — пересчитываем ранги пользователя и повторяем
+                await self.rebalance(user_id)
+                await self.session.refresh(anchors[anchor_id], ["order"])
+                order = await self._rank_next_to(user_id, category_id, anchors[anchor_id], before_id is not None)
+            
             await self.session.execute(
                 update(Category)
-                .where(
-                    Category.id == cat_id,
-                    Category.user_id == user_id
-                )
+                .where(Category.id == category_id)
                 .values(order=order)
+                .execution_options(synchronize_session=False)
             )
+            await self._commit()
+        
+        return await self.get_user_categories(user_id)
+    
+    async def _rank_next_to(
+        self,
+        user_id: int,
+        category_id: int,
+        anchor: Category,
+        before: bool
+    ) -> Optional[int]:
+        """Ранг между anchor и его соседом (None — места нет)"""
         
-        await self.session.commit()
-        return await self.get_user_categories(user_id)
\ No newline at end of file
+        # Ближайший сосед anchor с нужной стороны (без самой категории)
+        if before:
+            neighbour = select(func.max(Category.order)).where(Category.order < anchor.order)
+        else:
+            neighbour = select(func.min(Category.order)).where(Category.order > anchor.order)
+        
+        other = await self.session.scalar(
+            neighbour.where(
+                Category.user_id == user_id,
+                Category.id != category_id
+            )
+        )
+        
+        if other is None:
+            # anchor — крайний: отступаем на шаг
+            return anchor.order - RANK_STEP if before else anchor.order + RANK_STEP
+        
+        if abs(anchor.order - other) < 2:
+            return None
+        
+        return (anchor.order + other) // 2
+    
+    async def rebalance(self, user_id: int):
+        """Раздать категориям пользователя ранги с шагом RANK_STEP (порядок сохраняется)"""
+        
+        category_ids = list((await self.session.execute(
+            select(Category.id)
+            .where(Category.user_id == user_id)
+            .order_by(Category.order, Category.id)
+        )).scalars())
+        
+        await self._set_orders(user_id, category_ids)
+        await self._commit()
+    
+    async def get_crowded_users(self, after_user_id: int, limit: int) -> tuple:
+        """
+        Пользователи с id > after_user_id (не больше limit), у которых
+        зазор между соседними рангами меньше RANK_MIN_GAP.
+        Возвращает (последний проверенный id или None, список id).
+        """
+        
+        user_ids = list((await self.session.execute(
+            select(Category.user_id)
+            .where(Category.user_id > after_user_id)
+            .group_by(Category.user_id)
+            .order_by(Category.user_id)
+            .limit(limit)
+        )).scalars())
+        
+        if not user_ids:
+            return None, []
+        
+        gaps = (
+            select(
+                Category.user_id,
+                (
+                    Category.order
+                    - func.lag(Category.order).over(
+                        partition_by=Category.user_id,
+                        order_by=(Category.order, Category.id)
+                    )
+                ).label("gap")
+            )
+            .where(Category.user_id.in_(user_ids))
+            .subquery()
+        )
+        
+        crowded = list((await self.session.execute(
+            select(gaps.c.user_id)
+            .where(gaps.c.gap < RANK_MIN_GAP)
+            .distinct()
+        )).scalars())
+        
+        return user_ids[-1], crowded
+    
+    async def _set_orders(self, user_id: int, category_ids: List[int]):
+        if not category_ids:
+            return
+        
+        await self.session.execute(
+            _categories.update()
+            .where(
+                _categories.c.id == bindparam("b_id"),
+                _categories.c.user_id == user_id
+            )
+            .values(order=bindparam("b_order")),
+            [
+                {"b_id": category_id, "b_order": (position + 1) * RANK_STEP}
+                for position, category_id in enumerate(category_ids)
+            ]
+        )
\ No newline at end of file
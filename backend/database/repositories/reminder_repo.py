@@ -1,16 +1,34 @@
-from sqlalchemy import select, update, delete, and_, or_, func
+from sqlalchemy import (
+    select, update, delete, insert, and_, or_, func, exists, case, bindparam
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime, timedelta
 
-from database.models import Reminder, ReminderStatus, RepeatType, Priority
+from database.models import (
+    Reminder, ReminderStatus, RepeatType, Priority, User,
+    UserReminderCounter, ArchivedReminder
+)
+from database.counters import STATUS_COLUMNS, ARCHIVED_PREFIX, COUNTER_COLUMNS
+from database.archive import reminders_all
+from database.rows import ReminderRow, select_reminder_rows, to_reminder_rows
+from database.search import apply_search
+from database.repositories.base import BaseRepository
 
+# Статусы, из которых напоминание уже не вернётся в работу
+TERMINAL_STATUSES = (ReminderStatus.COMPLETED, ReminderStatus.MISSED, ReminderStatus.CANCELLED)
 
-class ReminderRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
-    
+def recipient_not_paused():
+    """Условие: владелец напоминания не в режиме отпуска"""
+    return ~exists().where(
+        and_(
+            User.id == Reminder.user_id,
+            User.paused_at.is_not(None)
+        )
+    )
+
+class ReminderRepository(BaseRepository):
     async def create(
         self,
         user_id: int,
@@ -40,8 +58,7 @@ class ReminderRepository:
         )
         
         self.session.add(reminder)
-        await self.session.commit()
-        await self.session.refresh(reminder)
+        await self._commit()
         
         return reminder
     
@@ -73,38 +90,85 @@ class ReminderRepository:
         from_date: Optional[datetime] = None,
         to_date: Optional[datetime] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Reminder]:
-        """Получить список напоминаний пользователя с фильтрами"""
+        offset: int = 0,
+        after: Optional[Tuple[datetime, int]] = None,
+        include_archive: bool = False
+    ) -> List[ReminderRow]:
+        """
+        Получить список напоминаний пользователя с фильтрами
+        (только для чтения: ReminderRow вместе с категорией).
         
-        query = (
-            select(Reminder)
-            .options(selectinload(Reminder.category))
-            .where(Reminder.user_id == user_id)
-        )
+        after — (remind_at, id) последней строки предыдущей страницы
+        (keyset-пагинация: цена страницы не зависит от её номера).
+        include_archive — искать и среди перенесённых в архив.
+        """
+        
+        # История читается через представление reminders_all
+        source = reminders_all if include_archive else Reminder.__table__
+        c = source.c
+        
+        query = select_reminder_rows(source).where(c.user_id == user_id)
         
         # Фильтры
         if status:
-            query = query.where(Reminder.status == status)
+            query = query.where(c.status == status)
         if category_id:
-            query = query.where(Reminder.category_id == category_id)
+            query = query.where(c.category_id == category_id)
         if from_date:
-            query = query.where(Reminder.remind_at >= from_date)
+            query = query.where(c.remind_at >= from_date)
         if to_date:
-            query = query.where(Reminder.remind_at <= to_date)
+            query = query.where(c.remind_at <= to_date)
+        if after:
+            after_remind_at, after_id = after
+            query = query.where(
+                c.remind_at >= after_remind_at,
+                or_(
+                    c.remind_at > after_remind_at,
+                    c.id > after_id
+                )
+            )
         
         # Сортировка и пагинация
         query = (
             query
-            .order_by(Reminder.remind_at.asc())
+            .order_by(c.remind_at.asc(), c.id.asc())
             .limit(limit)
-            .offset(offset)
         )
+        if offset:
+            query = query.offset(offset)
         
         result = await self.session.execute(query)
-        return list(result.scalars().all())
+        return to_reminder_rows(result)
     
-    async def get_today_reminders(self, user_id: int) -> List[Reminder]:
+    async def search(
+        self,
+        user_id: int,
+        text: str,
+        status: Optional[ReminderStatus] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[ReminderRow]:
+        """
+        Полнотекстовый поиск по названию и описанию, самые релевантные
+        первыми. Перенесённые в архив не ищутся.
+        """
+        
+        query = select_reminder_rows().where(Reminder.user_id == user_id)
+        if status:
+            query = query.where(Reminder.status == status)
+        
+        query = apply_search(query, self.session.bind.dialect.name, text)
+        if query is None:
+            return []
+        
+        query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+        
+        result = await self.session.execute(query)
+        return to_reminder_rows(result)
+    
+    async def get_today_reminders(self, user_id: int) -> List[ReminderRow]:
         """Напоминания на сегодня"""
         
         today_start = datetime.utcnow().replace(
@@ -121,23 +185,283 @@ class ReminderRepository:
     
     async def get_pending_notifications(
         self, 
-        check_time: datetime
-    ) -> List[Reminder]:
-        """Получить напоминания, которые нужно отправить"""
+        check_time: datetime,
+        per_user_limit: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[ReminderRow]:
+        """
+        Получить напоминания, которые нужно отправить.
+        
+        Очередь справедливая: сначала первые напоминания всех пользователей,
+        затем вторые и т.д., так что один пользователь с тысячами просроченных
+        напоминаний не задерживает остальных.
+        """
+        
+        # Номер напоминания в очереди своего пользователя
+        ranked = (
+            select(
+                Reminder.id,
+                func.row_number().over(
+                    partition_by=Reminder.user_id,
+                    order_by=(Reminder.remind_at, Reminder.id)
+                ).label("user_rank")
+            )
+            .where(
+                and_(
+                    Reminder.status == ReminderStatus.ACTIVE,
+                    Reminder.is_notified == False,
+                    Reminder.remind_at <= check_time,
+                    recipient_not_paused()
+                )
+            )
+            .subquery()
+        )
         
         query = (
-            select(Reminder)
+            select_reminder_rows(with_recipient=True)
+            .join(ranked, ranked.c.id == Reminder.id)
+        )
+        
+        if per_user_limit:
+            query = query.where(ranked.c.user_rank <= per_user_limit)
+        
+        query = query.order_by(
+            ranked.c.user_rank,
+            Reminder.remind_at,
+            Reminder.id
+        )
+        
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self.session.execute(query)
+        return to_reminder_rows(result, with_recipient=True)
+    
+    async def get_upcoming_notifications(
+        self,
+        from_time: datetime,
+        to_time: datetime
+    ) -> List[ReminderRow]:
+        """Напоминания, которые сработают в окне (from_time, to_time]"""
+        
+        query = (
+            select_reminder_rows(with_recipient=True)
+            .where(
+                and_(
+                    Reminder.status == ReminderStatus.ACTIVE,
+                    Reminder.is_notified == False,
+                    Reminder.remind_at > from_time,
+                    Reminder.remind_at <= to_time,
+                    # Получатель уже в JOIN
+                    User.paused_at.is_(None)
+                )
+            )
+            .order_by(Reminder.remind_at.asc())
+        )
+        
+        result = await self.session.execute(query)
+        return to_reminder_rows(result, with_recipient=True)
+    
+    async def get_scheduled_until(self, to_time: datetime) -> list:
+        """
+        Все неотправленные активные напоминания до to_time (одним проходом
+        по индексу remind_at). Только поля, нужные для прогноза нагрузки.
+        """
+        
+        query = (
+            select(
+                Reminder.remind_at,
+                Reminder.repeat_type,
+                Reminder.repeat_days,
+                Reminder.repeat_end_date
+            )
             .where(
                 and_(
                     Reminder.status == ReminderStatus.ACTIVE,
                     Reminder.is_notified == False,
-                    Reminder.remind_at <= check_time
+                    Reminder.remind_at <= to_time,
+                    recipient_not_paused()
                 )
             )
         )
         
         result = await self.session.execute(query)
-        return list(result.scalars().all())
+        return list(result.all())
+    
+    def _add_seconds(self, column, seconds: int):
+        """column + seconds в SQL (SQLite хранит DateTime строкой)"""
+        
+        if self.session.bind.dialect.name == "sqlite":
+            # Тот же формат, в котором SQLAlchemy пишет DateTime в SQLite
+            return func.strftime("%Y-%m-%d %H:%M:%f000", column, f"{seconds:+d} seconds")
+        
+        return column + timedelta(seconds=seconds)
+    
+    def _overdue_condition(self, user_id: int, before: datetime, since: Optional[datetime] = None):
+        condition = and_(
+            Reminder.user_id == user_id,
+            Reminder.status == ReminderStatus.ACTIVE,
+            Reminder.is_notified == False,
+            Reminder.remind_at < before
+        )
+        if since is not None:
+            condition = and_(condition, Reminder.remind_at >= since)
+        return condition
+    
+    async def get_overdue_recurring(self, user_id: int, before: datetime) -> list:
+        """Повторяющиеся напоминания, которые не были отправлены до before"""
+        
+        query = (
+            select(
+                Reminder.id,
+                Reminder.remind_at,
+                Reminder.repeat_type,
+                Reminder.repeat_days,
+                Reminder.repeat_end_date
+            )
+            .where(
+                and_(
+                    self._overdue_condition(user_id, before),
+                    Reminder.repeat_type != RepeatType.NONE
+                )
+            )
+        )
+        
+        result = await self.session.execute(query)
+        return list(result.all())
+    
+    async def reschedule_overdue(
+        self,
+        user_id: int,
+        paused_at: datetime,
+        before: datetime,
+        shift_seconds: Optional[int],
+        recurring: List[dict]
+    ) -> dict:
+        """
+        Разбирает напоминания, пропущенные за время паузы, одной транзакцией.
+        
+        Разовые со временем в [paused_at, before) сдвигаются на
+        shift_seconds одним UPDATE, а если shift_seconds is None —
+        помечаются пропущенными. Просроченные ещё до паузы не трогаются.
+        Повторяющиеся получают заранее вычисленные значения из recurring
+        ({"id", "remind_at"} или {"id", "status"}) одним executemany.
+        """
+        
+        one_off = and_(
+            self._overdue_condition(user_id, before, since=paused_at),
+            Reminder.repeat_type == RepeatType.NONE
+        )
+        
+        if shift_seconds is None:
+            values = {"status": ReminderStatus.MISSED}
+        else:
+            values = {"remind_at": self._add_seconds(Reminder.remind_at, shift_seconds)}
+        
+        result = await self.session.execute(
+            update(Reminder)
+            .where(one_off)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        one_off_count = result.rowcount
+        
+        moved = [row for row in recurring if "remind_at" in row]
+        ended = [row for row in recurring if "status" in row]
+        
+        for rows in (moved, ended):
+            if rows:
+                await self.session.execute(update(Reminder), rows)
+        
+        await self._commit()
+        
+        return {
+            "shifted": one_off_count if shift_seconds is not None else 0,
+            "missed": (one_off_count if shift_seconds is None else 0) + len(ended),
+            "rescheduled": len(moved)
+        }
+    
+    def _future_condition(self, user_id: int, since: datetime):
+        return and_(
+            Reminder.user_id == user_id,
+            Reminder.status == ReminderStatus.ACTIVE,
+            Reminder.is_notified == False,
+            Reminder.remind_at >= since
+        )
+    
+    async def get_future_range(self, user_id: int, since: datetime) -> tuple:
+        """(количество, первое, последнее) будущих напоминаний пользователя"""
+        
+        query = (
+            select(
+                func.count(Reminder.id),
+                func.min(Reminder.remind_at),
+                func.max(Reminder.remind_at)
+            )
+            .where(self._future_condition(user_id, since))
+        )
+        
+        result = await self.session.execute(query)
+        return tuple(result.one())
+    
+    async def shift_future_ranges(
+        self,
+        user_id: int,
+        since: datetime,
+        ranges: List[tuple]
+    ) -> int:
+        """
+        Сдвигает будущие напоминания пользователя одним UPDATE.
+        
+        ranges — список (начало, конец, секунды) по возрастанию: внутри
+        [начало, конец) сдвиг одинаковый и выбирается через CASE по
+        исходному remind_at, поэтому сдвинутая строка не сдвигается повторно.
+        """
+        
+        ranges = [r for r in ranges if r[2]]
+        if not ranges:
+            return 0
+        
+        def shifted(column):
+            return case(
+                *[
+                    (
+                        and_(
+                            Reminder.remind_at >= range_start,
+                            Reminder.remind_at < range_end
+                        ),
+                        self._add_seconds(column, seconds)
+                    )
+                    for range_start, range_end, seconds in ranges
+                ],
+                else_=column
+            )
+        
+        query = (
+            update(Reminder)
+            .where(
+                and_(
+                    self._future_condition(user_id, since),
+                    or_(*[
+                        and_(
+                            Reminder.remind_at >= range_start,
+                            Reminder.remind_at < range_end
+                        )
+                        for range_start, range_end, _ in ranges
+                    ])
+                )
+            )
+            .values(
+                remind_at=shifted(Reminder.remind_at),
+                repeat_end_date=shifted(Reminder.repeat_end_date)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        
+        result = await self.session.execute(query)
+        await self._commit()
+        
+        return result.rowcount
     
     async def mark_completed(
         self, 
@@ -151,24 +475,40 @@ class ReminderRepository:
         if reminder and reminder.status == ReminderStatus.ACTIVE:
             reminder.status = ReminderStatus.COMPLETED
             reminder.completed_at = datetime.utcnow()
-            await self.session.commit()
-            await self.session.refresh(reminder)
+            await self._commit()
         
         return reminder
     
-    async def mark_notified(self, reminder_id: int):
-        """Отметить что уведомление отправлено"""
+    async def claim_notification(self, reminder: ReminderRow) -> bool:
+        """
+        Отметить отправку, если строка в БД совпадает с прочитанной
+        (активна, не отправлена, те же время, текст и правило повтора).
+        False — напоминание изменили, выполнили или удалили после чтения.
+        """
         
         query = (
             update(Reminder)
-            .where(Reminder.id == reminder_id)
+            .where(
+                Reminder.id == reminder.id,
+                Reminder.status == ReminderStatus.ACTIVE,
+                Reminder.is_notified == False,
+                Reminder.remind_at == reminder.remind_at,
+                Reminder.title == reminder.title,
+                Reminder.description.is_not_distinct_from(reminder.description),
+                Reminder.category_id.is_not_distinct_from(reminder.category_id),
+                Reminder.repeat_type == reminder.repeat_type,
+                Reminder.repeat_days.is_not_distinct_from(reminder.repeat_days),
+                Reminder.repeat_end_date.is_not_distinct_from(reminder.repeat_end_date)
+            )
             .values(
                 is_notified=True,
                 notification_count=Reminder.notification_count + 1
             )
         )
-        await self.session.execute(query)
-        await self.session.commit()
+        result = await self.session.execute(query)
+        await self._commit()
+        
+        return result.rowcount == 1
     
     async def update(
         self,
@@ -185,8 +525,11 @@ class ReminderRepository:
                 if hasattr(reminder, key) and value is not None:
                     setattr(reminder, key, value)
             
-            await self.session.commit()
-            await self.session.refresh(reminder)
+            await self._commit()
+            
+            # Категория загружена вместе с напоминанием — перечитываем при смене
+            if kwargs.get("category_id") is not None:
+                await self.session.refresh(reminder, ["category"])
         
         return reminder
     
@@ -204,29 +547,196 @@ class ReminderRepository:
         )
         
         result = await self.session.execute(query)
-        await self.session.commit()
+        await self._commit()
         
         return result.rowcount > 0
     
-    async def get_stats(self, user_id: int) -> dict:
-        """Статистика напоминаний пользователя"""
+    async def get_stats(self, user_id: int, include_archive: bool = False) -> dict:
+        """
+        Статистика напоминаний пользователя (из счётчиков, одна строка).
+        include_archive — вместе с перенесёнными в архив.
+        """
         
-        # Общее количество по статусам
-        status_query = (
-            select(
-                Reminder.status,
-                func.count(Reminder.id).label("count")
-            )
-            .where(Reminder.user_id == user_id)
-            .group_by(Reminder.status)
+        counters = await self.session.get(
+            UserReminderCounter, user_id, populate_existing=True
         )
         
-        result = await self.session.execute(status_query)
-        stats = {row.status.value: row.count for row in result}
+        stats = {}
+        if counters:
+            stats = {
+                column: getattr(counters, column) + (
+                    getattr(counters, ARCHIVED_PREFIX + column) if include_archive else 0
+                )
+                for column in STATUS_COLUMNS.values()
+            }
         
         return {
             "active": stats.get("active", 0),
             "completed": stats.get("completed", 0),
             "missed": stats.get("missed", 0),
+            "cancelled": stats.get("cancelled", 0),
             "total": sum(stats.values())
-        }
\ No newline at end of file
+        }
+    
+    async def archive_terminal(self, before: datetime, limit: int) -> int:
+        """
+        Переносит в архив до limit напоминаний старше before: завершённые,
+        отменённые, пропущенные и уже отправленные повторения (следующее
+        повторение для них создано). Счётчики: триггер на DELETE уменьшает
+        горячие, здесь же увеличиваются archived_*.
+        Возвращает число перенесённых (0 — переносить больше нечего).
+        """
+        
+        ids = list((await self.session.execute(
+            select(Reminder.id)
+            .where(
+                Reminder.remind_at < before,
+                or_(
+                    Reminder.status.in_(TERMINAL_STATUSES),
+                    and_(
+                        Reminder.status == ReminderStatus.ACTIVE,
+                        Reminder.is_notified == True,
+                        Reminder.repeat_type != RepeatType.NONE
+                    )
+                )
+            )
+            .order_by(Reminder.remind_at, Reminder.id)
+            .limit(limit)
+        )).scalars())
+        
+        if not ids:
+            return 0
+        
+        columns = [column.name for column in Reminder.__table__.columns]
+        await self.session.execute(
+            insert(ArchivedReminder.__table__).from_select(
+                columns,
+                select(*Reminder.__table__.columns).where(Reminder.id.in_(ids))
+            )
+        )
+        
+        moved = await self.session.execute(
+            select(Reminder.user_id, Reminder.status, func.count(Reminder.id))
+            .where(Reminder.id.in_(ids))
+            .group_by(Reminder.user_id, Reminder.status)
+        )
+        counters = UserReminderCounter.__table__
+        await self.session.execute(
+            counters.update()
+            .where(counters.c.user_id == bindparam("counter_user_id"))
+            .values({
+                ARCHIVED_PREFIX + column: counters.c[ARCHIVED_PREFIX + column] + bindparam(f"moved_{column}")
+                for column in STATUS_COLUMNS.values()
+            }),
+            [
+                {
+                    "counter_user_id": user_id,
+                    **{
+                        f"moved_{column}": count if status.value == column else 0
+                        for column in STATUS_COLUMNS.values()
+                    }
+                }
+                for user_id, status, count in moved
+            ]
+        )
+        
+        await self.session.execute(
+            delete(Reminder)
+            .where(Reminder.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
+        
+        return len(ids)
+    
+    async def _count_by_status(self, user_ids: List[int]) -> dict:
+        """Реальные количества по статусам (горячие и в архиве): {user_id: {колонка: n}}"""
+        
+        counts = {user_id: dict.fromkeys(COUNTER_COLUMNS, 0) for user_id in user_ids}
+        
+        for model, prefix in ((Reminder, ""), (ArchivedReminder, ARCHIVED_PREFIX)):
+            query = (
+                select(
+                    model.user_id,
+                    model.status,
+                    func.count(model.id)
+                )
+                .where(model.user_id.in_(user_ids))
+                .group_by(model.user_id, model.status)
+            )
+            result = await self.session.execute(query)
+            
+            for user_id, status, count in result:
+                counts[user_id][prefix + status.value] = count
+        
+        return counts
+    
+    async def reconcile_counters(self, after_user_id: int, limit: int) -> tuple:
+        """
+        Сверяет счётчики пользователей с id > after_user_id (не больше
+        limit) с реальными данными и исправляет расхождения.
+        Возвращает (последний проверенный id или None, исправлено).
+        """
+        
+        user_ids = list((await self.session.execute(
+            select(User.id)
+            .where(User.id > after_user_id)
+            .order_by(User.id)
+            .limit(limit)
+        )).scalars())
+        
+        if not user_ids:
+            return None, 0
+        
+        actual = await self._count_by_status(user_ids)
+        
+        stored = {
+            counters.user_id: {
+                column: getattr(counters, column)
+                for column in COUNTER_COLUMNS
+            }
+            for counters in (await self.session.execute(
+                select(UserReminderCounter)
+                .where(UserReminderCounter.user_id.in_(user_ids))
+            )).scalars()
+        }
+        
+        broken = [
+            user_id for user_id in user_ids
+            if stored.get(user_id, dict.fromkeys(COUNTER_COLUMNS, 0)) != actual[user_id]
+        ]
+        
+        if broken:
+            # Пересчёт одним UPDATE с подзапросами — без гонки с триггерами
+            missing = [user_id for user_id in broken if user_id not in stored]
+            if missing:
+                self.session.add_all([
+                    UserReminderCounter(
+                        user_id=user_id,
+                        **dict.fromkeys(COUNTER_COLUMNS, 0)
+                    )
+                    for user_id in missing
+                ])
+                await self.session.flush()
+            
+            recount = {}
+            for model, prefix in ((Reminder, ""), (ArchivedReminder, ARCHIVED_PREFIX)):
+                for column in STATUS_COLUMNS.values():
+                    recount[prefix + column] = (
+                        select(func.count(model.id))
+                        .where(
+                            model.user_id == UserReminderCounter.user_id,
+                            model.status == ReminderStatus(column)
+                        )
+                        .scalar_subquery()
+                    )
+            
+            await self.session.execute(
+                update(UserReminderCounter)
+                .where(UserReminderCounter.user_id.in_(broken))
+                .values(**recount)
+                .execution_options(synchronize_session=False)
+            )
+            await self._commit()
+        
+        return user_ids[-1], len(broken)
@@ -1,18 +1,50 @@
 # backend/database/repositories/user_repo.py
 
-from sqlalchemy import select, update
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime
 
 from database.models import User, Category
+from database.repositories.base import BaseRepository
+from database.cache import user_cache
+from database.activity import activity_buffer
+from database.repositories.category_repo import RANK_STEP
 
-class UserRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
-    
+# Категории нового пользователя (в порядке показа)
+DEFAULT_CATEGORIES = [
+    {"name": "Личное", "icon": "👤", "color": "#6C5CE7"},
+    {"name": "Работа", "icon": "💼", "color": "#0984E3"},
+    {"name": "Учёба", "icon": "📚", "color": "#00B894"},
+    {"name": "Здоровье", "icon": "💪", "color": "#E17055"},
+    {"name": "Покупки", "icon": "🛒", "color": "#FDCB6E"},
+]
+
+# INSERT с ON CONFLICT по диалекту
+_UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Поля профиля Telegram, которые обновляются при каждом входе
+PROFILE_FIELDS = ("first_name", "username", "last_name")
+
+class UserRepository(BaseRepository):
     async def get_by_telegram_id(self, telegram_id: int) -> Optional[User]:
-        """Получить пользователя по Telegram ID"""
+        """Получить пользователя по Telegram ID (через кэш)"""
+        
+        if not user_cache.enabled:
+            return await self._load_by_telegram_id(telegram_id)
+        
+        found, user = await user_cache.get(self.session, telegram_id)
+        if found:
+            return user
+        
+        version = user_cache.version
+        user = await self._load_by_telegram_id(telegram_id)
+        await user_cache.put(telegram_id, user, version)
+        return user
+    
+    async def _load_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         query = select(User).where(User.telegram_id == telegram_id)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
@@ -40,28 +72,61 @@ class UserRepository:
         self.session.add(user)
         await self.session.flush()  # Получаем ID пользователя
         
-        # Создаём дефолтные категории
-        default_categories = [
-            {"name": "Личное", "icon": "👤", "color": "#6C5CE7", "order": 1},
-            {"name": "Работа", "icon": "💼", "color": "#0984E3", "order": 2},
-            {"name": "Учёба", "icon": "📚", "color": "#00B894", "order": 3},
-            {"name": "Здоровье", "icon": "💪", "color": "#E17055", "order": 4},
-            {"name": "Покупки", "icon": "🛒", "color": "#FDCB6E", "order": 5},
-        ]
-        
-        for cat_data in default_categories:
-            category = Category(
-                user_id=user.id,
-                is_default=True,
-                **cat_data
-            )
-            self.session.add(category)
+        # Сбрасываем негативную запись «пользователя нет»
+        user_cache.invalidate(self.session, telegram_id)
         
-        await self.session.commit()
-        await self.session.refresh(user)
+        await self._add_default_categories(user.id)
+        await self._commit()
         
         return user
     
+    async def _add_default_categories(self, user_id: int):
+        """Дефолтные категории одним INSERT на несколько строк"""
+        
+        await self.session.execute(
+            insert(Category).values([
+                {
+                    "user_id": user_id,
+                    "is_default": True,
+                    "order": position * RANK_STEP,
+                    **cat_data
+                }
+                for position, cat_data in enumerate(DEFAULT_CATEGORIES, 1)
+            ])
+        )
+    
+    async def _upsert(self, telegram_id: int, profile: dict) -> tuple[User, bool]:
+        """
+        INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... RETURNING:
+        один запрос и для нового, и для вернувшегося пользователя.
+        Два одновременных первых входа не падают на уникальности —
+        второй обновит строку первого.
+        """
+        
+        now = datetime.utcnow()
+        upsert = _UPSERT[self.session.bind.dialect.name](User).values(
+            telegram_id=telegram_id,
+            created_at=now,
+            last_active=now,
+            **profile
+        )
+        query = (
+            upsert.on_conflict_do_update(
+                index_elements=[User.telegram_id],
+                set_={
+                    **{key: upsert.excluded[key] for key in PROFILE_FIELDS},
+                    "last_active": upsert.excluded.last_active,
+                }
+            )
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        
+        user = await self.session.scalar(query)
+        
+        # created_at в SET не входит: у существующей строки он старый
+        return user, user.created_at == now
+    
     async def get_or_create(
         self,
         telegram_id: int,
@@ -71,25 +136,32 @@ class UserRepository:
     ) -> tuple[User, bool]:
         """Получить или создать пользователя. Возвращает (user, is_new)"""
         
-        user = await self.get_by_telegram_id(telegram_id)
+        profile = {
+            "first_name": first_name,
+            "username": username,
+            "last_name": last_name
+        }
         
-        if user:
-            # Обновляем last_active и данные профиля
-            user.last_active = datetime.utcnow()
-            user.first_name = first_name
-            user.username = username
-            user.last_name = last_name
-            await self.session.commit()
-            return user, False
+        # Пользователь в кэше и профиль не менялся — без запросов к БД
+        if user_cache.enabled:
+            found, user = await user_cache.get(self.session, telegram_id)
+            if found and user is not None and all(
+                getattr(user, key) == value for key, value in profile.items()
+            ):
+                await self.touch(user)
+                return user, False
         
-        # Создаём нового
-        user = await self.create(
-            telegram_id=telegram_id,
-            first_name=first_name,
-            username=username,
-            last_name=last_name
-        )
-        return user, True
+        user, is_new = await self._upsert(telegram_id, profile)
+        
+        # Строка изменилась (или появилась вместо негативной записи)
+        user_cache.invalidate(self.session, telegram_id)
+        
+        if is_new:
+            await self._add_default_categories(user.id)
+        
+        await self._commit()
+        
+        return user, is_new
     
     async def update_settings(
         self,
@@ -117,26 +189,77 @@ class UserRepository:
                 .where(User.id == user_id)
                 .values(**update_data)
             )
-            await self.session.execute(query)
-            await self.session.commit()
+            result = await self.session.execute(query.returning(User.telegram_id))
+            user_cache.invalidate(self.session, result.scalar_one_or_none())
+            await self._commit()
         
         return await self.get_by_id(user_id)
     
+    async def set_paused(self, user_id: int, paused: bool) -> Optional[datetime]:
+        """
+        Включить/выключить режим отпуска.
+        Возвращает момент начала паузы (до изменения).
+        """
+        
+        user = await self.get_by_id(user_id)
+        if not user:
+            return None
+        
+        paused_at = user.paused_at
+        
+        if paused and paused_at is None:
+            user.paused_at = datetime.utcnow()
+        elif not paused:
+            user.paused_at = None
+        
+        user_cache.invalidate(self.session, user.telegram_id)
+        await self._commit()
+        return paused_at
+    
     async def get_by_id(self, user_id: int) -> Optional[User]:
         """Получить пользователя по внутреннему ID"""
         query = select(User).where(User.id == user_id)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
     
+    async def touch(self, user: User):
+        """Отметить активность (через буфер, если он запущен)"""
+        
+        now = datetime.utcnow()
+        
+        if activity_buffer.running:
+            activity_buffer.touch(self.session, user.id, now)
+            # Только в памяти: объект не станет «грязным»
+            set_committed_value(user, "last_active", now)
+            await self._commit()
+            return
+        
+        user.last_active = now
+        user_cache.invalidate(self.session, user.telegram_id)
+        await self._commit()
+    
     async def increment_stats(
         self, 
         user_id: int, 
         created: int = 0, 
         completed: int = 0
     ):
-        """Увеличить счётчики статистики"""
-        user = await self.get_by_id(user_id)
-        if user:
-            user.total_reminders_created += created
-            user.total_reminders_completed += completed
-            await self.session.commit()
\ No newline at end of file
+        """Увеличить счётчики статистики (через буфер, если он запущен)"""
+        
+        if activity_buffer.running:
+            activity_buffer.add(self.session, user_id, created=created, completed=completed)
+            await self._commit()
+            return
+        
+        # Приращение в SQL: объект из кэша может быть устаревшим
+        query = (
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                total_reminders_created=User.total_reminders_created + created,
+                total_reminders_completed=User.total_reminders_completed + completed
+            )
+        )
+        result = await self.session.execute(query.returning(User.telegram_id))
+        user_cache.invalidate(self.session, result.scalar_one_or_none())
+        await self._commit()
\ No newline at end of file
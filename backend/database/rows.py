@@ -0,0 +1,88 @@
+# backend/database/rows.py
+"""
+Лёгкие строки для горячих запросов только на чтение.
+
+Списки напоминаний и выборки планировщика читаются через Core select
+(без identity map, инструментации атрибутов и отдельного запроса
+selectinload): категория и получатель приходят в той же строке JOIN.
+Значения раскладываются по __slots__; атрибуты те же, что у моделей,
+поэтому Pydantic (from_attributes) и планировщик работают с ними так же.
+"""
+
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Table, select
+from sqlalchemy.sql import Select
+
+from database.models import Reminder, Category, User
+
+_reminders = Reminder.__table__
+_categories = Category.__table__
+_users = User.__table__
+
+class SlottedRow:
+    """Значения колонок по порядку __slots__"""
+    
+    __slots__ = ()
+    
+    def __init__(self, values: Sequence):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+    
+    def __repr__(self):
+        return f"<{type(self).__name__} {getattr(self, 'id', '?')}>"
+
+class CategoryRow(SlottedRow):
+    __slots__ = tuple(column.key for column in _categories.columns)
+
+class RecipientRow(SlottedRow):
+    """Получатель уведомления: только нужное для отправки"""
+    __slots__ = ("id", "telegram_id", "language")
+
+class ReminderRow(SlottedRow):
+    __slots__ = tuple(column.key for column in _reminders.columns) + ("category", "user")
+    
+    def __init__(
+        self,
+        values: Sequence,
+        category: Optional[CategoryRow] = None,
+        user: Optional[RecipientRow] = None
+    ):
+        super().__init__(values)
+        self.category = category
+        self.user = user
+
+_REMINDER_WIDTH = len(_reminders.columns)
+_CATEGORY_WIDTH = len(_categories.columns)
+_RECIPIENT_COLUMNS = [_users.c[name] for name in RecipientRow.__slots__]
+
+def select_reminder_rows(source: Table = _reminders, with_recipient: bool = False) -> Select:
+    """
+    SELECT колонок напоминания, его категории (LEFT JOIN) и, если нужно,
+    получателя. source — reminders или представление reminders_all.
+    """
+    
+    columns = [*source.columns, *_categories.columns]
+    joined = source.outerjoin(_categories, _categories.c.id == source.c.category_id)
+    
+    if with_recipient:
+        columns += _RECIPIENT_COLUMNS
+        joined = joined.join(_users, _users.c.id == source.c.user_id)
+    
+    return select(*columns).select_from(joined)
+
+def to_reminder_rows(result, with_recipient: bool = False) -> List[ReminderRow]:
+    """Строки результата select_reminder_rows -> ReminderRow"""
+    
+    rows = []
+    category_end = _REMINDER_WIDTH + _CATEGORY_WIDTH
+    
+    for values in result:
+        category = None
+        if values[_REMINDER_WIDTH] is not None:
+            category = CategoryRow(values[_REMINDER_WIDTH:category_end])
+        
+        user = RecipientRow(values[category_end:]) if with_recipient else None
+        rows.append(ReminderRow(values[:_REMINDER_WIDTH], category, user))
+    
+    return rows
@@ -0,0 +1,163 @@
+# backend/database/search.py
+"""
+Полнотекстовый поиск по title и description напоминаний.
+
+SQLite — внешняя FTS5-таблица reminders_fts, которую синхронизируют
+триггеры на reminders. Токенизатор unicode61 приводит к нижнему регистру
+и кириллицу, и латиницу; стеммера для русского в SQLite нет, поэтому
+каждое слово запроса ищется как префикс («молок» найдёт «молоко»).
+
+PostgreSQL — колонка reminders.search_vector (tsvector по конфигурациям
+russian и english), которую заполняет BEFORE-триггер, с GIN-индексом.
+Не GENERATED STORED: такая колонка переписала бы всю таблицу под
+блокировкой. Старые строки миграция заполняет порциями, индекс строит
+CONCURRENTLY.
+"""
+
+import re
+from typing import Optional
+
+from sqlalchemy import (
+    Column, Index, Integer, MetaData, Select, Table,
+    column, func, inspect, literal_column, table, text
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from database.models import Reminder
+
+FTS_TABLE = "reminders_fts"
+SEARCH_COLUMN = "search_vector"
+
+# Вес title относительно description в ранжировании
+TITLE_WEIGHT = 10.0
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# ===== SQLite =====
+
+def _sqlite_statements() -> list:
+    def trigger(name: str, event: str, body: str) -> str:
+        return (
+            f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON reminders "
+            f"BEGIN {body} END"
+        )
+    
+    insert_new = (
+        f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+        f"VALUES (NEW.id, NEW.title, NEW.description);"
+    )
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description) "
+        f"VALUES ('delete', OLD.id, OLD.title, OLD.description);"
+    )
+    
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"title, description, content='reminders', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        trigger("trg_reminders_fts_insert", "INSERT", insert_new),
+        trigger("trg_reminders_fts_delete", "DELETE", delete_old),
+        trigger("trg_reminders_fts_update", "UPDATE OF title, description", delete_old + " " + insert_new),
+    ]
+
+# ===== PostgreSQL =====
+
+def _tsvector(source: str, weight: str) -> str:
+    return " || ".join(
+        f"setweight(to_tsvector('{config}', coalesce({source}, '')), '{weight}')"
+        for config in ("russian", "english")
+    )
+
+# Колонки поиска нет в модели: описание для ctx.add_column / ctx.backfill
+search_table = Table(
+    Reminder.__tablename__,
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column(SEARCH_COLUMN, TSVECTOR, nullable=True),
+)
+
+search_index = Index(
+    "ix_reminders_search",
+    search_table.c[SEARCH_COLUMN],
+    postgresql_using="gin"
+)
+
+def search_vector_sql(row: str = "") -> str:
+    """Выражение tsvector по title и description (row — NEW. в триггере)"""
+    return f"{_tsvector(row + 'title', 'A')} || {_tsvector(row + 'description', 'B')}"
+
+def _postgres_statements() -> list:
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION reminder_search_vector() RETURNS trigger AS $$
+        BEGIN
+            NEW.{SEARCH_COLUMN} := {search_vector_sql('NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_reminders_search ON reminders",
+        """
+        CREATE TRIGGER trg_reminders_search
+        BEFORE INSERT OR UPDATE OF title, description ON reminders
+        FOR EACH ROW EXECUTE FUNCTION reminder_search_vector()
+        """,
+    ]
+
+def install_search(sync_conn):
+    """
+    Создаёт индекс поиска (идемпотентно). В SQLite сразу заполняет его
+    для старых строк; в PostgreSQL — только триггер для новых и
+    изменённых строк, колонку (ctx.add_column) до него, старые строки
+    и индекс — после (см. миграцию v0004).
+    """
+    
+    if sync_conn.dialect.name == "postgresql":
+        for statement in _postgres_statements():
+            sync_conn.execute(text(statement))
+        return
+    
+    backfill = not inspect(sync_conn).has_table(FTS_TABLE)
+    
+    for statement in _sqlite_statements():
+        sync_conn.execute(text(statement))
+    
+    if backfill:
+        sync_conn.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+
+# ===== Запрос =====
+
+def search_terms(query: str) -> list:
+    """Слова запроса (знаки и операторы FTS отбрасываются)"""
+    return _WORD.findall(query.lower())
+
+def apply_search(query: Select, dialect: str, text_query: str) -> Optional[Select]:
+    """
+    Добавляет к select(Reminder) условие поиска и сортировку по
+    релевантности. None — в запросе нет ни одного слова.
+    """
+    
+    terms = search_terms(text_query)
+    if not terms:
+        return None
+    
+    if dialect == "postgresql":
+        vector = literal_column(f"{Reminder.__tablename__}.{SEARCH_COLUMN}")
+        words = " ".join(terms)
+        tsquery = func.plainto_tsquery("russian", words).op("||")(
+            func.plainto_tsquery("english", words)
+        )
+        return (
+            query
+            .where(vector.op("@@")(tsquery))
+            .order_by(func.ts_rank(vector, tsquery).desc(), Reminder.id.desc())
+        )
+    
+    fts = table(FTS_TABLE, column("rowid"))
+    match = " ".join(f'"{term}"*' for term in terms)
+    return (
+        query
+        .join(fts, fts.c.rowid == Reminder.id)
+        .where(literal_column(FTS_TABLE).op("MATCH")(match))
+        .order_by(func.bm25(literal_column(FTS_TABLE), TITLE_WEIGHT, 1.0), Reminder.id.desc())
+    )
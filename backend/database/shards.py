@@ -0,0 +1,158 @@
+# backend/database/shards.py
+"""
+Шардирование данных пользователей по нескольким БД (SHARD_URLS).
+
+Пользователь целиком (категории, напоминания, архив, счётчики) живёт
+в одном шарде: по умолчанию telegram_id % N, перенесённые — по записи
+в shard_directory (в шарде 0). Текущий шард — contextvar current_shard:
+его выставляют middleware бота и авторизация API, а async_session,
+async_read_session и писатель берут движок текущего шарда.
+
+Перенос пользователя (tools/move_users.py): запись в каталоге получает
+moving=True, все процессы через SHARD_DIRECTORY_REFRESH секунд
+перестают принимать от него запросы, данные копируются, каталог
+переключается на новый шард, старая копия удаляется.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import BigInteger, Boolean, Column, Integer, MetaData, Table, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+current_shard: ContextVar[int] = ContextVar("current_shard", default=0)
+
+# Каталог перенесённых пользователей (только в шарде 0)
+shard_directory = Table(
+    "shard_directory",
+    MetaData(),
+    Column("telegram_id", BigInteger, primary_key=True, autoincrement=False),
+    Column("shard", Integer, nullable=False),
+    Column("moving", Boolean, nullable=False, default=False),
+)
+
+class ShardMoving(Exception):
+    """Данные пользователя сейчас переносятся в другой шард"""
+
+def shard_urls() -> List[str]:
+    urls = [url.strip() for url in settings.SHARD_URLS.split(",") if url.strip()]
+    return urls or [settings.DATABASE_URL]
+
+class ShardRouter:
+    """Какой шард хранит пользователя с данным telegram_id"""
+    
+    def __init__(self, urls: List[str]):
+        self.urls = urls
+        self._overrides: Dict[int, int] = {}
+        self._moving: Set[int] = set()
+        self._directory_engine: Optional[AsyncEngine] = None
+        self._refresher: Optional[asyncio.Task] = None
+    
+    @property
+    def count(self) -> int:
+        return len(self.urls)
+    
+    def shards(self) -> range:
+        return range(self.count)
+    
+    def shard_for(self, telegram_id: int) -> int:
+        shard = self._overrides.get(telegram_id)
+        return shard if shard is not None else telegram_id % self.count
+    
+    def is_moving(self, telegram_id: int) -> bool:
+        return telegram_id in self._moving
+    
+    def owns(self, shard: int, telegram_id: int) -> bool:
+        """Данные пользователя в shard актуальны (не перенос и не старая копия)"""
+        return not self.is_moving(telegram_id) and self.shard_for(telegram_id) == shard
+    
+    # ===== Каталог =====
+    
+    def attach(self, directory_engine: AsyncEngine):
+        self._directory_engine = directory_engine
+    
+    def apply_directory(self, rows):
+        """Заменить переопределения строками shard_directory"""
+        overrides, moving = {}, set()
+        for telegram_id, shard, is_moving in rows:
+            overrides[telegram_id] = shard
+            if is_moving:
+                moving.add(telegram_id)
+        self._overrides, self._moving = overrides, moving
+    
+    async def refresh(self):
+        if self.count == 1 or self._directory_engine is None:
+            return
+        
+        async with self._directory_engine.connect() as conn:
+            result = await conn.execute(select(
+                shard_directory.c.telegram_id,
+                shard_directory.c.shard,
+                shard_directory.c.moving
+            ))
+            self.apply_directory(result.all())
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.SHARD_DIRECTORY_REFRESH)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Не удалось обновить каталог шардов: {e}")
+    
+    async def start(self):
+        if self.count == 1 or self._refresher is not None:
+            return
+        
+        await self.refresh()
+        self._refresher = asyncio.create_task(self._refresh_loop(), name="shard-directory")
+        logger.info(f"Шардов: {self.count}, перенесённых пользователей: {len(self._overrides)}")
+    
+    async def stop(self):
+        if self._refresher is None or self._refresher.get_loop() is not asyncio.get_running_loop():
+            return
+        
+        self._refresher.cancel()
+        try:
+            await self._refresher
+        except asyncio.CancelledError:
+            pass
+        self._refresher = None
+
+# Глобальный экземпляр
+shard_router = ShardRouter(shard_urls())
+
+@contextmanager
+def use_shard(shard: int):
+    """Выполнить блок в контексте шарда"""
+    token = current_shard.set(shard)
+    try:
+        yield shard
+    finally:
+        current_shard.reset(token)
+
+def bind_user(telegram_id: int) -> int:
+    """
+    Сделать текущим шард пользователя (до конца задачи).
+    ShardMoving — данные пользователя сейчас переносятся.
+    """
+    
+    if shard_router.is_moving(telegram_id):
+        raise ShardMoving(telegram_id)
+    
+    shard = shard_router.shard_for(telegram_id)
+    current_shard.set(shard)
+    return shard
+
+async def start_shards():
+    await shard_router.start()
+
+async def stop_shards():
+    await shard_router.stop()
@@ -0,0 +1,202 @@
+# backend/database/writer.py
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from database.database import async_session
+from database.shards import current_shard, shard_router
+from database.querystats import current_trace, use_trace
+from database.repositories.base import DEFER_COMMIT
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[[AsyncSession], Awaitable[T]]
+
+class WriteQueue:
+    """
+    Единственный писатель в БД (group commit).
+
+    Операции записи из обработчиков, API и планировщика встают в очередь;
+    писатель выполняет их пачками в одной транзакции и одним commit,
+    после чего отдаёт каждому вызывающему его результат.
+    На каждый шард — свой писатель.
+    
+    Если пачка откатилась, каждая её операция выполняется ещё раз в своей
+    транзакции. Поэтому всё, что операция делает помимо запросов в своей
+    session, должно быть повторяемым или откладываться до commit через
+    session.info и after_commit (как user_cache.invalidate,
+    activity_buffer.add, invalidate_staged_user).
+    """
+    
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        shard: int = 0,
+        max_batch: int = 64,
+        max_delay_ms: int = 5
+    ):
+        self._session_factory = session_factory
+        self.shard = shard
+        self._max_batch = max_batch
+        self._max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Статистика
+        self.batches = 0
+        self.operations = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name=f"db-writer-{self.shard}")
+        logger.info(f"Писатель БД шарда {self.shard} запущен")
+    
+    async def stop(self):
+        """Дописывает очередь и останавливается"""
+        
+        if not self.running:
+            return
+        
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info(
+            f"Писатель БД шарда {self.shard} остановлен: "
+            f"{self.operations} операций в {self.batches} транзакциях"
+        )
+    
+    async def submit(self, op: WriteOp) -> T:
+        """Поставить операцию в очередь и дождаться результата"""
+        
+        future = self.loop.create_future()
+        # Запросы операции засчитываются трассе того, кто её поставил
+        await self._queue.put((op, future, current_trace()))
+        return await future
+    
+    async def _collect(self) -> Tuple[List[tuple], bool]:
+        """Ждёт первую операцию и добирает пачку до max_batch / max_delay"""
+        
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        
+        batch = [item]
+        deadline = time.monotonic() + self._max_delay
+        
+        while len(batch) < self._max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        
+        return batch, False
+    
+    async def _run(self):
+        # Операции видят шард писателя (например, при сбросе кэша)
+        current_shard.set(self.shard)
+        stopping = False
+        
+        while not stopping:
+            batch, stopping = await self._collect()
+            if not batch:
+                continue
+            
+            try:
+                await self._execute_batch(batch)
+            except Exception as e:
+                # Одна из операций сломала транзакцию — выполняем по одной
+                logger.warning(f"Пачка из {len(batch)} операций откатилась ({e}), выполняю по одной")
+                for item in batch:
+                    await self._execute_batch([item])
+    
+    async def _execute_batch(self, batch: List[tuple]):
+        """Выполняет пачку в одной транзакции"""
+        
+        results = []
+        
+        async with self._session_factory() as session:
+            session.info[DEFER_COMMIT] = True
+            
+            try:
+                for op, _, trace in batch:
+                    with use_trace(trace):
+                        results.append(await op(session))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                if len(batch) > 1:
+                    raise
+                future = batch[0][1]
+                if not future.done():
+                    future.set_exception(e)
+                return
+        
+        self.batches += 1
+        self.operations += len(batch)
+        
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+# Писатели по шардам (если включён WRITE_QUEUE_ENABLED)
+writers: Dict[int, WriteQueue] = {}
+
+async def start_writer():
+    if not settings.WRITE_QUEUE_ENABLED or any(w.running for w in writers.values()):
+        return
+    
+    for shard in shard_router.shards():
+        writers[shard] = WriteQueue(
+            async_session.for_shard(shard),
+            shard=shard,
+            max_batch=settings.WRITE_QUEUE_MAX_BATCH,
+            max_delay_ms=settings.WRITE_QUEUE_MAX_DELAY_MS
+        )
+        await writers[shard].start()
+
+async def stop_writer():
+    # Останавливает только тот, кто запустил (API может жить в потоке бота)
+    for writer in writers.values():
+        if writer.loop is asyncio.get_running_loop():
+            await writer.stop()
+
+async def run_write(op: WriteOp) -> T:
+    """
+    Выполнить операцию записи в текущем шарде через очередь писателя,
+    а если писатель не запущен — в отдельной сессии с обычным commit.
+    
+    Писатель из другого event loop (API в потоке бота, run_bot.py)
+    получает операцию через run_coroutine_threadsafe: она выполняется
+    в его потоке, трасса и шард вызывающего переходят вместе с контекстом.
+    """
+    
+    writer = writers.get(current_shard.get())
+    if writer and writer.running:
+        if writer.loop is asyncio.get_running_loop():
+            return await writer.submit(op)
+        future = asyncio.run_coroutine_threadsafe(writer.submit(op), writer.loop)
+        return await asyncio.wrap_future(future)
+    
+    async with async_session() as session:
+        session.info[DEFER_COMMIT] = True
+        result = await op(session)
+        await session.commit()
+        return result
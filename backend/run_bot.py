@@ -9,7 +9,14 @@ import uvicorn
 
 from config import settings
 from database.database import init_db
+from database.writer import start_writer
+from database.cache import start_cache
+from database.activity import start_activity
+from database.shards import start_shards
+from database.maintenance import start_maintenance
 from bot.handlers import start, reminders, settings_handlers
+from bot.middlewares.db import DbSessionMiddleware
+from bot.middlewares.querytrace import QueryTraceMiddleware
 from bot.utils.scheduler import init_scheduler
 
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +24,8 @@ logger = logging.getLogger(__name__)
 
 bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 dp = Dispatcher()
+dp.update.middleware(QueryTraceMiddleware())
+dp.update.middleware(DbSessionMiddleware())
 
 dp.include_router(start.router)
 dp.include_router(reminders.router)
@@ -29,6 +38,12 @@ async def main():
     await init_db()
     logger.info("✅ Database initialized")
     
+    await start_shards()
+    await start_writer()
+    await start_cache()
+    await start_activity()
+    await start_maintenance()
+    
     await init_scheduler(bot)
     logger.info("✅ Scheduler started")
     
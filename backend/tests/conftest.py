@@ -0,0 +1,22 @@
+# backend/tests/conftest.py
+"""
+Тесты идут с QUERY_BUDGET_STRICT: превышение query_budget — исключение
+QueryBudgetExceeded, а не предупреждение в лог. Настройки читаются при
+импорте config, поэтому окружение задаётся здесь, до импорта приложения.
+"""
+
+import os
+import sys
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="remind-tests-")
+
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+os.environ.setdefault("WEBAPP_URL", "http://localhost")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["QUERY_BUDGET_STRICT"] = "1"
+# Кэш и буфер активности прятали бы запросы, которые считает бюджет
+os.environ["USER_CACHE_SIZE"] = "0"
+os.environ["ACTIVITY_FLUSH_INTERVAL"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,144 @@
+# backend/tests/test_query_budgets.py
+"""Бюджеты запросов (query_budget) маршрутов API и обработчиков бота"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery
+from aiogram.types import Update
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from config import settings
+from database.database import async_session, init_db
+from database.models import User
+from database.querystats import QueryBudgetExceeded, query_budget, query_stats
+
+def init_data(telegram_id: int) -> str:
+    """Подписанный initData Mini App (как его передаёт Telegram)"""
+    
+    data = {
+        "auth_date": str(int(time.time())),
+        "user": json.dumps({"id": telegram_id, "first_name": "Test"}),
+    }
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(data.items()))
+    secret = hmac.new(b"WebAppData", settings.BOT_TOKEN.encode(), hashlib.sha256).digest()
+    data["hash"] = hmac.new(secret, check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(data)
+
+def trace(name: str):
+    return next(stats for stats in query_stats.snapshot() if stats.name == name)
+
+# ===== API =====
+
+@pytest.fixture(scope="module")
+def client():
+    from api.main import app
+    
+    with TestClient(app) as client:
+        yield client
+
+def test_list_reminders_within_budget(client):
+    headers = {"X-Telegram-Init-Data": init_data(1001)}
+    
+    client.get("/api/v1/users/me", headers=headers)
+    for n in range(3):
+        response = client.post(
+            "/api/v1/reminders",
+            headers=headers,
+            json={"title": f"r{n}", "remind_at": "2030-01-01T10:00:00"}
+        )
+        assert response.status_code == 200
+    
+    # Бюджет 3 не зависит от числа напоминаний: категории грузятся сразу
+    response = client.get("/api/v1/reminders?include_total=true", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 3
+    assert int(response.headers["X-DB-Queries"]) <= 3
+
+def test_me_within_budget(client):
+    headers = {"X-Telegram-Init-Data": init_data(1002)}
+    
+    # Первый вход создаёт пользователя и его категории
+    for _ in range(2):
+        response = client.get("/api/v1/users/me", headers=headers)
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Queries"]) <= 2
+
+def test_budget_exceeded_raises():
+    @query_budget(1)
+    async def two_queries():
+        async with async_session() as session:
+            await session.execute(select(User.id))
+            await session.execute(select(User.id))
+    
+    async def run():
+        await init_db()
+        await two_queries()
+    
+    with pytest.raises(QueryBudgetExceeded):
+        asyncio.run(run())
+
+# ===== Бот =====
+
+class FakeTelegram(BaseSession):
+    """Ответы Bot API без сети"""
+    
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, AnswerCallbackQuery):
+            return True
+        return {"message_id": 1, "date": 1, "chat": {"id": 1, "type": "private"}}
+    
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+    
+    async def close(self):
+        pass
+
+def _dispatcher() -> Dispatcher:
+    from bot.handlers import start, reminders, settings_handlers
+    from bot.middlewares.db import DbSessionMiddleware
+    from bot.middlewares.querytrace import QueryTraceMiddleware
+    
+    dp = Dispatcher()
+    dp.update.middleware(QueryTraceMiddleware())
+    dp.update.middleware(DbSessionMiddleware())
+    dp.include_router(start.router)
+    dp.include_router(reminders.router)
+    dp.include_router(settings_handlers.router)
+    return dp
+
+def _command(telegram_id: int, text: str, update_id: int) -> Update:
+    return Update(update_id=update_id, message={
+        "message_id": update_id,
+        "date": 1,
+        "chat": {"id": telegram_id, "type": "private"},
+        "from": {"id": telegram_id, "is_bot": False, "first_name": "Test"},
+        "text": text,
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+    })
+
+def test_cmd_start_within_budget():
+    bot = Bot("42:TEST", session=FakeTelegram())
+    dp = _dispatcher()
+    
+    async def run():
+        await init_db()
+        query_stats.reset()
+        # Новый пользователь, затем уже существующий
+        await dp.feed_update(bot, _command(2001, "/start", 1))
+        await dp.feed_update(bot, _command(2001, "/start", 2))
+    
+    asyncio.run(run())
+    
+    stats = trace("cmd_start")
+    assert stats.calls == 2
+    assert stats.over_budget == 0
+    assert stats.max_statements <= stats.budget
@@ -0,0 +1,265 @@
+# backend/tools/bench.py
+"""
+Бенчмарк методов репозиториев.
+
+Для каждого масштаба (пресеты tools.datagen) заполняет временную БД
+синтетическими данными и вызывает методы из tools.query_plans.CASES
+для разных пользователей. По каждому методу — ops/s, задержка p50/p99
+и число SQL-запросов за вызов.
+
+Сессии работают с отложенным коммитом (DEFER_COMMIT) и после вызова
+откатываются: пишущие методы меряются без fsync, и каждый вызов видит
+одни и те же данные.
+
+Результат сравнивается с tools/bench_baseline.json: регрессия — если
+запросов стало больше или p50 вырос больше чем на --tolerance (и не
+меньше чем на --min-delta-ms). Базовая линия снята на конкретной
+машине; после смены железа её нужно переснять (--update-baseline).
+
+    python -m tools.bench
+    python -m tools.bench --scales 10k,100k --output bench.json
+    python -m tools.bench --update-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Запросы должны доходить до БД, а не до кэша пользователей
+os.environ["USER_CACHE_SIZE"] = "0"
+
+from database.database import create_engine_for
+from database.models import User, Category, Reminder
+from database.repositories.base import DEFER_COMMIT
+from tools.datagen import PRESETS, generate
+from tools.query_plans import CASES, StatementRecorder
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# Пользователей, по которым чередуются вызовы
+SAMPLE_USERS = 64
+
+# Опорное время данных: одинаковые данные при каждом запуске
+NOW = datetime(2026, 1, 15, 12, 0)
+
+# ===== КОНТЕКСТЫ ВЫЗОВОВ =====
+
+async def contexts(engine, count: int) -> List[dict]:
+    """Аргументы вызовов для count пользователей, равномерно по id"""
+
+    async with engine.connect() as conn:
+        total = await conn.scalar(select(func.count()).select_from(User))
+        step = max(total // count, 1)
+        users = (await conn.execute(
+            select(User.id, User.telegram_id).where((User.id % step) == 0).order_by(User.id).limit(count)
+        )).all()
+
+        result = []
+        for user_id, telegram_id in users:
+            category_id = await conn.scalar(
+                select(func.min(Category.id)).where(Category.user_id == user_id)
+            )
+            reminder_id = await conn.scalar(
+                select(func.min(Reminder.id)).where(Reminder.user_id == user_id)
+            )
+            if reminder_id is None:
+                continue
+            result.append({
+                "now": NOW,
+                "user_id": user_id,
+                "telegram_id": telegram_id,
+                "category_id": category_id,
+                "reminder_id": reminder_id,
+            })
+
+    return result
+
+# ===== ЗАМЕР =====
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+async def measure(session_factory, recorder: StatementRecorder, call, items: List[dict], args) -> dict:
+    latencies, queries = [], []
+
+    for n in range(args.warmup + args.iterations):
+        context = items[n % len(items)]
+        async with session_factory() as session:
+            recorder.take()
+            recorder.enabled = True
+            started = time.perf_counter()
+            try:
+                await call(session, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                recorder.enabled = False
+                await session.rollback()
+
+        if n >= args.warmup:
+            latencies.append(elapsed)
+            queries.append(len(recorder.take()))
+
+        if sum(latencies) > args.max_seconds:
+            break
+
+    return {
+        "calls": len(latencies),
+        "ops": round(len(latencies) / sum(latencies), 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "queries": max(queries),
+    }
+
+async def bench_scale(url: str, scale: str, args) -> Dict[str, dict]:
+    engine = create_engine_for(url)
+    users, per_user = PRESETS[scale]
+
+    started = time.perf_counter()
+    reminders = await generate([engine], users, per_user, args.seed, NOW, route=False)
+    print(f"\n{scale}: {users} пользователей, {reminders} напоминаний ({time.perf_counter() - started:.1f} с)")
+
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False, info={DEFER_COMMIT: True}
+    )
+    recorder = StatementRecorder(engine)
+    items = await contexts(engine, SAMPLE_USERS)
+
+    results = {}
+    for name, call in CASES:
+        if args.only and args.only not in name:
+            continue
+        result = await measure(session_factory, recorder, call, items, args)
+        results[name] = result
+        print(
+            f"  {name:45} {result['ops']:>10,.0f} ops/s  p50 {result['p50_ms']:>8.3f} мс  "
+            f"p99 {result['p99_ms']:>8.3f} мс  запросов {result['queries']}"
+        )
+
+    await engine.dispose()
+    return results
+
+# ===== СРАВНЕНИЕ =====
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    tolerance: float,
+    min_delta_ms: float
+) -> List[str]:
+    """Регрессии относительно базовой линии"""
+
+    regressions = []
+    for scale, cases in results.items():
+        for name, result in cases.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+
+            if result["queries"] > base["queries"]:
+                regressions.append(
+                    f"{scale} {name}: запросов {result['queries']}, было {base['queries']}"
+                )
+            # Доли миллисекунды — шум планировщика ОС, а не регрессия
+            slower = result["p50_ms"] - base["p50_ms"]
+            if result["p50_ms"] > base["p50_ms"] * (1 + tolerance) and slower > min_delta_ms:
+                regressions.append(
+                    f"{scale} {name}: p50 {result['p50_ms']} мс, было {base['p50_ms']} мс "
+                    f"(+{result['p50_ms'] / base['p50_ms'] - 1:.0%})"
+                )
+
+    return regressions
+
+def _meta(args) -> dict:
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "iterations": args.iterations,
+    }
+
+def _write(path: str, data: dict):
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+        file.write("\n")
+
+async def run(args) -> int:
+    scales = args.scales.split(",")
+    unknown = [scale for scale in scales if scale not in PRESETS]
+    if unknown:
+        print(f"Неизвестные масштабы: {', '.join(unknown)} (есть {', '.join(PRESETS)})")
+        return 1
+
+    results: Dict[str, dict] = {}
+    if args.url:
+        if len(scales) != 1:
+            print("С --url задайте один масштаб: БД должна быть пустой")
+            return 1
+        results[scales[0]] = await bench_scale(args.url, scales[0], args)
+    else:
+        for scale in scales:
+            with tempfile.TemporaryDirectory() as tmp:
+                url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+                results[scale] = await bench_scale(url, scale, args)
+
+    report = {"meta": _meta(args), "results": results}
+    if args.output:
+        _write(args.output, report)
+
+    if args.update_baseline:
+        _write(args.baseline, report)
+        print(f"\nБазовая линия записана: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nБазовой линии нет ({args.baseline}), сравнение пропущено")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)["results"]
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n❌ Регрессии (допуск {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print(f"\n✅ Без регрессий относительно {os.path.relpath(args.baseline)} (допуск {args.tolerance:.0%})")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк методов репозиториев")
+    parser.add_argument("--scales", default="10k", help="масштабы через запятую (пресеты tools.datagen)")
+    parser.add_argument("--url", help="пустая БД вместо временного файла SQLite")
+    parser.add_argument("--iterations", type=int, default=200, help="вызовов на метод")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="предел времени на метод")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="только методы, содержащие строку")
+    parser.add_argument("--output", help="записать результаты в JSON")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="допустимый рост p50 (1.0 = вдвое)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="меньший рост p50 не считается регрессией")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты как базовую линию")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+# backend/tools/datagen.py
+"""
+Генератор синтетических данных для нагрузочных проверок.
+
+Создаёт пользователей со смесью языков и часовых поясов, дефолтными
+(и иногда своими) категориями и напоминаниями с правдоподобным
+распределением статусов, приоритетов и повторов. Число напоминаний
+у пользователей с тяжёлым хвостом (логнормальное, среднее — --per-user),
+время — в типичные часы по местному времени пользователя.
+
+Строки пишутся пакетами: SQLite — executemany в транзакции на порцию,
+PostgreSQL — COPY. На время загрузки триггеры reminders (счётчики,
+полнотекстовый индекс) отключаются, после — счётчики и индекс поиска
+строятся для новых строк одним запросом. Приложение в это время
+не должно писать в БД.
+
+Одинаковые --seed и --now дают одинаковые данные. Без --url
+пользователи раскладываются по шардам (SHARD_URLS) как в приложении.
+
+    python -m tools.datagen --preset 10k
+    python -m tools.datagen --preset 1m --seed 7 --url sqlite+aiosqlite:///./bench.db
+    python -m tools.datagen --users 500 --per-user 40
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+import pytz
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.counters import rebuild_counters_sql
+from database.database import create_engine_for
+from database.migrations import migrate_engine
+from database.models import User, Category, Reminder, ReminderStatus, RepeatType, Priority
+from database.repositories.category_repo import RANK_STEP
+from database.repositories.user_repo import DEFAULT_CATEGORIES
+from database.search import FTS_TABLE, SEARCH_COLUMN, search_vector_sql
+
+_users = User.__table__
+_categories = Category.__table__
+_reminders = Reminder.__table__
+
+# Пресеты: (пользователей, напоминаний в среднем на пользователя)
+PRESETS = {
+    "10k": (500, 20),
+    "100k": (2500, 40),
+    "1m": (25_000, 40),
+    "10m": (200_000, 50),
+}
+
+# Первый telegram_id синтетических пользователей (ниже — реальные)
+TELEGRAM_ID_START = 1_000_000_000
+
+# Колонки Enum: COPY передаёт их по имени, как хранит SQLEnum
+ENUM_COLUMNS = {"status", "priority", "repeat_type"}
+
+# Пользователей в одной порции записи
+USERS_PER_CHUNK = 1000
+
+# ===== РАСПРЕДЕЛЕНИЯ =====
+
+# Язык: (доля, часовые пояса с весами)
+LANGUAGES = {
+    "ru": (0.75, {
+        "Europe/Moscow": 60, "Europe/Samara": 6, "Asia/Yekaterinburg": 10,
+        "Asia/Novosibirsk": 6, "Europe/Minsk": 6, "Asia/Almaty": 7, "Asia/Tashkent": 5,
+    }),
+    "en": (0.25, {
+        "Europe/London": 30, "America/New_York": 30, "Europe/Berlin": 20,
+        "America/Los_Angeles": 12, "Asia/Singapore": 8,
+    }),
+}
+
+FIRST_NAMES = {
+    "ru": ["Анна", "Иван", "Мария", "Дмитрий", "Елена", "Алексей", "Ольга", "Сергей", "Наталья", "Павел"],
+    "en": ["Emma", "James", "Olivia", "Liam", "Sophia", "Noah", "Mia", "Lucas", "Ava", "Ethan"],
+}
+LAST_NAMES = {
+    "ru": ["Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева", "Козлов", "Новикова"],
+    "en": ["Smith", "Johnson", "Brown", "Taylor", "Miller", "Wilson", "Moore", "Clark"],
+}
+
+# Заголовки по категориям (индекс в DEFAULT_CATEGORIES)
+TITLES = {
+    "ru": [
+        ["Позвонить маме", "Оплатить квартиру", "Забрать посылку", "День рождения друга", "Продлить страховку"],
+        ["Созвон с командой", "Отправить отчёт", "Подготовить презентацию", "Ревью задач", "Встреча с клиентом"],
+        ["Сдать домашнее задание", "Повторить лекцию", "Записаться на экзамен", "Прочитать главу", "Курс английского"],
+        ["Выпить таблетки", "Тренировка", "Запись к врачу", "Выпить воды", "Прогулка 30 минут"],
+        ["Купить продукты", "Заказать корм коту", "Купить подарок", "Хлеб и молоко", "Бытовая химия"],
+    ],
+    "en": [
+        ["Call mom", "Pay rent", "Pick up the parcel", "Friend's birthday", "Renew insurance"],
+        ["Team sync", "Send the report", "Prepare slides", "Review tasks", "Client meeting"],
+        ["Finish homework", "Review lecture notes", "Register for the exam", "Read a chapter", "Spanish course"],
+        ["Take pills", "Workout", "Doctor appointment", "Drink water", "30 minute walk"],
+        ["Buy groceries", "Order cat food", "Buy a gift", "Bread and milk", "Cleaning supplies"],
+    ],
+}
+DESCRIPTIONS = {
+    "ru": ["Не забыть!", "Важно", "Перед выходом из дома", "Взять документы", "Если будет время"],
+    "en": ["Don't forget!", "Important", "Before leaving home", "Bring documents", "If there is time"],
+}
+CUSTOM_CATEGORIES = [("Спорт", "⚽", "#00CEC9"), ("Дом", "🏠", "#A29BFE"), ("Финансы", "💰", "#55EFC4")]
+
+# Категория напоминания: дефолтные с весами, без категории — 10%
+CATEGORY_WEIGHTS = [30, 30, 10, 15, 15]
+NO_CATEGORY = 0.10
+
+# Часы по местному времени, на которые ставят напоминания
+LOCAL_HOURS = {7: 4, 8: 10, 9: 14, 10: 8, 11: 5, 12: 7, 13: 5, 14: 4, 15: 4, 16: 4, 17: 5, 18: 8, 19: 9, 20: 8, 21: 5, 22: 3}
+MINUTES = {0: 50, 15: 10, 30: 30, 45: 10}
+
+REPEAT_WEIGHTS = {
+    RepeatType.NONE: 70, RepeatType.DAILY: 12, RepeatType.WEEKLY: 8,
+    RepeatType.MONTHLY: 3, RepeatType.WEEKDAYS: 5, RepeatType.CUSTOM: 2,
+}
+PRIORITY_WEIGHTS = {Priority.LOW: 20, Priority.MEDIUM: 65, Priority.HIGH: 15}
+
+# Разовые напоминания в прошлом и в будущем
+PAST_STATUS_WEIGHTS = {
+    ReminderStatus.COMPLETED: 65, ReminderStatus.MISSED: 15,
+    ReminderStatus.CANCELLED: 10, ReminderStatus.ACTIVE: 10,
+}
+FUTURE_STATUS_WEIGHTS = {ReminderStatus.ACTIVE: 95, ReminderStatus.CANCELLED: 5}
+# Доля разовых напоминаний в прошлом
+PAST_SHARE = 0.7
+
+NOTIFY_BEFORE_WEIGHTS = {0: 70, 5: 8, 15: 10, 30: 7, 60: 5}
+
+class Choice:
+    """Выбор по весам с заранее посчитанными накопленными суммами"""
+
+    def __init__(self, weights: dict):
+        self.keys = list(weights)
+        self.cum = list(accumulate(weights.values()))
+
+    def __call__(self, rng: random.Random):
+        return rng.choices(self.keys, cum_weights=self.cum)[0]
+
+_language = Choice({language: share for language, (share, _) in LANGUAGES.items()})
+_timezone = {language: Choice(zones) for language, (_, zones) in LANGUAGES.items()}
+_hour = Choice(LOCAL_HOURS)
+_minute = Choice(MINUTES)
+_repeat = Choice(REPEAT_WEIGHTS)
+_priority = Choice(PRIORITY_WEIGHTS)
+_past_status = Choice(PAST_STATUS_WEIGHTS)
+_future_status = Choice(FUTURE_STATUS_WEIGHTS)
+_notify_before = Choice(NOTIFY_BEFORE_WEIGHTS)
+_category = Choice(dict(enumerate(CATEGORY_WEIGHTS)))
+_theme = Choice({"auto": 60, "dark": 30, "light": 10})
+
+# ===== ГЕНЕРАЦИЯ =====
+
+@dataclass
+class Chunk:
+    """Строки одной порции для одного шарда"""
+    users: List[dict] = field(default_factory=list)
+    categories: List[dict] = field(default_factory=list)
+    reminders: List[dict] = field(default_factory=list)
+
+@dataclass
+class Ids:
+    """Следующие свободные id в шарде"""
+    user: int
+    category: int
+    reminder: int
+    first_user: int = 0
+
+class Generator:
+    def __init__(self, seed: int, now: datetime, per_user: float):
+        self.rng = random.Random(seed)
+        self.now = now
+        # Логнормальное распределение со средним per_user
+        self.sigma = 1.0
+        self.mu = math.log(max(per_user, 1)) - self.sigma ** 2 / 2
+        self._offsets: Dict[str, timedelta] = {}
+
+    def _utc_offset(self, zone: str) -> timedelta:
+        # Смещение на момент now: переходы на летнее время не важны
+        if zone not in self._offsets:
+            self._offsets[zone] = pytz.timezone(zone).utcoffset(self.now)
+        return self._offsets[zone]
+
+    def _local_time(self, day: datetime, zone: str) -> datetime:
+        """Типичное время напоминания в день day по местному времени, в UTC"""
+        local = day.replace(hour=_hour(self.rng), minute=_minute(self.rng), second=0, microsecond=0)
+        return local - self._utc_offset(zone)
+
+    def user(self, ids: Ids, telegram_id: int, chunk: Chunk):
+        rng = self.rng
+        language = _language(rng)
+        zone = _timezone[language](rng)
+        created_at = self.now - timedelta(days=rng.uniform(1, 720))
+        # Активность смещена к недавнему времени
+        last_active = self.now - (self.now - created_at) * rng.random() ** 3
+
+        user_id = ids.user
+        ids.user += 1
+
+        category_ids = []
+        for position, data in enumerate(DEFAULT_CATEGORIES, 1):
+            category_ids.append(ids.category)
+            chunk.categories.append({
+                "id": ids.category, "user_id": user_id, "is_default": True,
+                "order": position * RANK_STEP, "created_at": created_at, **data,
+            })
+            ids.category += 1
+
+        custom = rng.choices((0, 1, 2, 3), weights=(80, 12, 6, 2))[0]
+        for position, (name, icon, color) in enumerate(rng.sample(CUSTOM_CATEGORIES, custom)):
+            chunk.categories.append({
+                "id": ids.category, "user_id": user_id, "name": name, "icon": icon,
+                "color": color, "is_default": False,
+                "order": (len(DEFAULT_CATEGORIES) + position + 1) * RANK_STEP,
+                "created_at": created_at,
+            })
+            ids.category += 1
+
+        count = round(rng.lognormvariate(self.mu, self.sigma))
+        completed = 0
+        for _ in range(count):
+            row = self.reminder(ids.reminder, user_id, language, zone, created_at, category_ids)
+            completed += row["status"] is ReminderStatus.COMPLETED
+            chunk.reminders.append(row)
+            ids.reminder += 1
+
+        streak = rng.choices((0, 1, 2, 3, 5, 7, 14, 30), weights=(40, 15, 10, 10, 10, 8, 5, 2))[0]
+        chunk.users.append({
+            "id": user_id,
+            "telegram_id": telegram_id,
+            "username": f"user{telegram_id}" if rng.random() < 0.6 else None,
+            "first_name": rng.choice(FIRST_NAMES[language]),
+            "last_name": rng.choice(LAST_NAMES[language]) if rng.random() < 0.5 else None,
+            "language": language,
+            "timezone": zone,
+            "notifications_enabled": rng.random() < 0.95,
+            "theme": _theme(rng),
+            "paused_at": self.now - timedelta(days=rng.uniform(0, 30)) if rng.random() < 0.02 else None,
+            "created_at": created_at,
+            "last_active": last_active,
+            "total_reminders_created": count,
+            "total_reminders_completed": completed,
+            "current_streak": streak,
+            "best_streak": streak + rng.choice((0, 0, 1, 3, 10)),
+        })
+
+    def reminder(
+        self,
+        reminder_id: int,
+        user_id: int,
+        language: str,
+        zone: str,
+        user_created_at: datetime,
+        category_ids: List[int]
+    ) -> dict:
+        rng = self.rng
+        repeat = _repeat(rng)
+
+        if rng.random() < NO_CATEGORY:
+            category, category_id = rng.randrange(len(TITLES[language])), None
+        else:
+            category = _category(rng)
+            category_id = category_ids[category]
+
+        if repeat is RepeatType.NONE:
+            past = rng.random() < PAST_SHARE
+            if past:
+                span = min((self.now - user_created_at).days, 365)
+                day = self.now - timedelta(days=rng.uniform(0, span))
+            else:
+                # Будущие — в основном ближайшие дни
+                day = self.now + timedelta(days=rng.expovariate(1 / 7))
+            remind_at = self._local_time(day, zone)
+            past = remind_at < self.now
+            status = _past_status(rng) if past else _future_status(rng)
+        else:
+            # Повторяющиеся хранят ближайшее срабатывание
+            day = self.now + timedelta(days=rng.uniform(0, 7 if repeat is not RepeatType.MONTHLY else 31))
+            remind_at = self._local_time(day, zone)
+            past = remind_at < self.now
+            status = ReminderStatus.CANCELLED if rng.random() < 0.1 else ReminderStatus.ACTIVE
+
+        created_at = min(remind_at, self.now) - timedelta(hours=rng.uniform(1, 24 * 30))
+        created_at = max(created_at, user_created_at)
+
+        completed_at = None
+        if status is ReminderStatus.COMPLETED:
+            completed_at = min(remind_at + timedelta(minutes=rng.uniform(0, 180)), self.now)
+
+        repeat_days = None
+        if repeat is RepeatType.CUSTOM:
+            repeat_days = ",".join(str(d) for d in sorted(rng.sample(range(1, 8), rng.randint(2, 4))))
+
+        repeat_end_date = None
+        if repeat is not RepeatType.NONE and rng.random() < 0.2:
+            repeat_end_date = remind_at + timedelta(days=rng.uniform(30, 180))
+
+        notified = past and status is not ReminderStatus.CANCELLED
+        return {
+            "id": reminder_id,
+            "user_id": user_id,
+            "category_id": category_id,
+            "title": rng.choice(TITLES[language][category]),
+            "description": rng.choice(DESCRIPTIONS[language]) if rng.random() < 0.3 else None,
+            "remind_at": remind_at,
+            "created_at": created_at,
+            "completed_at": completed_at,
+            "status": status,
+            "priority": _priority(rng),
+            "repeat_type": repeat,
+            "repeat_days": repeat_days,
+            "repeat_end_date": repeat_end_date,
+            "notify_before": _notify_before(rng),
+            "is_notified": notified,
+            "notification_count": (1 + (rng.random() < 0.2)) if notified else 0,
+        }
+
+# ===== ЗАГРУЗКА =====
+
+class Loader:
+    """Пакетная запись в БД одного шарда"""
+
+    def __init__(self, engine: AsyncEngine, shard: int):
+        self.engine = engine
+        self.shard = shard
+        self.postgres = engine.dialect.name == "postgresql"
+        self.ids: Optional[Ids] = None
+        self._triggers: List[str] = []
+        self.first_reminder = 0
+        self.max_telegram_id = 0
+        self.rows = 0
+
+    async def prepare(self):
+        await migrate_engine(self.engine, self.shard)
+
+        async with self.engine.connect() as conn:
+            async def next_id(column) -> int:
+                return (await conn.scalar(select(func.max(column))) or 0) + 1
+
+            self.ids = Ids(
+                user=await next_id(_users.c.id),
+                category=await next_id(_categories.c.id),
+                reminder=await next_id(_reminders.c.id),
+            )
+            self.ids.first_user = self.ids.user
+            self.first_reminder = self.ids.reminder
+            self.max_telegram_id = await conn.scalar(select(func.max(_users.c.telegram_id))) or 0
+
+    async def suspend_triggers(self):
+        async with self.engine.begin() as conn:
+            if self.postgres:
+                await conn.execute(text("ALTER TABLE reminders DISABLE TRIGGER USER"))
+                return
+            # В SQLite отключить триггер нельзя: удаляем и запоминаем DDL
+            rows = (await conn.execute(text(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reminders'"
+            ))).all()
+            for name, sql in rows:
+                await conn.execute(text(f"DROP TRIGGER {name}"))
+            self._triggers = [sql for _, sql in rows]
+
+    async def restore_triggers(self):
+        async with self.engine.begin() as conn:
+            if self.postgres:
+                await conn.execute(text("ALTER TABLE reminders ENABLE TRIGGER USER"))
+            else:
+                for sql in self._triggers:
+                    await conn.execute(text(sql))
+                self._triggers = []
+
+    async def rebuild(self):
+        """Счётчики и индекс поиска для загруженных строк, статистика планировщика"""
+        async with self.engine.begin() as conn:
+            await conn.execute(text(rebuild_counters_sql(self.ids.first_user)))
+            if self.postgres:
+                # Триггер search_vector был отключён вместе с остальными
+                await conn.execute(text(
+                    f"UPDATE reminders SET {SEARCH_COLUMN} = {search_vector_sql()} "
+                    f"WHERE id >= {self.first_reminder}"
+                ))
+            else:
+                await conn.execute(text(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+                    f"SELECT id, title, description FROM reminders WHERE id >= {self.first_reminder}"
+                ))
+            # Без статистики SQLite выбирает индекс по правилам и для
+            # запросов по пользователю может взять общий ix_reminders_due
+            await conn.execute(text("ANALYZE"))
+
+    async def write(self, chunk: Chunk):
+        tables = ((_users, chunk.users), (_categories, chunk.categories), (_reminders, chunk.reminders))
+
+        if self.postgres:
+            await self._copy(tables)
+        else:
+            async with self.engine.begin() as conn:
+                for table, rows in tables:
+                    if rows:
+                        await conn.execute(insert(table), rows)
+
+        self.rows += sum(len(rows) for _, rows in tables)
+
+    async def _copy(self, tables):
+        async with self.engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            async with raw.transaction():
+                for table, rows in tables:
+                    if not rows:
+                        continue
+                    columns = list(rows[0])
+                    records = [
+                        tuple(row[c].name if c in ENUM_COLUMNS else row[c] for c in columns)
+                        for row in rows
+                    ]
+                    await raw.copy_records_to_table(table.name, records=records, columns=columns)
+
+    async def fix_sequences(self):
+        """После явных id последовательности PostgreSQL отстают"""
+        if not self.postgres:
+            return
+        async with self.engine.begin() as conn:
+            for table in (_users, _categories, _reminders):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"(SELECT max(id) FROM {table.name}))"
+                ))
+
+# ===== ЗАПУСК =====
+
+def _engines(url: Optional[str]) -> List[AsyncEngine]:
+    if url:
+        return [create_engine_for(url)]
+    from database.database import engines
+    return engines
+
+async def generate(
+    engines: List[AsyncEngine],
+    users: int,
+    per_user: float,
+    seed: int,
+    now: datetime,
+    route: bool = True,
+    progress: bool = False
+) -> int:
+    """
+    Загружает данные в БД шардов; route=False — всё в engines[0].
+    Возвращает число созданных напоминаний.
+    """
+
+    loaders = [Loader(engine, shard) for shard, engine in enumerate(engines)]
+    for loader in loaders:
+        await loader.prepare()
+
+    from database.shards import shard_router
+    if route:
+        # Каталог переносов читается из шарда 0 — после миграций
+        await shard_router.refresh()
+
+    generator = Generator(seed, now, per_user)
+    telegram_start = max([TELEGRAM_ID_START] + [loader.max_telegram_id + 1 for loader in loaders])
+    started = time.perf_counter()
+
+    for loader in loaders:
+        await loader.suspend_triggers()
+
+    try:
+        for first in range(0, users, USERS_PER_CHUNK):
+            chunks = [Chunk() for _ in loaders]
+            for n in range(first, min(first + USERS_PER_CHUNK, users)):
+                telegram_id = telegram_start + n
+                shard = shard_router.shard_for(telegram_id) if route else 0
+                generator.user(loaders[shard].ids, telegram_id, chunks[shard])
+
+            for loader, chunk in zip(loaders, chunks):
+                await loader.write(chunk)
+
+            if progress:
+                done = min(first + USERS_PER_CHUNK, users)
+                rows = sum(loader.rows for loader in loaders)
+                elapsed = time.perf_counter() - started
+                print(f"  {done}/{users} пользователей, {rows} строк, {rows / elapsed:,.0f} строк/с", end="\r")
+    finally:
+        for loader in loaders:
+            await loader.restore_triggers()
+
+    if progress:
+        print()
+    for loader in loaders:
+        await loader.rebuild()
+        await loader.fix_sequences()
+
+    return sum(loader.ids.reminder - loader.first_reminder for loader in loaders)
+
+async def run(args) -> int:
+    users, per_user = PRESETS[args.preset] if args.preset else (args.users, args.per_user)
+    if args.users is not None:
+        users = args.users
+    if args.per_user is not None:
+        per_user = args.per_user
+    if not users or not per_user:
+        print("Укажите --preset или --users и --per-user")
+        return 1
+
+    now = datetime.fromisoformat(args.now) if args.now else datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    engines = _engines(args.url)
+
+    print(f"Пользователей: {users}, напоминаний в среднем: {per_user}, шардов: {len(engines)}, seed: {args.seed}")
+    started = time.perf_counter()
+
+    reminders = await generate(
+        engines, users, per_user, args.seed, now, route=not args.url, progress=True
+    )
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {users} пользователей, {reminders} напоминаний за {elapsed:.1f} с")
+
+    for engine in engines:
+        await engine.dispose()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические данные для нагрузочных проверок")
+    parser.add_argument("--preset", choices=list(PRESETS), help="объём: 10k, 100k, 1m или 10m напоминаний")
+    parser.add_argument("--users", type=int, help="число пользователей")
+    parser.add_argument("--per-user", type=float, help="напоминаний на пользователя в среднем")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", help="опорное время UTC (ISO), по умолчанию текущий час")
+    parser.add_argument("--url", help="БД вместо настроенных шардов")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# backend/tools/move_users.py
+"""
+Перенос пользователей между шардами (SHARD_URLS).
+
+Для каждого пользователя:
+1. запись в shard_directory получает moving=True; через
+   SHARD_DIRECTORY_REFRESH секунд бот и API перестают принимать его
+   запросы (ответ «повторите позже»), планировщик — слать уведомления;
+2. пользователь, категории, напоминания, архив и достижения копируются
+   в целевой шард одной транзакцией (id выдаёт целевой шард), счётчики
+   пересчитываются сверкой;
+3. каталог переключается на целевой шард, moving=False;
+4. после ещё одного интервала обновления копия в исходном шарде удаляется.
+
+    python -m tools.move_users --to 1 123456789 987654321
+    python -m tools.move_users --to 2 --from 0 --count 500
+
+Перенос повторяем: незавершённая копия в целевом шарде удаляется.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from database.database import async_session, init_db
+from database.shards import shard_directory, shard_router
+from database.models import (
+    User, Category, Reminder, ArchivedReminder, UserAchievement
+)
+from database.repositories.reminder_repo import ReminderRepository
+
+logger = logging.getLogger("move_users")
+
+_users = User.__table__
+_categories = Category.__table__
+_reminders = Reminder.__table__
+_archive = ArchivedReminder.__table__
+_achievements = UserAchievement.__table__
+
+# ===== КАТАЛОГ =====
+
+async def set_directory(telegram_id: int, shard: int, moving: bool):
+    async with async_session.for_shard(0)() as session:
+        await session.execute(
+            delete(shard_directory).where(shard_directory.c.telegram_id == telegram_id)
+        )
+        await session.execute(
+            insert(shard_directory).values(telegram_id=telegram_id, shard=shard, moving=moving)
+        )
+        await session.commit()
+
+async def wait_for_refresh():
+    """Ждём, пока все процессы перечитают каталог"""
+    await asyncio.sleep(2 * settings.SHARD_DIRECTORY_REFRESH)
+
+# ===== КОПИРОВАНИЕ =====
+
+def _row(row, **overrides) -> dict:
+    values = dict(row._mapping)
+    values.pop("id", None)
+    values.update(overrides)
+    return values
+
+async def _insert(session: AsyncSession, table, values: dict) -> int:
+    result = await session.execute(insert(table).values(values).returning(table.c.id))
+    return result.scalar_one()
+
+async def copy_user(source: AsyncSession, target: AsyncSession, telegram_id: int) -> Optional[int]:
+    """Копирует данные пользователя, возвращает его id в целевом шарде"""
+
+    user = (await source.execute(
+        select(_users).where(_users.c.telegram_id == telegram_id)
+    )).first()
+    if user is None:
+        return None
+
+    # Остаток прерванного переноса
+    await target.execute(delete(_users).where(_users.c.telegram_id == telegram_id))
+
+    user_id = await _insert(target, _users, _row(user))
+
+    category_ids: Dict[int, int] = {}
+    for category in await source.execute(
+        select(_categories).where(_categories.c.user_id == user.id).order_by(_categories.c.id)
+    ):
+        category_ids[category.id] = await _insert(
+            target, _categories, _row(category, user_id=user_id)
+        )
+
+    def reminder_values(row) -> dict:
+        return _row(row, user_id=user_id, category_id=category_ids.get(row.category_id))
+
+    # Архивные строки получают id через reminders (общая нумерация
+    # с представлением reminders_all) и сразу уходят в архив
+    archived = (await source.execute(
+        select(_archive).where(_archive.c.user_id == user.id).order_by(_archive.c.id)
+    )).all()
+    archived_ids: List[int] = []
+    for row in archived:
+        values = reminder_values(row)
+        values.pop("archived_at")
+        archived_ids.append(await _insert(target, _reminders, values))
+
+    for row in await source.execute(
+        select(_reminders).where(_reminders.c.user_id == user.id).order_by(_reminders.c.id)
+    ):
+        await _insert(target, _reminders, reminder_values(row))
+
+    if archived_ids:
+        moved = dict(zip(archived_ids, (row.archived_at for row in archived)))
+        rows = (await target.execute(
+            select(_reminders).where(_reminders.c.id.in_(archived_ids))
+        )).all()
+        await target.execute(insert(_archive), [
+            {**row._mapping, "archived_at": moved[row.id]} for row in rows
+        ])
+        await target.execute(delete(_reminders).where(_reminders.c.id.in_(archived_ids)))
+
+    achievements = (await source.execute(
+        select(_achievements).where(_achievements.c.user_id == user.id)
+    )).all()
+    if achievements:
+        await target.execute(insert(_achievements), [
+            _row(row, user_id=user_id) for row in achievements
+        ])
+
+    # Триггеры вели горячие счётчики при вставке, архивные — сверка
+    await ReminderRepository(target).reconcile_counters(user_id - 1, 1)
+
+    return user_id
+
+# ===== ПЕРЕНОС =====
+
+async def move_user(telegram_id: int, target_shard: int) -> bool:
+    source_shard = shard_router.shard_for(telegram_id)
+    if source_shard == target_shard:
+        logger.info(f"{telegram_id}: уже в шарде {target_shard}")
+        return False
+
+    await set_directory(telegram_id, source_shard, moving=True)
+    await wait_for_refresh()
+
+    try:
+        async with async_session.for_shard(source_shard)() as source, \
+                async_session.for_shard(target_shard)() as target:
+            user_id = await copy_user(source, target, telegram_id)
+            await target.commit()
+    except Exception:
+        # Возвращаем пользователя в исходный шард
+        await set_directory(telegram_id, source_shard, moving=False)
+        raise
+
+    await set_directory(telegram_id, target_shard, moving=False)
+    await shard_router.refresh()
+
+    if user_id is None:
+        logger.info(f"{telegram_id}: в шарде {source_shard} нет данных, каталог переключён")
+        return True
+
+    await wait_for_refresh()
+
+    async with async_session.for_shard(source_shard)() as source:
+        await source.execute(delete(_users).where(_users.c.telegram_id == telegram_id))
+        await source.commit()
+
+    logger.info(f"{telegram_id}: шард {source_shard} -> {target_shard}")
+    return True
+
+async def select_users(shard: int, after: int, count: int) -> List[int]:
+    """Первые count пользователей шарда с telegram_id > after"""
+
+    async with async_session.for_shard(shard)() as session:
+        telegram_ids = await session.scalars(
+            select(User.telegram_id)
+            .where(User.telegram_id > after)
+            .order_by(User.telegram_id)
+            .limit(count)
+        )
+        return [
+            telegram_id for telegram_id in telegram_ids
+            if shard_router.shard_for(telegram_id) == shard
+        ]
+
+async def run(args) -> int:
+    if args.to not in shard_router.shards():
+        logger.error(f"Шарда {args.to} нет: задано {shard_router.count} (SHARD_URLS)")
+        return 1
+
+    await init_db()
+
+    telegram_ids = list(args.telegram_ids)
+    if args.from_shard is not None:
+        telegram_ids += await select_users(args.from_shard, args.after, args.count)
+
+    moved = 0
+    for telegram_id in telegram_ids:
+        if await move_user(telegram_id, args.to):
+            moved += 1
+
+    logger.info(f"Перенесено пользователей: {moved} из {len(telegram_ids)}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос пользователей между шардами")
+    parser.add_argument("telegram_ids", type=int, nargs="*", help="telegram_id пользователей")
+    parser.add_argument("--to", type=int, required=True, help="целевой шард")
+    parser.add_argument("--from", dest="from_shard", type=int, help="взять пользователей из шарда")
+    parser.add_argument("--after", type=int, default=0, help="с telegram_id больше указанного")
+    parser.add_argument("--count", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# backend/tools/query_plans.py
+"""
+Проверка планов запросов репозиториев.
+
+Создаёт схему во временной БД, заполняет её данными, вызывает методы
+ReminderRepository / UserRepository / CategoryRepository и для каждого
+выполненного запроса получает план (EXPLAIN QUERY PLAN в SQLite,
+EXPLAIN в PostgreSQL). Если хотя бы один запрос читает таблицу целиком,
+завершается с кодом 1.
+
+    python -m tools.query_plans
+    python -m tools.query_plans --url postgresql+asyncpg://.../scratch_db
+
+--url должен указывать на пустую БД: таблицы будут созданы и заполнены.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Tuple
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Запросы должны доходить до БД, а не до кэша пользователей
+os.environ["USER_CACHE_SIZE"] = "0"
+
+from database.database import create_engine_for
+from database.migrations import migrate_engine
+from database.models import (
+    Base, User, Category, Reminder,
+    ReminderStatus, RepeatType, Priority
+)
+from database.repositories.user_repo import UserRepository
+from database.repositories.reminder_repo import ReminderRepository
+from database.repositories.category_repo import CategoryRepository
+
+TABLES = set(Base.metadata.tables)
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)")
+POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+# ===== ДАННЫЕ =====
+
+async def seed(engine, users: int, reminders_per_user: int) -> dict:
+    """Заполняет БД и возвращает идентификаторы для вызовов"""
+
+    now = datetime.utcnow().replace(microsecond=0)
+    statuses = list(ReminderStatus)
+    repeats = list(RepeatType)
+
+    await migrate_engine(engine)
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {
+                "id": i,
+                "telegram_id": 1_000_000 + i,
+                "first_name": f"user{i}",
+                "language": "ru",
+                "timezone": "Europe/Moscow",
+                "paused_at": now if i % 50 == 0 else None,
+            }
+            for i in range(1, users + 1)
+        ])
+
+        await conn.execute(insert(Category), [
+            {
+                "id": (user_id - 1) * 5 + order,
+                "user_id": user_id,
+                "name": f"cat{order}",
+                "order": order,
+                "is_default": order == 1,
+            }
+            for user_id in range(1, users + 1)
+            for order in range(1, 6)
+        ])
+
+        rows = []
+        for user_id in range(1, users + 1):
+            for n in range(reminders_per_user):
+                rows.append({
+                    "user_id": user_id,
+                    "category_id": (user_id - 1) * 5 + n % 5 + 1 if n % 3 else None,
+                    "title": f"reminder {user_id}/{n}",
+                    "remind_at": now + timedelta(hours=n - reminders_per_user // 2),
+                    "status": statuses[n % len(statuses)],
+                    "priority": Priority.MEDIUM,
+                    "repeat_type": repeats[n % len(repeats)] if n % 4 == 0 else RepeatType.NONE,
+                    "repeat_days": "1,3,5",
+                    "is_notified": n % 2 == 0,
+                })
+        await conn.execute(insert(Reminder), rows)
+
+        # Статистика для планировщика
+        await conn.execute(text("ANALYZE"))
+
+    user_id = users // 2 + 1
+    return {
+        "now": now,
+        "user_id": user_id,
+        "telegram_id": 1_000_000 + user_id,
+        "category_id": (user_id - 1) * 5 + 2,
+        "reminder_id": (user_id - 1) * reminders_per_user + 1,
+    }
+
+# ===== ВЫЗОВЫ =====
+
+Case = Tuple[str, Callable[[AsyncSession, dict], Awaitable]]
+
+async def _claim_notification(session: AsyncSession, c: dict):
+    repo = ReminderRepository(session)
+    reminder = await repo.get_by_id(c["reminder_id"], c["user_id"])
+    return await repo.claim_notification(reminder)
+
+CASES: List[Case] = [
+    # UserRepository
+    ("users.get_by_telegram_id", lambda s, c: UserRepository(s).get_by_telegram_id(c["telegram_id"])),
+    ("users.get_by_id", lambda s, c: UserRepository(s).get_by_id(c["user_id"])),
+    ("users.get_or_create", lambda s, c: UserRepository(s).get_or_create(c["telegram_id"], "x")),
+    ("users.create", lambda s, c: UserRepository(s).create(telegram_id=42, first_name="new")),
+    ("users.update_settings", lambda s, c: UserRepository(s).update_settings(c["user_id"], theme="dark")),
+    ("users.set_paused", lambda s, c: UserRepository(s).set_paused(c["user_id"], False)),
+    ("users.increment_stats", lambda s, c: UserRepository(s).increment_stats(c["user_id"], created=1)),
+
+    # CategoryRepository
+    ("categories.get_by_id", lambda s, c: CategoryRepository(s).get_by_id(c["category_id"], c["user_id"])),
+    ("categories.get_user_categories", lambda s, c: CategoryRepository(s).get_user_categories(c["user_id"])),
+    ("categories.create", lambda s, c: CategoryRepository(s).create(c["user_id"], "new")),
+    ("categories.update", lambda s, c: CategoryRepository(s).update(c["category_id"], c["user_id"], name="x")),
+    ("categories.reorder", lambda s, c: CategoryRepository(s).reorder(c["user_id"], [c["category_id"]])),
+    ("categories.move", lambda s, c: CategoryRepository(s).move(
+        c["user_id"], c["category_id"], after_id=c["category_id"] + 2
+    )),
+    ("categories.rebalance", lambda s, c: CategoryRepository(s).rebalance(c["user_id"])),
+    ("categories.get_crowded_users", lambda s, c: CategoryRepository(s).get_crowded_users(
+        c["user_id"] - 1, 50
+    )),
+    ("categories.delete", lambda s, c: CategoryRepository(s).delete(c["category_id"], c["user_id"])),
+
+    # ReminderRepository
+    ("reminders.get_by_id", lambda s, c: ReminderRepository(s).get_by_id(c["reminder_id"], c["user_id"])),
+    ("reminders.get_user_reminders", lambda s, c: ReminderRepository(s).get_user_reminders(c["user_id"])),
+    ("reminders.get_user_reminders(status)", lambda s, c: ReminderRepository(s).get_user_reminders(
+        c["user_id"], status=ReminderStatus.ACTIVE, from_date=c["now"]
+    )),
+    ("reminders.get_user_reminders(category)", lambda s, c: ReminderRepository(s).get_user_reminders(
+        c["user_id"], category_id=c["category_id"]
+    )),
+    ("reminders.get_user_reminders(cursor)", lambda s, c: ReminderRepository(s).get_user_reminders(
+        c["user_id"], status=ReminderStatus.ACTIVE, after=(c["now"], c["reminder_id"])
+    )),
+    ("reminders.get_user_reminders(archive)", lambda s, c: ReminderRepository(s).get_user_reminders(
+        c["user_id"], status=ReminderStatus.COMPLETED, include_archive=True
+    )),
+    ("reminders.search", lambda s, c: ReminderRepository(s).search(c["user_id"], "reminder 5")),
+    ("reminders.get_today_reminders", lambda s, c: ReminderRepository(s).get_today_reminders(c["user_id"])),
+    ("reminders.get_pending_notifications", lambda s, c: ReminderRepository(s).get_pending_notifications(
+        c["now"], per_user_limit=20, limit=500
+    )),
+    ("reminders.get_upcoming_notifications", lambda s, c: ReminderRepository(s).get_upcoming_notifications(
+        c["now"], c["now"] + timedelta(minutes=1)
+    )),
+    ("reminders.get_scheduled_until", lambda s, c: ReminderRepository(s).get_scheduled_until(
+        c["now"] + timedelta(hours=1)
+    )),
+    ("reminders.get_overdue_recurring", lambda s, c: ReminderRepository(s).get_overdue_recurring(
+        c["user_id"], c["now"]
+    )),
+    ("reminders.reschedule_overdue", lambda s, c: ReminderRepository(s).reschedule_overdue(
+        c["user_id"], c["now"] - timedelta(days=1), c["now"], 3600, []
+    )),
+    ("reminders.get_future_range", lambda s, c: ReminderRepository(s).get_future_range(c["user_id"], c["now"])),
+    ("reminders.shift_future_ranges", lambda s, c: ReminderRepository(s).shift_future_ranges(
+        c["user_id"], c["now"], [(c["now"], c["now"] + timedelta(days=30), 3600)]
+    )),
+    ("reminders.get_stats", lambda s, c: ReminderRepository(s).get_stats(c["user_id"])),
+    ("reminders.get_stats(archive)", lambda s, c: ReminderRepository(s).get_stats(
+        c["user_id"], include_archive=True
+    )),
+    ("reminders.archive_terminal", lambda s, c: ReminderRepository(s).archive_terminal(c["now"], 100)),
+    ("reminders.reconcile_counters", lambda s, c: ReminderRepository(s).reconcile_counters(
+        c["user_id"] - 1, 50
+    )),
+    ("reminders.create", lambda s, c: ReminderRepository(s).create(
+        user_id=c["user_id"], title="new", remind_at=c["now"]
+    )),
+    ("reminders.update", lambda s, c: ReminderRepository(s).update(c["reminder_id"], c["user_id"], title="x")),
+    ("reminders.claim_notification", lambda s, c: _claim_notification(s, c)),
+    ("reminders.mark_completed", lambda s, c: ReminderRepository(s).mark_completed(c["reminder_id"], c["user_id"])),
+    ("reminders.delete", lambda s, c: ReminderRepository(s).delete(c["reminder_id"], c["user_id"])),
+]
+
+# ===== ПЛАНЫ =====
+
+class StatementRecorder:
+    """Запоминает SQL, который уходит в драйвер"""
+
+    def __init__(self, engine):
+        self.statements: List[tuple] = []
+        self.enabled = False
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.enabled:
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        self.statements.append((statement, parameters))
+
+    def take(self) -> List[tuple]:
+        statements, self.statements = self.statements, []
+        return statements
+
+def _explainable(statement: str) -> bool:
+    return statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE")
+
+async def explain(conn, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """Возвращает (строки плана, таблицы, прочитанные целиком)"""
+
+    if conn.dialect.name == "sqlite":
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        lines = [row[-1] for row in result]
+        pattern = SQLITE_FULL_SCAN
+    else:
+        result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        lines = [row[0] for row in result]
+        pattern = POSTGRES_FULL_SCAN
+
+    scans = []
+    for line in lines:
+        match = pattern.search(line.strip())
+        if match and match.group(1) in TABLES:
+            scans.append(match.group(1))
+
+    return lines, scans
+
+async def run(url: str, users: int, reminders_per_user: int, verbose: bool) -> int:
+    engine = create_engine_for(url)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    context = await seed(engine, users, reminders_per_user)
+    recorder = StatementRecorder(engine)
+    failures = []
+
+    async with engine.connect() as explain_conn:
+        if explain_conn.dialect.name == "postgresql":
+            # На маленьком наборе Postgres и так выберет Seq Scan;
+            # запрещаем его, чтобы увидеть, есть ли вообще подходящий индекс
+            await explain_conn.execute(text("SET enable_seqscan = off"))
+
+        for name, call in CASES:
+            async with session_factory() as session:
+                recorder.enabled = True
+                try:
+                    await call(session, context)
+                finally:
+                    recorder.enabled = False
+
+            for statement, parameters in recorder.take():
+                if not _explainable(statement):
+                    continue
+
+                lines, scans = await explain(explain_conn, statement, parameters)
+                status = "FULL SCAN: " + ", ".join(scans) if scans else "ok"
+                print(f"{name:45} {status}")
+
+                if verbose or scans:
+                    print("    " + " ".join(statement.split()))
+                    for line in lines:
+                        print(f"      {line}")
+
+                if scans:
+                    failures.append(name)
+
+    await engine.dispose()
+
+    if failures:
+        print(f"\n❌ Полное чтение таблицы: {', '.join(sorted(set(failures)))}")
+        return 1
+
+    print(f"\n✅ {len(CASES)} методов без полного чтения таблиц")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка планов запросов репозиториев")
+    parser.add_argument("--url", help="пустая БД (по умолчанию временный файл SQLite)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reminders", type=int, default=50, help="напоминаний на пользователя")
+    parser.add_argument("-v", "--verbose", action="store_true", help="печатать все планы")
+    args = parser.parse_args()
+
+    if args.url:
+        sys.exit(asyncio.run(run(args.url, args.users, args.reminders, args.verbose)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'plans.db')}"
+        sys.exit(asyncio.run(run(url, args.users, args.reminders, args.verbose)))
+
+if __name__ == "__main__":
+    main()